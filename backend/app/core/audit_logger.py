@@ -1,11 +1,50 @@
 from fastapi import Request
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any
+from app.database import SessionLocal
 from app.models.audit_models import AuditLog, AuditAction
 from app.models.user_models import User
 from app.models.admin_models import AdminUser
 import json
 
+def _build_audit_log(
+    action: str,
+    resource_type: str = None,
+    resource_id: int = None,
+    description: str = None,
+    old_values: dict = None,
+    new_values: dict = None,
+    user_id: int = None,
+    admin_user_id: int = None,
+    request: Request = None,
+    status_code: int = None,
+    error_message: str = None
+) -> AuditLog:
+    """ساخت رکورد AuditLog (مشترک بین مسیر sync و async)"""
+    audit_log = AuditLog(
+        action=AuditAction(action),
+        resource_type=resource_type,
+        resource_id=resource_id,
+        description=description,
+        old_values=old_values,
+        new_values=new_values,
+        user_id=user_id,
+        admin_user_id=admin_user_id,
+        status_code=status_code,
+        error_message=error_message
+    )
+    
+    # افزودن اطلاعات درخواست اگر موجود باشد
+    if request:
+        audit_log.ip_address = request.client.host
+        audit_log.user_agent = request.headers.get("user-agent")
+        audit_log.request_method = request.method
+        audit_log.request_url = str(request.url)
+    
+    return audit_log
+
 async def log_audit(
     action: str,
     resource_type: str = None,
@@ -22,36 +61,62 @@ async def log_audit(
     """
     ثبت لاگ audit برای تمام فعالیت‌های سیستم
     """
+    # session مستقل که همیشه بسته می‌شود (next(get_db()) اتصال را تا GC نگه می‌داشت)
+    db = SessionLocal()
     try:
-        db = next(get_db())
-        
-        audit_log = AuditLog(
-            action=AuditAction(action),
-            resource_type=resource_type,
-            resource_id=resource_id,
-            description=description,
-            old_values=old_values,
-            new_values=new_values,
-            user_id=user_id,
-            admin_user_id=admin_user_id,
-            status_code=status_code,
-            error_message=error_message
+        audit_log = _build_audit_log(
+            action, resource_type, resource_id, description, old_values, new_values,
+            user_id, admin_user_id, request, status_code, error_message
         )
         
-        # افزودن اطلاعات درخواست اگر موجود باشد
-        if request:
-            audit_log.ip_address = request.client.host
-            audit_log.user_agent = request.headers.get("user-agent")
-            audit_log.request_method = request.method
-            audit_log.request_url = str(request.url)
-        
         db.add(audit_log)
         db.commit()
         
     except Exception as e:
         # اگر خطایی در ثبت لاگ پیش آمد، سیستم نباید crash کند
+        db.rollback()
         print(f"Error logging audit: {e}")
-        pass
+    finally:
+        db.close()
+
+async def log_audit_async(db: AsyncSession, action: str, **fields):
+    """
+    ثبت لاگ audit روی session async همان درخواست (بدون مسدود کردن event loop)
+
+    پارامترها همان پارامترهای log_audit هستند
+    """
+    try:
+        audit_log = _build_audit_log(action, **fields)
+    except Exception as e:
+        # action نامعتبر - بدون rollback تا اشیاء بارگذاری‌شده session منقضی نشوند
+        print(f"Error logging audit: {e}")
+        return
+    
+    try:
+        db.add(audit_log)
+        await db.commit()
+    except Exception as e:
+        # اگر خطایی در ثبت لاگ پیش آمد، سیستم نباید crash کند
+        await db.rollback()
+        print(f"Error logging audit: {e}")
+
+def log_audit_batch(db: Session, entries: List[Dict[str, Any]]) -> int:
+    """
+    ثبت گروهی لاگ‌های audit با یک INSERT چندردیفی در تراکنش جاری
+
+    commit بر عهده فراخواننده است تا لاگ‌ها همراه با تغییرات اصلی ثبت شوند
+    """
+    if not entries:
+        return 0
+    
+    rows = []
+    for entry in entries:
+        row = dict(entry)
+        row["action"] = AuditAction(row["action"])
+        rows.append(row)
+    
+    db.execute(insert(AuditLog), rows)
+    return len(rows)
 
 async def log_user_activity(
     user_id: int,
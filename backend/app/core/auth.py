@@ -4,10 +4,13 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.database import get_db
+from app.database import get_db, get_async_db
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user_models import User
 from app.models.admin_models import AdminUser
+from app.core.metrics import registry, AUTH_REQUESTS
 
 # JWT Configuration
 SECRET_KEY = "your-secret-key-change-in-production"
@@ -20,7 +23,9 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    verified = pwd_context.verify(plain_password, hashed_password)
+    registry.inc(AUTH_REQUESTS, {"kind": "password", "result": "success" if verified else "failure"})
+    return verified
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
@@ -51,12 +56,13 @@ def verify_token(token: str):
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     token = credentials.credentials
     payload = verify_token(token)
     
     if not payload:
+        registry.inc(AUTH_REQUESTS, {"kind": "token", "result": "invalid_token"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
@@ -66,25 +72,33 @@ async def get_current_user(
     user_id = payload.get("user_id")
     user_type = payload.get("type")
     
-    if user_type == "admin":
-        user = db.query(AdminUser).filter(AdminUser.id == user_id).first()
-    else:
-        user = db.query(User).filter(User.id == user_id).first()
+    # روی هر درخواست احراز هویت‌شده اجرا می‌شود - کوئری async تا event loop مسدود نشود
+    model = AdminUser if user_type == "admin" else User
+    user = await db.get(model, user_id) if user_id is not None else None
     
     if not user:
+        registry.inc(AUTH_REQUESTS, {"kind": "token", "result": "user_not_found"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if hasattr(user, 'status') and user.status not in ["active", "ACTIVE"]:
+    # status یک Enum است؛ مقدار آن مقایسه می‌شود
+    if hasattr(user, 'status') and getattr(user.status, "value", user.status) not in ["active", "ACTIVE"]:
+        registry.inc(AUTH_REQUESTS, {"kind": "token", "result": "inactive"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User account is not active",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # پایان تراکنش خواندنی: اتصال async همین حالا به pool برمی‌گردد و تا پایان درخواست نگه داشته
+    # نمی‌شود؛ مسیرهای sync که session خود را از get_db می‌گیرند هم‌زمان دو اتصال در اختیار ندارند
+    # (expire_on_commit=False: شیء user بارگذاری‌شده و متصل به session باقی می‌ماند)
+    await db.commit()
+    
+    registry.inc(AUTH_REQUESTS, {"kind": "token", "result": "success"})
     return user
 
 async def get_current_admin(
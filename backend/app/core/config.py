@@ -10,14 +10,78 @@ class Settings:
         self.API_PORT = int(os.getenv("API_PORT", "8000"))
         self.API_HOST = os.getenv("API_HOST", "0.0.0.0")
         self.API_BASE_URL = f"http://localhost:{self.API_PORT}"
+        self.ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
         
         # تنظیمات دیتابیس
         self.DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./parsagold.db")
         
+        # replicaهای فقط-خواندنی (با کاما) و حداکثر تأخیر قابل قبول (ثانیه)
+        # روی SQLite بدون replica، pool read-only روی همان فایل WAL استفاده می‌شود
+        self.DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+        self.REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+        
+        # پاسخ 503 هنگام اشباع pool (انتظار checkout بیش از DB_POOL_TIMEOUT): مقدار هدر Retry-After
+        self.DB_POOL_RETRY_AFTER = int(os.getenv("DB_POOL_RETRY_AFTER", "2"))
+        
         # تنظیمات JWT
         self.SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
         self.ALGORITHM = "HS256"
         self.ACCESS_TOKEN_EXPIRE_MINUTES = 30
+        
+        # کش آمار کاربران داشبورد (ثانیه)
+        self.USER_STATS_CACHE_SECONDS = int(os.getenv("USER_STATS_CACHE_SECONDS", "15"))
+        
+        # تعداد processهای هش رمز عبور در import گروهی کاربران (pool مشترک همه درخواست‌ها)
+        self.IMPORT_HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        
+        # SecurityMiddleware (Rate Limiting و IPهای مسدود) - پیش‌فرض غیرفعال؛
+        # پروکسی‌های مورد اعتماد (IP یا CIDR با کاما) که X-Forwarded-For آن‌ها پذیرفته می‌شود
+        self.SECURITY_MIDDLEWARE_ENABLED = os.getenv("SECURITY_MIDDLEWARE_ENABLED", "false").lower() == "true"
+        self.TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "")
+        
+        # وضعیت مشترک محدودیت نرخ و IPهای مسدود بین workerها
+        # memory (فقط همین process) / sqlite (چند worker روی یک سرور) / redis
+        self.RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+        self.RATE_LIMIT_STORE_URL = os.getenv("RATE_LIMIT_STORE_URL")
+        
+        # پوشه snapshot متریک‌ها برای uvicorn چند worker (خالی = فقط همین process)
+        self.METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+        # دسترسی به /metrics: توکن Bearer یا IPها/CIDRهای مجاز (با کاما)
+        self.METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+        self.METRICS_ALLOWED_IPS = os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1")
+        
+        # آستانه ثبت کوئری کند در system_logs (میلی‌ثانیه، صفر = غیرفعال)
+        self.SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+        
+        # تشخیص N+1: off / warn / raise (پیش‌فرض warn در توسعه؛ در اجرای تست‌ها raise)
+        self.N_PLUS_ONE_MODE = os.getenv(
+            "N_PLUS_ONE_MODE", "warn" if self.ENVIRONMENT == "development" else "off"
+        ).lower()
+        self.N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+        
+        # دفتر سفارش: پوشه write-ahead journal (خالی = بدون journal) و fsync هر فرمان
+        self.ORDER_JOURNAL_DIR = os.getenv("ORDER_JOURNAL_DIR", "./data/order_journal")
+        self.ORDER_JOURNAL_FSYNC = os.getenv("ORDER_JOURNAL_FSYNC", "false").lower() == "true"
+        
+        # Idempotency-Key ثبت معامله: عمر کلید (ساعت)، حداکثر انتظار تکرار هم‌زمان و
+        # زمان پس از آن رزرو رهاشده (crash صاحب رزرو) قابل تصاحب است (ثانیه)
+        self.IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+        self.IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "0"))  # 0: تکرار هم‌زمان فوراً 409
+        self.IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "30"))
+        
+        # توکن quote (قیمت امضاشده برای اجرای معامله): عمر (ثانیه) و کلید امضا
+        self.QUOTE_TTL_SECONDS = float(os.getenv("QUOTE_TTL_SECONDS", "15"))
+        self.QUOTE_SECRET_KEY = os.getenv("QUOTE_SECRET_KEY", self.SECRET_KEY)
+        
+        # جدول قیمت درون‌حافظه‌ای: دوره polling تغییرات (SQLite) و بارگذاری کامل دوره‌ای (ثانیه)
+        self.PRICE_POLL_INTERVAL_SECONDS = float(os.getenv("PRICE_POLL_INTERVAL_SECONDS", "0.5"))
+        self.PRICE_FULL_RELOAD_SECONDS = float(os.getenv("PRICE_FULL_RELOAD_SECONDS", "300"))
+        
+        # سطح ریسک از حجم معاملات غلتان (ریال): آستانه‌های «24h,7d,30d» هر سطح؛
+        # سقف حجم 24 ساعت هر سطح («سطح:مبلغ» با کاما، خالی = بدون سقف) - trading_limits کاربر مقدم است
+        self.RISK_MEDIUM_VOLUME = os.getenv("RISK_MEDIUM_VOLUME", "50000000,200000000,500000000")
+        self.RISK_HIGH_VOLUME = os.getenv("RISK_HIGH_VOLUME", "200000000,1000000000,3000000000")
+        self.RISK_DAILY_VOLUME_LIMITS = os.getenv("RISK_DAILY_VOLUME_LIMITS", "high:500000000")
 
 # ایجاد instance全局
 settings = Settings()
@@ -0,0 +1,311 @@
+# backend/app/core/metrics.py
+"""
+رجیستری متریک‌های داخل process با خروجی متنی Prometheus
+
+- هر thread در shard مخصوص خودش می‌نویسد (بدون قفل در مسیر درخواست)؛ هنگام scrape جمع زده می‌شوند
+- در حالت چند worker، هر worker snapshot خود را در settings.METRICS_MULTIPROC_DIR می‌نویسد
+  و /metrics فایل‌های همه workerها را ادغام می‌کند
+- /metrics فقط با METRICS_TOKEN یا از IPهای METRICS_ALLOWED_IPS قابل خواندن است
+"""
+import atexit
+import glob
+import hmac
+import json
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+from app.core.request_context import ip_in_networks, parse_networks, resolve_client_ip
+
+try:
+    import fcntl
+except ImportError:  # Windows: بایگانی فایل workerهای مرده غیرفعال است
+    fcntl = None
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in (labels or {}).items()))
+
+
+class MetricsRegistry:
+    """رجیستری counter / gauge / histogram با shard به ازای هر thread"""
+
+    def __init__(self):
+        self._definitions: Dict[str, dict] = {}
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._register_lock = threading.Lock()
+
+    # --- تعریف متریک‌ها ---
+
+    def _define(self, name: str, kind: str, help_text: str, buckets=None) -> str:
+        self._definitions.setdefault(name, {"type": kind, "help": help_text, "buckets": buckets})
+        return name
+
+    def counter(self, name: str, help_text: str) -> str:
+        return self._define(name, "counter", help_text)
+
+    def gauge(self, name: str, help_text: str) -> str:
+        return self._define(name, "gauge", help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> str:
+        return self._define(name, "histogram", help_text, tuple(buckets))
+
+    # --- نوشتن (مسیر داغ) ---
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._register_lock:  # فقط یک بار برای هر thread
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def inc(self, name: str, labels: Optional[Dict[str, str]] = None, amount: float = 1) -> None:
+        shard = self._shard()
+        key = (name, _labels(labels))
+        shard[key] = shard.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        buckets = self._definitions[name]["buckets"]
+        shard = self._shard()
+        key = (name, _labels(labels))
+        state = shard.get(key)
+        if state is None:
+            # [شمارش هر bucket ..., +Inf, sum]
+            state = shard[key] = [0] * (len(buckets) + 1) + [0.0]
+        state[bisect_left(buckets, value)] += 1
+        state[-1] += value
+
+    # --- خواندن ---
+
+    def snapshot(self) -> List[list]:
+        """جمع shardها به شکل [name, labels, value] (برای histogram لیست شمارش‌ها)"""
+        merged: Dict[tuple, object] = {}
+        for shard in list(self._shards):
+            for key, value in shard.copy().items():
+                _merge(merged, key, value)
+        return [[name, list(map(list, labels)), value] for (name, labels), value in merged.items()]
+
+    def render(self, snapshots: Iterable[List[list]]) -> str:
+        """تبدیل snapshotها (یک یا چند worker) به قالب متنی Prometheus"""
+        merged: Dict[tuple, object] = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot:
+                _merge(merged, (name, tuple(map(tuple, labels))), value)
+
+        lines = []
+        for name, definition in self._definitions.items():
+            lines.append(f"# HELP {name} {definition['help']}")
+            lines.append(f"# TYPE {name} {definition['type']}")
+            for (metric, labels), value in sorted(merged.items(), key=lambda item: item[0]):
+                if metric != name:
+                    continue
+                if definition["type"] == "histogram":
+                    lines.extend(_render_histogram(name, labels, value, definition["buckets"]))
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge(merged: dict, key: tuple, value) -> None:
+    current = merged.get(key)
+    if isinstance(value, list):
+        if current is None:
+            merged[key] = list(value)
+        else:
+            for index, item in enumerate(value):
+                current[index] += item
+    else:
+        merged[key] = (current or 0) + value
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _render_histogram(name: str, labels: Labels, state: list, buckets: tuple) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(list(buckets) + ["+Inf"], state[:-1]):
+        cumulative += count
+        le = bound if bound == "+Inf" else _format_value(bound)
+        lines.append(f"{name}_bucket{_format_labels(labels, ('le', str(le)))} {cumulative}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(state[-1])}")
+    lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return lines
+
+
+class MultiProcessCollector:
+    """
+    ادغام متریک‌های چند worker uvicorn از طریق فایل‌های snapshot
+
+    هر worker در یک thread پس‌زمینه هر flush_interval ثانیه snapshot خود را اتمیک (rename)
+    می‌نویسد (بدون I/O فایل روی event loop). فایل workerهای مرده هنگام scrape در archive.json
+    ادغام و حذف می‌شود: gaugeهایشان کنار گذاشته و counter/histogramها حفظ می‌شوند
+    """
+
+    ARCHIVE_FILE = "archive.json"
+
+    def __init__(self, registry: MetricsRegistry, directory: str, flush_interval: float = 1.0):
+        self.registry = registry
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics_{pid}.json")
+
+    def start(self) -> None:
+        """شروع thread نوشتن دوره‌ای snapshot این worker"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.flush()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"⚠️ خطا در نوشتن snapshot متریک‌ها: {e}")
+
+    def flush(self) -> None:
+        path = self._path(os.getpid())
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(self.registry.snapshot(), handle)
+        os.replace(temp_path, path)
+
+    def collect(self) -> List[List[list]]:
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            pid = int(os.path.basename(path)[len("metrics_"):-len(".json")])
+            if not _pid_alive(pid) and fcntl is not None:
+                self._archive(path)
+                continue
+            snapshot = _read_snapshot(path)
+            if snapshot is None:
+                continue
+            if not _pid_alive(pid):
+                snapshot = self._without_gauges(snapshot)
+            snapshots.append(snapshot)
+
+        archive = _read_snapshot(os.path.join(self.directory, self.ARCHIVE_FILE))
+        if archive:
+            snapshots.append(archive)
+        return snapshots
+
+    def _without_gauges(self, snapshot: List[list]) -> List[list]:
+        return [item for item in snapshot if self.registry._definitions.get(item[0], {}).get("type") != "gauge"]
+
+    def _archive(self, path: str) -> None:
+        """ادغام فایل worker مرده در archive.json و حذف آن (rename اتمیک: فقط یک worker آن را برمی‌دارد)"""
+        claimed = f"{path}.{os.getpid()}.archiving"
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return
+        snapshot = _read_snapshot(claimed) or []
+
+        archive_path = os.path.join(self.directory, self.ARCHIVE_FILE)
+        with open(os.path.join(self.directory, "archive.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            merged: Dict[tuple, object] = {}
+            for name, labels, value in (_read_snapshot(archive_path) or []) + self._without_gauges(snapshot):
+                _merge(merged, (name, tuple(map(tuple, labels))), value)
+            temp_path = f"{archive_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                json.dump([[name, list(map(list, labels)), value] for (name, labels), value in merged.items()], handle)
+            os.replace(temp_path, archive_path)
+        os.remove(claimed)
+
+
+def _read_snapshot(path: str) -> Optional[List[list]]:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# رجیستری سراسری و تعریف متریک‌های برنامه
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter("http_requests_total", "Total HTTP requests by method, route and status")
+HTTP_LATENCY = registry.histogram("http_request_duration_seconds", "HTTP request latency by method and route")
+HTTP_IN_FLIGHT = registry.gauge("http_requests_in_flight", "HTTP requests currently being served")
+DB_QUERIES = registry.histogram("db_queries_per_request", "SQL statements executed per request", DEFAULT_COUNT_BUCKETS)
+DB_SESSIONS = registry.histogram("db_sessions_per_request", "Database session transactions begun per request", DEFAULT_COUNT_BUCKETS)
+CACHE_REQUESTS = registry.counter("cache_requests_total", "Cache lookups by cache name and result (hit/miss)")
+AUTH_REQUESTS = registry.counter("auth_requests_total", "Authentication checks by kind and result")
+
+_collector: Optional[MultiProcessCollector] = None
+
+
+def get_collector() -> Optional[MultiProcessCollector]:
+    """collector چند-processی اگر METRICS_MULTIPROC_DIR تنظیم شده باشد"""
+    global _collector
+    directory = settings.METRICS_MULTIPROC_DIR
+    if directory and _collector is None:
+        _collector = MultiProcessCollector(registry, directory)
+        _collector.start()
+    return _collector
+
+
+def render_metrics() -> str:
+    """خروجی /metrics - در حالت چند worker همه workerها ادغام می‌شوند"""
+    collector = get_collector()
+    snapshots = collector.collect() if collector else [registry.snapshot()]
+    return registry.render(snapshots)
+
+
+def require_metrics_access(request: Request) -> None:
+    """
+    dependency مسیر /metrics: توکن Bearer برابر METRICS_TOKEN یا IP کلاینت در METRICS_ALLOWED_IPS
+    (IP پشت پروکسی با همان TRUSTED_PROXIES میدلور امنیتی تعیین می‌شود)
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get("authorization", "")
+    if token and authorization.startswith("Bearer ") and hmac.compare_digest(authorization[7:], token):
+        return
+
+    client_ip = resolve_client_ip(request.scope, parse_networks(settings.TRUSTED_PROXIES))
+    if ip_in_networks(client_ip, parse_networks(settings.METRICS_ALLOWED_IPS)):
+        return
+    raise HTTPException(status_code=403, detail="Forbidden")
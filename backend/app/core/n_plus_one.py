@@ -0,0 +1,108 @@
+# backend/app/core/n_plus_one.py
+"""
+تشخیص الگوی N+1 در دسترسی ORM
+
+در هر درخواست تعداد اجرای هر fingerprint دستور SQL شمرده می‌شود؛ اگر یک دستور
+بیش از threshold بار تکرار شود (مثلاً lazy load پروفایل در حلقه) در حالت warn هشدار
+و در حالت raise (اجرای تست‌ها) NPlusOneError رخ می‌دهد
+"""
+import logging
+from contextlib import contextmanager
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.metrics import registry
+from app.core.query_profiler import fingerprint, normalize_sql
+from app.core.request_context import begin_request, end_request, current_request
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_DETECTIONS = registry.counter("db_n_plus_one_total", "Requests where a statement repeated past the N+1 threshold")
+
+MODES = ("off", "warn", "raise")
+
+
+class NPlusOneError(Exception):
+    """تکرار یک دستور SQL بیش از حد مجاز در یک درخواست"""
+
+
+@lru_cache(maxsize=4096)
+def _statement_fingerprint(statement: str):
+    # رشته دستورات از کش کامپایل SQLAlchemy یکسان است؛ نرمال‌سازی برای هر رشته یک بار انجام می‌شود
+    normalized = normalize_sql(statement)
+    return fingerprint(normalized), normalized
+
+
+class NPlusOneDetector:
+    """listener شمارش fingerprintها روی engine"""
+
+    def __init__(self, threshold: int = 10, mode: str = "warn"):
+        if mode not in MODES:
+            raise ValueError(f"حالت نامعتبر برای تشخیص N+1: {mode}")
+        self.threshold = threshold
+        self.mode = mode
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        request = current_request()
+        if request is None or request.repeat_allowed:
+            return
+
+        statement_fingerprint, normalized = _statement_fingerprint(statement)
+        count = request.statement_counts.get(statement_fingerprint, 0) + 1
+        request.statement_counts[statement_fingerprint] = count
+        if count != self.threshold + 1:
+            return
+
+        # فقط یک بار برای هر fingerprint در هر درخواست گزارش می‌شود
+        registry.inc(N_PLUS_ONE_DETECTIONS, {"route": request.route})
+        message = (
+            f"N+1 query on {request.method} {request.route}: statement ran more than "
+            f"{self.threshold} times - {normalized[:300]}"
+        )
+        if self.mode == "raise":
+            raise NPlusOneError(message)
+        logger.warning(message)
+        print(f"⚠️ {message}")
+
+
+def install_n_plus_one_detector(engine, threshold: int, mode: str) -> Optional[NPlusOneDetector]:
+    """اتصال تشخیص‌دهنده به engine (mode=off چیزی نصب نمی‌کند)"""
+    if mode == "off":
+        return None
+    detector = NPlusOneDetector(threshold, mode)
+    event.listen(engine, "before_cursor_execute", detector.before_cursor_execute)
+    return detector
+
+
+@contextmanager
+def allow_repeated_queries():
+    """
+    غیرفعال کردن موقت تشخیص برای تکرار عمدی (پردازش دسته‌ای chunk به chunk)
+    """
+    request = current_request()
+    if request is None:
+        yield
+        return
+    request.repeat_allowed += 1
+    try:
+        yield
+    finally:
+        request.repeat_allowed -= 1
+
+
+@contextmanager
+def n_plus_one_guard(label: str = "guard"):
+    """
+    زمینه شمارش مستقل از HTTP - برای بررسی سرویس‌ها در تست‌ها و اسکریپت‌ها
+
+        with n_plus_one_guard("regular-users-listing"):
+            manager.get_users_by_type("admin")
+    """
+    token = begin_request({"type": "http", "method": "GUARD", "path": label, "route": SimpleNamespace(path=label)})
+    try:
+        yield current_request()
+    finally:
+        end_request(token)
@@ -1,3 +1,4 @@
+import functools
 from fastapi import HTTPException, status
 from app.models.admin_models import AdminRole
 
@@ -92,8 +93,10 @@ def check_permission(current_user, required_permission: str):
 # دکوریتور برای بررسی دسترسی
 def require_permission(permission: str):
     def decorator(func):
+        # functools.wraps: FastAPI امضای تابع اصلی (پارامترها و Dependها) را می‌بیند
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            current_user = kwargs.get('current_user')
+            current_user = kwargs.get('current_user') or kwargs.get('current_admin')
             if not current_user:
                 # اگر current_user در kwargs نبود، در args جستجو کن
                 for arg in args:
@@ -104,4 +107,4 @@ def require_permission(permission: str):
             check_permission(current_user, permission)
             return await func(*args, **kwargs)
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,127 @@
+# backend/app/core/pool_monitor.py
+"""
+مشاهده‌پذیری pool اتصال‌های دیتابیس
+
+- زمان انتظار checkout (histogram)، اتصال‌های در حال استفاده و overflow مصرف‌شده (gauge)
+- sessionهایی که بدون close توسط garbage collector جمع می‌شوند (اتصال نشت‌کرده)
+- اشباع pool: انتظار checkout حداکثر DB_POOL_TIMEOUT ثانیه طول می‌کشد و سپس
+  درخواست فوراً 503 با Retry-After می‌گیرد، به جای صف شدن تا timeout طولانی
+"""
+import threading
+import weakref
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+from app.core.metrics import registry
+from app.core.request_context import current_request
+
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+DB_POOL_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", POOL_WAIT_BUCKETS
+)
+DB_POOL_CHECKED_OUT = registry.gauge("db_pool_checked_out", "Connections currently checked out of the pool")
+DB_POOL_OVERFLOW = registry.gauge("db_pool_overflow_in_use", "Checked out connections beyond pool_size")
+DB_POOL_TIMEOUTS = registry.counter("db_pool_timeouts_total", "Checkouts that gave up because the pool was saturated")
+DB_SESSIONS_LEAKED = registry.counter(
+    "db_sessions_leaked_total", "Sessions garbage collected with an open transaction (never closed)"
+)
+
+
+def _pool_name(pool) -> str:
+    return pool.logging_name or "default"
+
+
+def record_checkout_wait(pool, seconds: float, timed_out: bool) -> None:
+    """فراخوانی از کلاس‌های pool در app.database پس از هر checkout"""
+    if timed_out:
+        registry.inc(DB_POOL_TIMEOUTS, {"pool": _pool_name(pool)})
+    registry.observe(DB_POOL_WAIT, seconds, {"pool": _pool_name(pool)})
+
+
+class PoolMonitor:
+    """به‌روزرسانی gaugeهای pool در eventهای checkout / checkin"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._overflow_reported = 0
+        self._lock = threading.Lock()
+
+    def _sync_overflow(self, pool) -> None:
+        if not hasattr(pool, "size"):
+            return  # NullPool / SingletonThreadPool: overflow معنا ندارد
+        with self._lock:
+            overflow = max(0, pool.checkedout() - pool.size())
+            delta = overflow - self._overflow_reported
+            self._overflow_reported = overflow
+        if delta:
+            registry.inc(DB_POOL_OVERFLOW, {"pool": _pool_name(pool)}, delta)
+
+    def checkout(self, dbapi_connection, connection_record, connection_proxy):
+        registry.inc(DB_POOL_CHECKED_OUT, {"pool": _pool_name(self.engine.pool)})
+        self._sync_overflow(self.engine.pool)
+
+    def checkin(self, dbapi_connection, connection_record):
+        registry.inc(DB_POOL_CHECKED_OUT, {"pool": _pool_name(self.engine.pool)}, -1)
+        self._sync_overflow(self.engine.pool)
+
+
+def install_pool_monitor(engine) -> PoolMonitor:
+    """اتصال gaugeهای pool به engine (زمان انتظار در MonitoredQueuePool اندازه‌گیری می‌شود)"""
+    monitor = PoolMonitor(engine)
+    event.listen(engine, "checkout", monitor.checkout)
+    event.listen(engine, "checkin", monitor.checkin)
+    return monitor
+
+
+# --- تشخیص session نشت‌کرده ---
+
+def _report_leak(state: list) -> None:
+    open_transaction, route = state
+    if not open_transaction:
+        return
+    registry.inc(DB_SESSIONS_LEAKED, {"route": route})
+    print(f"⚠️ session دیتابیس بدون close جمع‌آوری شد (route: {route}) - اتصال تا GC در اختیار آن بود")
+
+
+def _track_begin(session, transaction, connection):
+    state = session.info.get("_leak_state")
+    if state is None:
+        request = current_request()
+        # finalizer فقط state را نگه می‌دارد، نه خود session را
+        state = session.info["_leak_state"] = [False, request.route if request else "background"]
+        weakref.finalize(session, _report_leak, state)
+    state[0] = True
+
+
+def _track_end(session, transaction):
+    if transaction.parent is None:
+        state = session.info.get("_leak_state")
+        if state is not None:
+            state[0] = False
+
+
+def install_session_leak_detector() -> None:
+    """ثبت sessionهایی که با تراکنش باز از بین می‌روند (برای همه کلاس‌های Session)"""
+    if not event.contains(Session, "after_begin", _track_begin):
+        event.listen(Session, "after_begin", _track_begin)
+        event.listen(Session, "after_transaction_end", _track_end)
+
+
+# --- پاسخ سریع هنگام اشباع ---
+
+def make_pool_saturated_handler(retry_after: int):
+    """exception handler برای TimeoutError pool: 503 با Retry-After"""
+
+    async def pool_saturated_handler(request: Request, exc: PoolTimeoutError):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "سرویس موقتاً مشغول است، لطفاً کمی بعد دوباره تلاش کنید"},
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    return pool_saturated_handler
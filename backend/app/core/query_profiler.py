@@ -0,0 +1,202 @@
+# backend/app/core/query_profiler.py
+"""
+پروفایل کوئری‌های SQLAlchemy و ثبت کوئری‌های کند در system_logs
+
+- زمان هر دستور با eventهای before/after_cursor_execute اندازه‌گیری و به route جاری نسبت داده می‌شود
+- دستورات کندتر از آستانه با SQL نرمال‌شده، fingerprint و شکل پارامترها
+  در صف قرار می‌گیرند و یک thread پس‌زمینه آن‌ها را دسته‌ای در system_logs می‌نویسد
+"""
+import atexit
+import hashlib
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, insert
+
+from app.core.metrics import registry
+from app.core.request_context import current_request
+
+SLOW_QUERY_MODULE = "slow_query"
+
+DB_QUERY_LATENCY = registry.histogram(
+    "db_query_duration_seconds", "SQL statement latency by route",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+SLOW_QUERIES = registry.counter("db_slow_queries_total", "Slow SQL statements by route and outcome (logged/dropped)")
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PARAMS = re.compile(r"%\(\w+\)s|:\w+|\$\d+|\?")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LISTS = re.compile(r"(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.I)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """حذف مقادیر ثابت و یکسان‌سازی placeholderها تا کوئری‌های هم‌شکل یکی شوند"""
+    sql = _COMMENTS.sub(" ", statement)
+    sql = _STRINGS.sub("?", sql)
+    sql = _PARAMS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _IN_LISTS.sub("(?...)", sql)
+    sql = _VALUES_LISTS.sub(r"\1, ...", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized_sql: str) -> str:
+    return hashlib.sha1(normalized_sql.encode("utf-8")).hexdigest()[:16]
+
+
+def _value_shape(parameters) -> Any:
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def params_shape(parameters, executemany: bool) -> Any:
+    """شکل پارامترها (نام و نوع، بدون مقدار) - داده حساس در لاگ ذخیره نمی‌شود"""
+    if executemany and isinstance(parameters, (list, tuple)):
+        return {"rows": len(parameters), "row": _value_shape(parameters[0]) if parameters else None}
+    return _value_shape(parameters)
+
+
+class SlowQueryWriter:
+    """
+    نویسنده غیرمسدودکننده لاگ کوئری‌های کند
+
+    submit فقط در صف قرار می‌دهد (در صورت پر بودن صف رکورد حذف و شمرده می‌شود)؛
+    thread پس‌زمینه هر batch_size رکورد یا هر flush_interval ثانیه یک INSERT چندردیفی اجرا می‌کند
+    """
+
+    def __init__(self, engine, batch_size: int = 100, flush_interval: float = 1.0, max_queue: int = 10_000):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def in_writer(self) -> bool:
+        """آیا thread جاری خود نویسنده است (کوئری‌های نویسنده پروفایل نمی‌شوند)"""
+        return getattr(self._local, "active", False)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-query-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def submit(self, entry: Dict[str, Any]) -> bool:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            return False
+
+    def _run(self) -> None:
+        self._local.active = True
+        while True:
+            batch: List[Dict[str, Any]] = []
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        from app.models.audit_models import SystemLog
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(SystemLog), batch)
+        except Exception as e:
+            print(f"⚠️ خطا در ثبت لاگ کوئری‌های کند: {e}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """تخلیه صف و توقف thread (در خروج برنامه)"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+class QueryProfiler:
+    """اندازه‌گیری زمان هر دستور SQL و ارسال کوئری‌های کند به SlowQueryWriter"""
+
+    def __init__(self, threshold_ms: float, writer: SlowQueryWriter):
+        self.threshold = threshold_ms / 1000.0
+        self.writer = writer
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profiler_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_profiler_started", None)
+        if started is None or self.writer.in_writer:
+            return
+        elapsed = time.perf_counter() - started
+
+        request = current_request()
+        route = request.route if request else "background"
+        registry.observe(DB_QUERY_LATENCY, elapsed, {"route": route})
+
+        if elapsed < self.threshold:
+            return
+
+        normalized = normalize_sql(statement)
+        duration_ms = round(elapsed * 1000, 2)
+        logged = self.writer.submit({
+            "level": "WARNING",
+            "module": SLOW_QUERY_MODULE,
+            "message": f"Slow query ({duration_ms} ms) on {route}",
+            "details": {
+                "fingerprint": fingerprint(normalized),
+                "sql": normalized,
+                "params_shape": params_shape(parameters, executemany),
+                "duration_ms": duration_ms,
+                "route": route,
+                "method": request.method if request else None,
+                "executemany": executemany,
+            },
+            "ip_address": request.client_ip if request else None,
+        })
+        registry.inc(SLOW_QUERIES, {"route": route, "outcome": "logged" if logged else "dropped"})
+
+
+def install_query_profiler(engine, threshold_ms: float, writer: Optional[SlowQueryWriter] = None) -> Optional[QueryProfiler]:
+    """
+    اتصال پروفایلر به engine
+
+    threshold_ms <= 0 پروفایلر را غیرفعال می‌کند
+    """
+    if threshold_ms <= 0:
+        return None
+    profiler = QueryProfiler(threshold_ms, writer or SlowQueryWriter(engine))
+    event.listen(engine, "before_cursor_execute", profiler.before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", profiler.after_cursor_execute)
+    return profiler
@@ -0,0 +1,94 @@
+# backend/app/core/request_context.py
+"""
+زمینه (context) درخواست جاری برای ابزارهای اندازه‌گیری
+
+میدلور متریک برای هر درخواست HTTP یک RequestContext می‌سازد؛ listenerهای SQLAlchemy
+که در threadpool اجرا می‌شوند همان شیء را از ContextVar می‌خوانند
+
+آدرس واقعی کلاینت پشت پروکسی‌های مورد اعتماد هم اینجاست (مشترک بین /metrics و میدلور امنیتی)
+"""
+import ipaddress
+from contextvars import ContextVar, Token
+from typing import Iterable, List, Optional
+
+from starlette.datastructures import Headers
+from starlette.types import Scope
+
+
+class RequestContext:
+    """آمار دیتابیس و اطلاعات مسیر یک درخواست"""
+
+    __slots__ = ("scope", "query_count", "session_count", "statement_counts", "repeat_allowed")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.query_count = 0
+        self.session_count = 0
+        # تعداد اجرای هر fingerprint دستور SQL (برای تشخیص N+1)
+        self.statement_counts = {}
+        self.repeat_allowed = 0
+
+    @property
+    def route(self) -> str:
+        """الگوی مسیر (پس از routing) یا "unmatched" """
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    @property
+    def method(self) -> str:
+        return self.scope.get("method", "")
+
+    @property
+    def client_ip(self) -> Optional[str]:
+        client = self.scope.get("client")
+        return client[0] if client else None
+
+
+_current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+
+def begin_request(scope: Scope) -> Token:
+    return _current_request.set(RequestContext(scope))
+
+
+def end_request(token: Token) -> None:
+    _current_request.reset(token)
+
+
+def current_request() -> Optional[RequestContext]:
+    """زمینه درخواست جاری (None خارج از درخواست HTTP، مثلاً seed یا اسکریپت‌ها)"""
+    return _current_request.get()
+
+
+# --- IP کلاینت ---
+
+def parse_networks(value: str) -> List[ipaddress._BaseNetwork]:
+    """'10.0.0.1,172.16.0.0/12' → لیست شبکه‌ها (پروکسی‌های مورد اعتماد، allowlist)"""
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()]
+
+
+def ip_in_networks(address: str, networks: Iterable[ipaddress._BaseNetwork]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def resolve_client_ip(scope: Scope, trusted_proxies: Iterable[ipaddress._BaseNetwork] = ()) -> str:
+    """
+    IP واقعی کلاینت
+
+    فقط وقتی اتصال از یک پروکسی مورد اعتماد آمده باشد X-Forwarded-For خوانده می‌شود و
+    اولین آدرس غیرمورد اعتماد از سمت راست انتخاب می‌شود (کلاینت نمی‌تواند آن را جعل کند)
+    """
+    client = scope.get("client")
+    client_ip = client[0] if client else "unknown"
+    if not trusted_proxies or not ip_in_networks(client_ip, trusted_proxies):
+        return client_ip
+
+    forwarded = Headers(scope=scope).get("x-forwarded-for", "")
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        if not ip_in_networks(hop, trusted_proxies):
+            return hop
+    return client_ip
@@ -1,17 +1,59 @@
 # backend/app/core/user_management.py
+from sqlalchemy import update
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import func  # ✅ اضافه کردن این import
 from contextlib import contextmanager
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 
 from app.models.user_models import User, RegularUserProfile, AdminUserProfile, StaffUserProfile, UserStatus
 from app.core.auth import pwd_context  # ✅ تغییر از security به auth
-from app.core.audit_logger import log_audit  # ✅ تغییر از audit_logger به log_audit
+from app.core.audit_logger import log_audit, log_audit_batch  # ✅ تغییر از audit_logger به log_audit
+from app.core.user_search import apply_user_search
+from app.core.n_plus_one import allow_repeated_queries
+from app.utils.pagination import apply_keyset, apply_time_range
 
 logger = logging.getLogger(__name__)
 
+# اندازه هر دسته در عملیات گروهی (محدودیت پارامترهای IN در SQLite)
+BULK_CHUNK_SIZE = 500
+
+# نگاشت وضعیت جدید به نوع action در audit
+STATUS_AUDIT_ACTIONS = {
+    UserStatus.ACTIVE: "activate",
+    UserStatus.SUSPENDED: "suspend",
+}
+
+# رابطه پروفایل هر نوع کاربر (برای eager load در لیست‌ها)
+PROFILE_RELATIONSHIPS = {
+    "regular": User.regular_profile,
+    "admin": User.admin_profile,
+    "staff": User.staff_profile,
+}
+
+# ستون‌های لیست کاربران عادی (همان فیلدهایی که در پاسخ API سریالایز می‌شوند)
+REGULAR_LISTING_COLUMNS = (
+    User.id,
+    User.public_id,
+    User.email,
+    User.phone,
+    User.first_name,
+    User.last_name,
+    User.full_name,
+    User.status,
+    User.email_verified,
+    User.phone_verified,
+    User.created_at,
+    User.last_login,
+    User.national_id,
+    User.country,
+    User.city,
+    func.coalesce(RegularUserProfile.balance, 0).label("balance"),
+    func.coalesce(RegularUserProfile.risk_level, "low").label("risk_level"),
+    func.coalesce(RegularUserProfile.credit_score, 0).label("credit_score"),
+)
+
 class CentralUserManager:
     """سیستم مرکزی مدیریت همه انواع کاربران"""
     
@@ -117,25 +159,163 @@ class CentralUserManager:
         """دریافت کاربر بر اساس ایمیل"""
         return self.db.query(User).filter(User.email == email).first()
     
-    def get_users_by_type(self, user_type: str, skip: int = 0, limit: int = 100, 
-                         filters: Dict[str, Any] = None) -> List[User]:
-        """دریافت کاربران بر اساس نوع"""
-        query = self.db.query(User).filter(User.user_type == user_type)
+    def _users_query(self, query, user_type: str, filters: Dict[str, Any] = None):
+        """اعمال فیلترهای مشترک لیست کاربران"""
+        query = query.filter(User.user_type == user_type)
         
         if filters:
             if filters.get('status'):
                 query = query.filter(User.status == filters['status'])
             if filters.get('is_active') is not None:
                 query = query.filter(User.is_active == filters['is_active'])
+            if filters.get('email_verified') is not None:
+                query = query.filter(User.email_verified == filters['email_verified'])
+            if filters.get('phone_verified') is not None:
+                query = query.filter(User.phone_verified == filters['phone_verified'])
+            if filters.get('created_from') or filters.get('created_to'):
+                query = apply_time_range(query, User.created_at, filters.get('created_from'), filters.get('created_to'))
             if filters.get('search'):
-                search_term = f"%{filters['search']}%"
-                query = query.filter(
-                    (User.email.ilike(search_term)) |
-                    (User.full_name.ilike(search_term)) |
-                    (User.phone.ilike(search_term))
-                )
+                query = apply_user_search(query, self.db, filters['search'])
+        
+        return query
+    
+    def _paginate(self, query, skip: int, limit: int, cursor: Optional[str]):
+        """صفحه‌بندی keyset (با cursor) یا offset"""
+        query = apply_keyset(query, User.created_at, User.id, cursor)
+        if not cursor and skip:
+            query = query.offset(skip)
+        return query.limit(limit)
+    
+    def get_users_by_type(self, user_type: str, skip: int = 0, limit: int = 100, 
+                         filters: Dict[str, Any] = None, cursor: Optional[str] = None,
+                         include_profile: bool = False) -> List[User]:
+        """
+        دریافت کاربران بر اساس نوع
+
+        با cursor صفحه‌بندی keyset روی (created_at, id) انجام می‌شود و skip نادیده گرفته می‌شود؛
+        include_profile پروفایل همان نوع را با join بارگذاری می‌کند (بدون lazy load در حلقه)
+        """
+        query = self.db.query(User)
+        if include_profile and user_type in PROFILE_RELATIONSHIPS:
+            query = query.options(joinedload(PROFILE_RELATIONSHIPS[user_type]))
+        query = self._users_query(query, user_type, filters)
+        return self._paginate(query, skip, limit, cursor).all()
+    
+    def get_regular_user_rows(self, skip: int = 0, limit: int = 100,
+                              filters: Dict[str, Any] = None, cursor: Optional[str] = None) -> List[Any]:
+        """
+        لیست سبک کاربران عادی برای جدول مدیریت
+
+        یک کوئری با join روی regular_user_profiles که فقط ستون‌های لازم را برمی‌گرداند
+        (Row به جای شیء ORM - بدون lazy load پروفایل برای هر ردیف)
+        """
+        query = self.db.query(
+            *REGULAR_LISTING_COLUMNS
+        ).outerjoin(
+            RegularUserProfile, RegularUserProfile.user_id == User.id
+        )
+        query = self._users_query(query, "regular", filters)
+        return self._paginate(query, skip, limit, cursor).all()
+    
+    def _iter_id_chunks(self, user_type: str, ids: Optional[List[int]] = None,
+                        filters: Dict[str, Any] = None, chunk_size: int = BULK_CHUNK_SIZE) -> Iterator[List[int]]:
+        """
+        تقسیم کاربران انتخاب‌شده به دسته‌های ID
+
+        با لیست ID همان لیست دسته‌بندی می‌شود؛ با فیلتر، IDها به صورت keyset روی id خوانده می‌شوند
+        """
+        if ids is not None:
+            unique_ids = sorted(set(ids))
+            for start in range(0, len(unique_ids), chunk_size):
+                yield unique_ids[start:start + chunk_size]
+            return
+        
+        last_id = 0
+        while True:
+            query = self._users_query(self.db.query(User.id), user_type, filters)
+            chunk = [row.id for row in query.filter(User.id > last_id).order_by(User.id).limit(chunk_size)]
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1]
+    
+    def bulk_update_status(self, user_type: str, status: UserStatus, ids: Optional[List[int]] = None,
+                           filters: Dict[str, Any] = None, reason: str = "",
+                           admin_user_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        تغییر گروهی وضعیت کاربران
+
+        برای هر دسته یک UPDATE ... WHERE id IN (...) و یک INSERT چندردیفی audit اجرا می‌شود
+        """
+        from app.services.user_stats import user_stats_service
+        
+        result = {"matched": 0, "updated": 0, "chunks": 0}
+        action = STATUS_AUDIT_ACTIONS.get(status, "update")
+        
+        # تکرار دستورات برای هر دسته عمدی است و N+1 محسوب نمی‌شود
+        with allow_repeated_queries():
+            for chunk in self._iter_id_chunks(user_type, ids, filters):
+                with self._transaction():
+                    changed = self.db.query(User.id, User.status).filter(
+                        User.id.in_(chunk),
+                        User.user_type == user_type
+                    ).all()
+                    result["matched"] += len(changed)
+                    changed = [row for row in changed if row.status != status]
+                
+                    if changed:
+                        self.db.execute(
+                            update(User)
+                            .where(User.id.in_([row.id for row in changed]))
+                            .values(status=status)
+                            .execution_options(synchronize_session=False)
+                        )
+                        log_audit_batch(self.db, [
+                            {
+                                "action": action,
+                                "resource_type": "user",
+                                "resource_id": row.id,
+                                "admin_user_id": admin_user_id,
+                                "description": f"Bulk status change from {row.status.value} to {status.value}"
+                                               + (f": {reason}" if reason else ""),
+                                "old_values": {"status": row.status.value},
+                                "new_values": {"status": status.value},
+                            }
+                            for row in changed
+                        ])
+            
+                result["updated"] += len(changed)
+                result["chunks"] += 1
         
-        return query.offset(skip).limit(limit).all()
+        user_stats_service.invalidate()
+        return result
+    
+    def bulk_set_verified(self, user_type: str, field: str, ids: Optional[List[int]] = None,
+                          filters: Dict[str, Any] = None) -> Dict[str, int]:
+        """تأیید گروهی ایمیل یا تلفن (field: email_verified / phone_verified)"""
+        if field not in ("email_verified", "phone_verified"):
+            raise ValueError(f"فیلد نامعتبر: {field}")
+        
+        column = getattr(User, field)
+        result = {"updated": 0, "chunks": 0}
+        
+        with allow_repeated_queries():
+            for chunk in self._iter_id_chunks(user_type, ids, filters):
+                with self._transaction():
+                    updated = self.db.execute(
+                        update(User)
+                        .where(
+                            User.id.in_(chunk),
+                            User.user_type == user_type,
+                            (column.is_(None)) | (column == False)
+                        )
+                        .values({field: True})
+                        .execution_options(synchronize_session=False)
+                    )
+                result["updated"] += updated.rowcount
+                result["chunks"] += 1
+        
+        return result
     
     def authenticate_user(self, identifier: str, password: str, user_type: str = None) -> Optional[User]:
         """احراز هویت کاربر"""
@@ -212,12 +392,10 @@ class CentralUserManager:
         self.db.commit()
         return True
 
-# ایجاد instance全局 (اختیاری)
-user_manager = None
-
 def get_user_manager(db: Session) -> CentralUserManager:
-    """Get user manager instance (برای dependency injection)"""
-    global user_manager
-    if user_manager is None:
-        user_manager = CentralUserManager(db)
-    return user_manager
\ No newline at end of file
+    """Get user manager instance (برای dependency injection)
+
+    برای هر درخواست نمونه جدید با session همان درخواست؛ نمونه سراسری session اولین
+    درخواست را برای همیشه نگه می‌داشت (اتصال pool هرگز آزاد نمی‌شد و بین threadها مشترک بود)
+    """
+    return CentralUserManager(db)
\ No newline at end of file
@@ -0,0 +1,113 @@
+# backend/app/core/user_search.py
+import logging
+from typing import Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.user_models import User
+from app.utils.text_normalization import normalize_search_term
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FTS_TABLE = "users_search_fts"
+MIN_TRIGRAM_LENGTH = 3
+
+# آیا جدول FTS5 روی SQLite ساخته شده است (با ensure_search_index مقداردهی می‌شود)
+_sqlite_fts_ready = False
+
+_SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_FTS_TABLE}
+        USING fts5(search_text, content='users', content_rowid='id', tokenize='trigram')""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_search_ai AFTER INSERT ON users BEGIN
+        INSERT INTO {SEARCH_FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_search_ad AFTER DELETE ON users BEGIN
+        INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_search_au AFTER UPDATE OF search_text ON users BEGIN
+        INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        INSERT INTO {SEARCH_FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+]
+
+_POSTGRES_TRGM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_user_search_trgm ON users USING gin (search_text gin_trgm_ops)",
+]
+
+
+def ensure_search_column(engine: Engine) -> bool:
+    """
+    افزودن ستون users.search_text به دیتابیس‌های ساخته‌شده پیش از آن (create_all ستون اضافه نمی‌کند)؛
+    True اگر ستون همین حالا اضافه شد (کاربران موجود باید backfill شوند)
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns(User.__tablename__)}
+    if "search_text" in columns:
+        return False
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {User.__tablename__} ADD COLUMN search_text TEXT"))
+    return True
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """
+    ساخت ایندکس جستجوی کاربران (idempotent)
+
+    - PostgreSQL: ایندکس GIN با pg_trgm روی search_text
+    - SQLite: جدول FTS5 با tokenizer سه‌حرفی + تریگرهای همگام‌سازی
+    """
+    global _sqlite_fts_ready
+
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            for statement in _POSTGRES_TRGM_DDL:
+                conn.execute(text(statement))
+        elif engine.dialect.name == "sqlite":
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": SEARCH_FTS_TABLE}
+            ).first()
+            for statement in _SQLITE_FTS_DDL:
+                conn.execute(text(statement))
+            if not existed:
+                # ایندکس کردن ردیف‌های موجود
+                conn.execute(text(f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}) VALUES ('rebuild')"))
+            _sqlite_fts_ready = True
+
+
+def backfill_search_text(db: Session, batch_size: int = 1000) -> int:
+    """پر کردن search_text برای کاربرانی که قبل از این ستون ساخته شده‌اند"""
+    updated = 0
+    while True:
+        users = db.query(User).filter(User.search_text.is_(None)).limit(batch_size).all()
+        if not users:
+            break
+        for user in users:
+            # listener مدل search_text را هنگام flush محاسبه می‌کند
+            user.search_text = ""
+        db.commit()
+        updated += len(users)
+    return updated
+
+
+def apply_user_search(query, db: Session, term: Optional[str]):
+    """اعمال فیلتر جستجو روی کوئری کاربران با استفاده از ایندکس جستجو"""
+    normalized = normalize_search_term(term)
+    if not normalized:
+        return query
+
+    if (
+        _sqlite_fts_ready
+        and db.get_bind().dialect.name == "sqlite"
+        and len(normalized) >= MIN_TRIGRAM_LENGTH
+    ):
+        phrase = '"' + normalized.replace('"', '""') + '"'
+        return query.filter(
+            text(f"users.id IN (SELECT rowid FROM {SEARCH_FTS_TABLE} WHERE {SEARCH_FTS_TABLE} MATCH :search_phrase)")
+        ).params(search_phrase=phrase)
+
+    # PostgreSQL: LIKE روی search_text از ایندکس GIN trigram استفاده می‌کند
+    escaped = normalized.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return query.filter(User.search_text.like(f"%{escaped}%", escape="\\"))
@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import time
 from dotenv import load_dotenv
 
 # بارگذاری متغیرهای محیطی
@@ -10,17 +13,103 @@ load_dotenv()
 # تنظیمات دیتابیس - از SQLite برای توسعه استفاده می‌کنیم
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./parsagold.db")
 
-# ایجاد موتور دیتابیس
-if DATABASE_URL.startswith("sqlite"):
+# پروفایل SQLite: tuned (WAL + pragmaها + pool) یا legacy (تنظیمات قبلی)
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "tuned").lower()
+
+# حداکثر انتظار برای گرفتن اتصال از pool؛ پس از آن درخواست 503 می‌گیرد (pool اشباع)
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "3"))
+
+
+class _TimedCheckout:
+    """اندازه‌گیری زمان انتظار در Pool.connect (شامل ساخت اتصال جدید) برای متریک‌های pool"""
+
+    def connect(self):
+        from app.core.pool_monitor import record_checkout_wait
+
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            record_checkout_wait(self, time.perf_counter() - started, timed_out)
+
+
+class MonitoredQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool با زمان‌سنجی checkout"""
+
+
+class MonitoredAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """pool engineهای async (asyncpg) با زمان‌سنجی checkout"""
+
+
+# pragmaهای پروفایل tuned - روی هر اتصال جدید اعمال می‌شوند
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",           # خواننده‌ها نویسنده را مسدود نمی‌کنند
+    "synchronous": "NORMAL",         # fsync فقط هنگام checkpoint (در WAL ایمن است)
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),  # منفی = کیلوبایت
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+    "wal_autocheckpoint": 1000,
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def create_sqlite_engine(url: str, profile: str = "tuned", pool_size: int = None, max_overflow: int = None,
+                         pool_name: str = "primary"):
+    """
+    ساخت engine برای SQLite
+
+    legacy: همان تنظیمات قبلی (rollback journal، fsync کامل در هر commit)
+    tuned: WAL، synchronous=NORMAL، کش و mmap بزرگ‌تر، busy_timeout و pool با اندازه مشخص
+    """
+    if profile == "legacy":
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    options = {}
+    if ":memory:" not in url and url.rstrip("/") != "sqlite:":
+        # دیتابیس فایلی: QueuePool با سقف مشخص (هر اتصال pragmaهای خود را دارد)
+        options = {
+            "poolclass": MonitoredQueuePool,
+            "pool_logging_name": pool_name,
+            "pool_size": pool_size or int(os.getenv("SQLITE_POOL_SIZE", "10")),
+            "max_overflow": max_overflow if max_overflow is not None else int(os.getenv("SQLITE_MAX_OVERFLOW", "10")),
+            "pool_timeout": POOL_TIMEOUT,
+        }
     engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False}
+        url,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000,
+        },
+        **options
     )
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+# ایجاد موتور دیتابیس
+if DATABASE_URL.startswith("sqlite"):
+    engine = create_sqlite_engine(DATABASE_URL, SQLITE_PROFILE)
 else:
     engine = create_engine(
         DATABASE_URL,
+        poolclass=MonitoredQueuePool,
+        pool_logging_name="primary",
         pool_size=10,
         max_overflow=20,
+        pool_timeout=POOL_TIMEOUT,
         pool_pre_ping=True
     )
 
@@ -36,4 +125,80 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- مسیر async (aiosqlite / asyncpg) ---
+# engine async به صورت lazy ساخته می‌شود تا اسکریپت‌های sync (reset_database.py و ...)
+# بدون درایورهای async هم اجرا شوند
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+class AsyncBackedSession(Session):
+    """کلاس session داخلی AsyncSession (برای اتصال eventهای ORM به مسیر async)"""
+
+
+def to_async_url(url: str) -> str:
+    """تبدیل DATABASE_URL به URL درایور async"""
+    scheme, _, rest = url.partition("://")
+    base = scheme.split("+", 1)[0]
+    if base not in ASYNC_DRIVERS:
+        raise ValueError(f"درایور async برای {scheme} تعریف نشده است")
+    return f"{ASYNC_DRIVERS[base]}://{rest}"
+
+
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    """AsyncEngine مشترک (با همان pragmaهای SQLite پروفایل tuned)"""
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        url = to_async_url(DATABASE_URL)
+        if DATABASE_URL.startswith("sqlite"):
+            _async_engine = create_async_engine(
+                url, pool_logging_name="primary_async",
+                connect_args={"timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000}
+            )
+            if SQLITE_PROFILE != "legacy":
+                event.listen(_async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        else:
+            _async_engine = create_async_engine(
+                url,
+                poolclass=MonitoredAsyncAdaptedQueuePool,
+                pool_logging_name="primary_async",
+                pool_size=10,
+                max_overflow=20,
+                pool_timeout=POOL_TIMEOUT,
+                pool_pre_ping=True
+            )
+    return _async_engine
+
+
+def get_async_session_factory():
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        # expire_on_commit=False: اشیاء بعد از commit بدون lazy load (که در async مجاز نیست) قابل خواندن‌اند
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(),
+            autoflush=False,
+            expire_on_commit=False,
+            sync_session_class=AsyncBackedSession
+        )
+    return _async_session_factory
+
+
+# Dependency async - کوئری‌ها event loop را مسدود نمی‌کنند
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
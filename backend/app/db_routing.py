@@ -0,0 +1,299 @@
+# backend/app/db_routing.py
+"""
+مسیریابی کوئری‌های فقط-خواندنی به replica
+
+- DATABASE_REPLICA_URLS: یک یا چند replica (با کاما)؛ replicaای که تأخیرش از
+  REPLICA_MAX_LAG_SECONDS بیشتر باشد یا در دسترس نباشد کنار گذاشته می‌شود و خواندن به primary برمی‌گردد
+- SQLite: بدون replica، یک pool اتصال read-only (mode=ro) روی همان فایل WAL همین نقش را دارد
+- RoutingSession: SELECTها به replica، و پس از اولین نوشتن کل session به primary می‌چسبد؛
+  کلاینتی که به‌تازگی نوشته (در بازه تأخیر مجاز) هم از primary می‌خواند (read-your-writes)
+"""
+import itertools
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+from app.core.config import settings
+from app.core.request_context import current_request
+from app.database import (
+    DATABASE_URL, POOL_TIMEOUT, MonitoredQueuePool, MonitoredAsyncAdaptedQueuePool, SQLITE_PRAGMAS, SQLITE_PROFILE, engine, SessionLocal, get_async_engine, to_async_url
+)
+
+LAG_QUERIES = {
+    "postgresql": (
+        "SELECT CASE WHEN pg_is_in_recovery() "
+        "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+    ),
+}
+
+
+class RecentWriters:
+    """زمان آخرین نوشتن هر کلاینت (LRU محدود) برای read-your-writes بین درخواست‌ها"""
+
+    def __init__(self, max_keys: int = 50_000):
+        self.max_keys = max_keys
+        self._writes: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, client_key: Optional[str]) -> None:
+        if not client_key:
+            return
+        with self._lock:
+            self._writes[client_key] = time.monotonic()
+            self._writes.move_to_end(client_key)
+            if len(self._writes) > self.max_keys:
+                self._writes.popitem(last=False)
+
+    def wrote_within(self, client_key: Optional[str], seconds: float) -> bool:
+        if not client_key:
+            return False
+        written_at = self._writes.get(client_key)
+        return written_at is not None and time.monotonic() - written_at < seconds
+
+
+recent_writers = RecentWriters()
+
+
+def _current_client() -> Optional[str]:
+    request = current_request()
+    return request.client_ip if request else None
+
+
+class ReplicaSet:
+    """
+    مجموعه replicaها با بررسی تنبل تأخیر
+
+    تأخیر هر replica حداکثر هر check_interval ثانیه یک بار اندازه‌گیری می‌شود
+    """
+
+    def __init__(self, urls: List[str], sync_engines: list, max_lag_seconds: float,
+                 check_interval: float = 5.0):
+        self.urls = urls
+        self.sync_engines = sync_engines
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.lags = [0.0] * len(urls)
+        self._checked_at = 0.0
+        self._async_engines = [None] * len(urls)
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.urls)
+
+    @property
+    def stale(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    def _measure(self, replica_engine) -> float:
+        query = LAG_QUERIES.get(replica_engine.dialect.name)
+        if query is None:
+            return 0.0  # SQLite read-only روی همان فایل: بدون تأخیر
+        try:
+            with replica_engine.connect() as conn:
+                return float(conn.execute(text(query)).scalar() or 0.0)
+        except Exception as e:
+            print(f"⚠️ replica در دسترس نیست: {e}")
+            return float("inf")
+
+    def refresh(self) -> None:
+        if not self._lock.acquire(blocking=False):
+            return  # بررسی دیگری در حال اجراست
+        try:
+            self.lags = [self._measure(replica_engine) for replica_engine in self.sync_engines]
+            self._checked_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def pick_index(self) -> Optional[int]:
+        """replica سالم بعدی (round robin) یا None برای بازگشت به primary"""
+        if not self.urls:
+            return None
+        if self.stale:
+            self.refresh()
+        healthy = [i for i, lag in enumerate(self.lags) if lag <= self.max_lag_seconds]
+        if not healthy:
+            return None
+        return healthy[next(self._round_robin) % len(healthy)]
+
+    def async_engine(self, index: int):
+        """engine async همان replica (ساخت تنبل)"""
+        if self._async_engines[index] is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+            url = self.urls[index]
+            if url.startswith("sqlite"):
+                async_engine = create_async_engine(
+                    _readonly_sqlite_url(to_async_url(url)), pool_logging_name=f"replica{index}_async"
+                )
+                event.listen(async_engine.sync_engine, "connect", _apply_readonly_pragmas)
+            else:
+                async_engine = create_async_engine(
+                    to_async_url(url), poolclass=MonitoredAsyncAdaptedQueuePool,
+                    pool_logging_name=f"replica{index}_async", pool_size=10, max_overflow=10,
+                    pool_timeout=POOL_TIMEOUT, pool_pre_ping=True
+                )
+            self._async_engines[index] = async_engine
+        return self._async_engines[index]
+
+
+def _readonly_sqlite_url(url: str) -> str:
+    """URL اتصال read-only به فایل SQLite (sqlite:///file:path?mode=ro&uri=true)"""
+    parsed = make_url(url)
+    return str(parsed.set(database=f"file:{parsed.database}", query={"mode": "ro", "uri": "true"}))
+
+
+def _apply_readonly_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA query_only=1")
+        for name in ("busy_timeout", "cache_size", "mmap_size", "temp_store"):
+            cursor.execute(f"PRAGMA {name}={SQLITE_PRAGMAS[name]}")
+    finally:
+        cursor.close()
+
+
+def create_sqlite_readonly_engine(url: str, pool_size: int = 10, pool_name: str = "replica"):
+    """pool اتصال‌های read-only روی فایل WAL (خواننده‌ها نویسنده را مسدود نمی‌کنند)"""
+    path = make_url(url).database
+
+    def connect():
+        return sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False,
+            timeout=SQLITE_PRAGMAS["busy_timeout"] / 1000
+        )
+
+    readonly_engine = create_engine("sqlite://", creator=connect, poolclass=MonitoredQueuePool,
+                                    pool_logging_name=pool_name, pool_size=pool_size, max_overflow=pool_size,
+                                    pool_timeout=POOL_TIMEOUT)
+    event.listen(readonly_engine, "connect", _apply_readonly_pragmas)
+    return readonly_engine
+
+
+def _build_replica_set() -> ReplicaSet:
+    urls = [url.strip() for url in (settings.DATABASE_REPLICA_URLS or "").split(",") if url.strip()]
+
+    # SQLite فایلی در حالت WAL بدون replica تعریف‌شده: pool read-only روی همان فایل
+    if (not urls and DATABASE_URL.startswith("sqlite") and SQLITE_PROFILE != "legacy"
+            and make_url(DATABASE_URL).database not in (None, "", ":memory:")):
+        urls = [DATABASE_URL]
+
+    sync_engines = []
+    for index, url in enumerate(urls):
+        if url.startswith("sqlite"):
+            sync_engines.append(create_sqlite_readonly_engine(url, pool_name=f"replica{index}"))
+        else:
+            sync_engines.append(create_engine(
+                url, poolclass=MonitoredQueuePool, pool_logging_name=f"replica{index}",
+                pool_size=10, max_overflow=10, pool_timeout=POOL_TIMEOUT, pool_pre_ping=True
+            ))
+    return ReplicaSet(urls, sync_engines, settings.REPLICA_MAX_LAG_SECONDS)
+
+
+replica_set = _build_replica_set()
+
+
+READ_PREFIXES = ("select", "with", "explain", "show", "pragma")
+
+
+def _is_write(clause) -> bool:
+    """آیا دستور چیزی می‌نویسد؟ (text() خام با کلمه اول تشخیص داده می‌شود)"""
+    if getattr(clause, "is_dml", False):
+        return True
+    if isinstance(clause, TextClause):
+        return not clause.text.lstrip().lower().startswith(READ_PREFIXES)
+    return False
+
+
+class RoutingSession(Session):
+    """
+    Session با دو bind: SELECT روی replica و هر نوشتن روی primary
+
+    پس از اولین flush یا دستور DML، session تا پایان به primary می‌چسبد
+    """
+
+    def __init__(self, *args, primary_bind=None, replica_bind=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.primary_bind = primary_bind
+        self.replica_bind = replica_bind
+        self.pinned_to_primary = replica_bind is None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.pinned_to_primary or self._flushing:
+            return self.primary_bind
+        if clause is not None and _is_write(clause):
+            self.pinned_to_primary = True
+            return self.primary_bind
+        return self.replica_bind
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_after_flush(session, flush_context):
+    session.pinned_to_primary = True
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_writer(session):
+    # هر commit شامل نوشتن، کلاینت را برای مدت تأخیر مجاز «نویسنده اخیر» می‌کند
+    if session.info.pop("wrote", False):
+        recent_writers.mark(_current_client())
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+def _replica_allowed() -> bool:
+    return not recent_writers.wrote_within(_current_client(), settings.REPLICA_MAX_LAG_SECONDS)
+
+
+# Dependency خواندنی: لیست‌ها، گزارش‌ها و آمار
+def get_read_db():
+    index = replica_set.pick_index() if _replica_allowed() else None
+    if index is None:
+        db = SessionLocal()
+    else:
+        db = RoutingSession(
+            primary_bind=engine,
+            replica_bind=replica_set.sync_engines[index],
+            autocommit=False,
+            autoflush=False
+        )
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# نسخه async برای مسیرهای مهاجرت‌کرده (audit و ...)
+async def get_async_read_db():
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from starlette.concurrency import run_in_threadpool
+
+    if replica_set and replica_set.stale:
+        # اندازه‌گیری تأخیر کوئری sync است؛ خارج از event loop اجرا می‌شود
+        await run_in_threadpool(replica_set.refresh)
+    index = replica_set.pick_index() if _replica_allowed() else None
+    replica_bind = replica_set.async_engine(index).sync_engine if index is not None else None
+
+    async with AsyncSession(
+        sync_session_class=RoutingSession,
+        primary_bind=get_async_engine().sync_engine,
+        replica_bind=replica_bind,
+        autoflush=False,
+        expire_on_commit=False
+    ) as db:
+        yield db
@@ -1,15 +1,32 @@
 # backend/app/main.py
 from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
+from sqlalchemy import BigInteger, text
+from sqlalchemy.schema import CreateIndex
+from app.database import engine, Base, SessionLocal, AsyncBackedSession, get_async_engine
 from app.models import *  
 from app.routes.auth import authentication
 from app.routes.users import user_management
-from app.routes.admin import admin_management, admin_permissions
+from app.routes.admin import admin_management, admin_permissions, diagnostics
 from app.routes.audit import audit_logs
+from app.routes import trades, prices, orders, portfolio, quotes
+from app.services.order_book import order_books
+from app.services.trade_execution import resolve_order_intent
+from app.services.price_table import price_table
 from app.core.auth import get_current_user
 from app.seed_data import seed_initial_data
 from app.core.config import settings, get_settings
+from app.core.user_search import backfill_search_text, ensure_search_column, ensure_search_index
+from app.security.middleware import SecurityMiddleware
+from app.middleware.metrics import MetricsMiddleware, install_db_instrumentation
+from app.core.metrics import get_collector, render_metrics, require_metrics_access
+from app.core.query_profiler import install_query_profiler, SlowQueryWriter
+from app.core.n_plus_one import install_n_plus_one_detector
+from app.db_routing import replica_set, RoutingSession
+from app.core.pool_monitor import (
+    PoolTimeoutError, install_pool_monitor, install_session_leak_detector, make_pool_saturated_handler
+)
 
 # اصلاح ایمپورت‌های central_management
 from app.routes.admin.central_management.test_routes import router as test_routes_router
@@ -20,6 +37,60 @@ from app.routes.admin.central_management.staff_users import router as staff_user
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+# (user_id, created_at) و (user_id) → idx_trade_user_created_id (user_id, created_at, id)
+OBSOLETE_INDEXES = ("idx_trade_user_created", "ix_trades_user_id")
+
+# ایندکس‌های اضافه‌شده به جدول‌های موجود (create_all فقط جدول‌های جدید را می‌سازد)
+# (IF NOT EXISTS به جای checkfirst: reflection در SQLite ایندکس‌های عبارتی را نمی‌بیند)
+with engine.begin() as conn:
+    for table in (User.__table__, SystemLog.__table__, Trade.__table__):
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+    # ایندکس‌های جایگزین‌شده: پیشوند ایندکس جدید هستند و فقط هزینه نوشتن دارند
+    for name in OBSOLETE_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+# ستون‌های مبلغ (ریال) روی دیتابیس‌های موجود PostgreSQL از INTEGER به BIGINT
+# (create_all نوع ستون موجود را تغییر نمی‌دهد؛ در SQLite خود INTEGER 64 بیتی است)
+if engine.dialect.name == "postgresql":
+    with engine.begin() as conn:
+        for model in (LedgerEntry, AccountBalance, LedgerCheckpoint, Trade, Position, RegularUserProfile):
+            for column in model.__table__.columns:
+                if isinstance(column.type, BigInteger):
+                    conn.execute(text(
+                        f"ALTER TABLE {model.__tablename__} ALTER COLUMN {column.name} TYPE BIGINT"
+                    ))
+
+# ستون search_text روی دیتابیس‌های قدیمی (بدون آن هیچ کوئری User اجرا نمی‌شود)
+search_column_added = ensure_search_column(engine)
+
+# ایندکس جستجوی کاربران (pg_trgm روی PostgreSQL / FTS5 روی SQLite)
+try:
+    ensure_search_index(engine)
+    if search_column_added:
+        backfill_db = SessionLocal()
+        try:
+            print(f"🔎 search_text برای {backfill_search_text(backfill_db)} کاربر موجود محاسبه شد")
+        finally:
+            backfill_db.close()
+except Exception as e:
+    print(f"⚠️ خطا در ایجاد ایندکس جستجو: {e}")
+
+def resolve_order_intent_at_startup(instrument, op, order, fills):
+    """resolver دفترهای سفارش: intent بدون نتیجه از روی دفتر کل روشن می‌شود"""
+    resolver_db = SessionLocal()
+    try:
+        return resolve_order_intent(resolver_db, instrument, op, order, fills)
+    finally:
+        resolver_db.close()
+
+# بازیابی دفترهای سفارش از write-ahead journal
+try:
+    recovered = order_books.load_all(resolve_order_intent_at_startup)
+    print(f"📒 دفترهای سفارش بازیابی شد: {recovered}")
+except Exception as e:
+    print(f"⚠️ خطا در بازیابی دفتر سفارش: {e}")
+
 # ✅ اجرای ایمن seed data با مدیریت خطا
 try:
     print("🌱 در حال ایجاد داده‌های اولیه...")
@@ -29,6 +100,12 @@ except Exception as e:
     print(f"⚠️ خطا در ایجاد داده اولیه: {e}")
     print("🚀 ادامه اجرای سرور بدون داده اولیه...")
 
+# جدول قیمت درون‌حافظه‌ای + اعلان تغییرات (تریگر polling روی SQLite، LISTEN/NOTIFY روی PostgreSQL)
+try:
+    print(f"💹 جدول قیمت بارگذاری شد: {price_table.start(engine)} قیمت")
+except Exception as e:
+    print(f"⚠️ خطا در بارگذاری جدول قیمت: {e}")
+
 print(f"🚀 سرور روی پورت {settings.API_PORT} راه‌اندازی می‌شود...")
 
 app = FastAPI(
@@ -37,7 +114,46 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# CORS middleware
+# شمارش کوئری‌ها و sessionهای دیتابیس به ازای هر درخواست -
+# مسیر sync و async (sync_engine زیر AsyncEngine) هر دو اندازه‌گیری می‌شوند
+async_engine = get_async_engine()
+# نویسنده لاگ کوئری‌های کند مشترک است و همیشه از engine sync می‌نویسد
+slow_query_writer = SlowQueryWriter(engine)
+instrumented = [(engine, SessionLocal), (async_engine.sync_engine, AsyncBackedSession)]
+# replicaها (یا pool read-only SQLite) هم با همان ابزارها اندازه‌گیری می‌شوند
+for index, replica_engine in enumerate(replica_set.sync_engines):
+    instrumented.append((replica_engine, RoutingSession))
+    instrumented.append((replica_set.async_engine(index).sync_engine, RoutingSession))
+for instrumented_engine, session_class in instrumented:
+    install_db_instrumentation(instrumented_engine, session_class)
+
+    # اتصال‌های در حال استفاده و overflow هر pool
+    install_pool_monitor(instrumented_engine)
+
+    # زمان‌سنجی کوئری‌ها و ثبت کوئری‌های کند در system_logs
+    install_query_profiler(instrumented_engine, settings.SLOW_QUERY_THRESHOLD_MS, slow_query_writer)
+
+    # تشخیص N+1 (هشدار در توسعه، خطا در اجرای تست‌ها با N_PLUS_ONE_MODE=raise)
+    install_n_plus_one_detector(instrumented_engine, settings.N_PLUS_ONE_THRESHOLD, settings.N_PLUS_ONE_MODE)
+
+# sessionهایی که بدون close توسط GC جمع می‌شوند
+install_session_leak_detector()
+
+# pool اشباع: به جای انتظار طولانی، 503 سریع با Retry-After
+app.add_exception_handler(PoolTimeoutError, make_pool_saturated_handler(settings.DB_POOL_RETRY_AFTER))
+
+# snapshot متریک‌های این worker در thread پس‌زمینه (فقط با METRICS_MULTIPROC_DIR)
+get_collector()
+
+# Metrics middleware - درونی‌تر از Security تا فقط درخواست‌های پذیرفته‌شده اندازه‌گیری شوند
+app.add_middleware(MetricsMiddleware)
+
+# Security middleware (ASGI خام: هدرهای امنیتی، IPهای مسدود، Rate Limiting) - اختیاری؛
+# پشت docker/پروکسی باید TRUSTED_PROXIES تنظیم شود وگرنه همه کاربران یک سهمیه مشترک دارند
+if settings.SECURITY_MIDDLEWARE_ENABLED:
+    app.add_middleware(SecurityMiddleware)
+
+# CORS middleware - آخرین middleware اضافه‌شده بیرونی‌ترین است تا پاسخ‌های 429 هم هدر CORS داشته باشند
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -49,6 +165,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
 )
 
 # ✅ اصلاح شده: تغییر prefix authentication به /api
@@ -57,6 +174,12 @@ app.include_router(user_management.router, prefix="/api/users", tags=["User Mana
 app.include_router(admin_management.router, prefix="/api/admin", tags=["Admin Management"])
 app.include_router(admin_permissions.router, prefix="/api/admin/permissions", tags=["Admin Permissions"])
 app.include_router(audit_logs.router, prefix="/api/audit", tags=["Audit Logs"])
+app.include_router(diagnostics.router, prefix="/api/admin/diagnostics", tags=["Diagnostics"])
+app.include_router(trades.router)  # prefix=/api/trades در خود router
+app.include_router(prices.router)  # prefix=/api/prices
+app.include_router(orders.router)  # prefix=/api/orders
+app.include_router(portfolio.router)  # prefix=/api/portfolio
+app.include_router(quotes.router)  # prefix=/api/quotes
 
 # Include central management routers
 app.include_router(regular_users_router, prefix="/api", tags=["Central Management - Regular Users"])
@@ -72,6 +195,12 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "ParsaGold API"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False,
+         dependencies=[Depends(require_metrics_access)])
+def metrics():
+    """متریک‌ها در قالب متنی Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/config")
 async def get_config():
     """نمایش تنظیمات فعلی"""
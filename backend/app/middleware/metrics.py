@@ -0,0 +1,79 @@
+# backend/app/middleware/metrics.py
+"""
+میدلور ASGI اندازه‌گیری درخواست‌ها
+
+برای هر درخواست: زمان پاسخ، کد وضعیت، درخواست‌های در حال اجرا و
+تعداد sessionها و کوئری‌های دیتابیس (از طریق eventهای SQLAlchemy) ثبت می‌شود
+"""
+import time
+
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import (
+    registry, HTTP_REQUESTS, HTTP_LATENCY, HTTP_IN_FLIGHT, DB_QUERIES, DB_SESSIONS
+)
+from app.core.request_context import begin_request, end_request, current_request
+
+
+def _count_query(*args, **kwargs):
+    context = current_request()
+    if context is not None:
+        context.query_count += 1
+
+
+def _count_session(*args, **kwargs):
+    context = current_request()
+    if context is not None:
+        context.session_count += 1
+
+
+def install_db_instrumentation(engine, session_factory) -> None:
+    """اتصال شمارنده‌های کوئری و session به engine و session factory"""
+    if not event.contains(engine, "before_cursor_execute", _count_query):
+        event.listen(engine, "before_cursor_execute", _count_query)
+    if not event.contains(session_factory, "after_begin", _count_session):
+        event.listen(session_factory, "after_begin", _count_session)
+
+
+class MetricsMiddleware:
+    """
+    میدلور ASGI خام برای متریک‌های HTTP
+
+    برچسب route از الگوی مسیر (مثلاً /api/users/{user_id}) گرفته می‌شود
+    تا تعداد سری‌ها محدود بماند؛ درخواست‌های بدون route با "unmatched" ثبت می‌شوند
+    """
+
+    def __init__(self, app: ASGIApp, exclude_paths=("/metrics",)):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        token = begin_request(scope)
+        context = current_request()
+        registry.inc(HTTP_IN_FLIGHT)
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            end_request(token)
+            registry.inc(HTTP_IN_FLIGHT, amount=-1)
+
+            labels = {"method": context.method, "route": context.route}
+            registry.inc(HTTP_REQUESTS, {**labels, "status": str(status_code)})
+            registry.observe(HTTP_LATENCY, elapsed, labels)
+            registry.observe(DB_QUERIES, context.query_count, labels)
+            registry.observe(DB_SESSIONS, context.session_count, labels)
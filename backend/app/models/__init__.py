@@ -3,6 +3,9 @@
 from .user_models import User, UserVerification, PasswordReset, UserStatus, RegularUserProfile, AdminUserProfile, StaffUserProfile
 from .admin_models import AdminUser, Permission, RolePermission, AdminRole, AdminStatus
 from .audit_models import AuditLog, SystemLog, AuditAction
+from .trade_models import Trade, GoldPrice, Position, TradingVolumeStats
+from .ledger_models import LedgerEntry, AccountBalance, LedgerCheckpoint
+from .idempotency_models import IdempotencyKey
 
 # List all models for Alembic migrations
 __all__ = [
@@ -26,4 +29,18 @@ __all__ = [
     "AuditLog",
     "SystemLog",
     "AuditAction",
+    
+    # Trade models
+    "Trade",
+    "GoldPrice",
+    "Position",
+    "TradingVolumeStats",
+    
+    # Ledger models
+    "LedgerEntry",
+    "AccountBalance",
+    "LedgerCheckpoint",
+    
+    # Idempotency
+    "IdempotencyKey",
 ]
\ No newline at end of file
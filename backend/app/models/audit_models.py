@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -69,4 +69,9 @@ class SystemLog(Base):
     ip_address = Column(String(45))
     
     # timestamps
-    created_at = Column(DateTime, default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, default=func.now())
+    
+    # گزارش کوئری‌های کند بر اساس module و بازه زمانی
+    __table_args__ = (
+        Index('idx_system_log_module_created', 'module', 'created_at'),
+    )
\ No newline at end of file
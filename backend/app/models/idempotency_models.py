@@ -0,0 +1,28 @@
+# backend/app/models/idempotency_models.py
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, UniqueConstraint
+from app.database import Base
+
+class IdempotencyKey(Base):
+    """
+    کلید Idempotency-Key درخواست‌های تکرارپذیر (مثل ثبت معامله)
+
+    ردیف با status=in_progress «رزرو» می‌شود؛ پاسخ نهایی در همان تراکنش عملیات
+    ذخیره و برای تکرارهای بعدی تا expires_at بدون اجرای دوباره برگردانده می‌شود
+    """
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    key = Column(String(255), nullable=False)
+    endpoint = Column(String(100), nullable=False)
+    request_hash = Column(String(64), nullable=False)       # sha256 بدنه درخواست
+    status = Column(String(20), nullable=False, default="in_progress")  # in_progress, completed
+    response_status = Column(Integer)
+    response_body = Column(Text)
+    locked_at = Column(DateTime, nullable=False)            # زمان رزرو (تشخیص رزرو رهاشده)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'key', name='uq_idempotency_user_key'),
+        Index('idx_idempotency_expires', 'expires_at'),
+    )
@@ -0,0 +1,53 @@
+# backend/app/models/ledger_models.py
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index, UniqueConstraint, event
+from sqlalchemy.sql import func
+from app.database import Base
+
+class LedgerEntry(Base):
+    """
+    سند (posting) تغییرناپذیر دفتر کل دوطرفه
+
+    هر journal حداقل دو posting دارد که جمع مبالغشان صفر است؛ sequence برای هر
+    حساب پیوسته و بدون فاصله است و balance_after موجودی حساب پس از این posting است
+    """
+    __tablename__ = "ledger_entries"
+
+    id = Column(Integer, primary_key=True)
+    journal_id = Column(String(36), nullable=False, index=True)
+    account = Column(String(64), nullable=False)   # user:{id} / house:{shard}
+    sequence = Column(Integer, nullable=False)
+    amount = Column(BigInteger, nullable=False)     # مثبت: بستانکار حساب، منفی: برداشت
+    balance_after = Column(BigInteger, nullable=False)
+    entry_type = Column(String(30), nullable=False)  # opening, trade_buy, trade_sell, ...
+    reference_type = Column(String(30))
+    reference_id = Column(Integer)
+    created_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('account', 'sequence', name='uq_ledger_account_sequence'),
+        Index('idx_ledger_reference', 'reference_type', 'reference_id'),
+    )
+
+class AccountBalance(Base):
+    """snapshot موجودی هر حساب - در همان تراکنش posting به‌روز می‌شود (خواندن O(1))"""
+    __tablename__ = "account_balances"
+
+    account = Column(String(64), primary_key=True)
+    balance = Column(BigInteger, nullable=False, default=0)
+    last_sequence = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class LedgerCheckpoint(Base):
+    """آخرین نقطه تطبیق‌شده هر حساب؛ تطبیق بعدی فقط postingهای پس از آن را بازپخش می‌کند"""
+    __tablename__ = "ledger_checkpoints"
+
+    account = Column(String(64), primary_key=True)
+    sequence = Column(Integer, nullable=False, default=0)
+    balance = Column(BigInteger, nullable=False, default=0)
+    verified_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+@event.listens_for(LedgerEntry, "before_update")
+@event.listens_for(LedgerEntry, "before_delete")
+def _ledger_is_append_only(mapper, connection, target):
+    """اصلاح فقط با posting معکوس؛ ویرایش یا حذف سند مجاز نیست"""
+    raise ValueError("ledger entries are append-only")
@@ -0,0 +1,78 @@
+# backend/app/models/trade_models.py
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Index, UniqueConstraint, JSON
+from sqlalchemy.sql import func
+from app.database import Base
+
+class GoldPrice(Base):
+    """قیمت لحظه‌ای هر دارایی (طلا، نقره، نفت و ...) به ریال برای هر واحد"""
+    __tablename__ = "gold_prices"
+
+    id = Column(Integer, primary_key=True, index=True)
+    gold_type = Column(String(50), unique=True, index=True, nullable=False)
+    price = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class Trade(Base):
+    """معامله اجراشده کاربر عادی"""
+    __tablename__ = "trades"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # بدون index=True: idx_trade_user_created_id با user_id شروع می‌شود (کوئری‌ها و CASCADE را پوشش می‌دهد)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    gold_type = Column(String(50), nullable=False)
+    amount = Column(Float, nullable=False)           # مقدار (گرم / اونس / بشکه)
+    price = Column(Integer, nullable=False)          # قیمت واحد در لحظه اجرا
+    total_amount = Column(BigInteger, nullable=False)  # مبلغ کل به ریال
+    trade_type = Column(String(10), nullable=False)  # buy, sell
+    status = Column(String(20), default="completed")
+    created_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        # تاریخچه معاملات کاربر: صفحه‌بندی keyset روی (user_id, created_at, id)؛
+        # در PostgreSQL بقیه ستون‌ها INCLUDE می‌شوند تا index-only scan ممکن باشد
+        Index(
+            'idx_trade_user_created_id', 'user_id', 'created_at', 'id',
+            postgresql_include=['gold_type', 'trade_type', 'amount', 'price', 'total_amount', 'status']
+        ),
+    )
+
+class Position(Base):
+    """
+    موقعیت (دارایی نگهداری‌شده) کاربر در هر ابزار - در همان تراکنش معامله به‌روز می‌شود
+
+    cost_basis بهای تمام‌شده مقدار باز است (میانگین قیمت = cost_basis / quantity)؛
+    quantity منفی یعنی موقعیت فروش (short)
+    """
+    __tablename__ = "positions"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    instrument = Column(String(50), nullable=False)       # همان gold_type معامله
+    quantity = Column(Float, nullable=False, default=0)
+    cost_basis = Column(BigInteger, nullable=False, default=0)    # ریال
+    realized_pnl = Column(BigInteger, nullable=False, default=0)  # سود/زیان تحقق‌یافته (ریال)
+    trade_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'instrument', name='uq_position_user_instrument'),
+    )
+
+class TradingVolumeStats(Base):
+    """
+    حجم معاملات غلتان کاربر با شمارنده‌های سطلی ثابت (ring buffer) - در تراکنش معامله به‌روز می‌شود
+
+    hourly: 24 سطل ساعتی (پنجره 24 ساعت)، daily: 30 سطل روزانه (پنجره‌های 7 و 30 روز)؛
+    سطل‌های منقضی هنگام به‌روزرسانی بعدی صفر می‌شوند
+    """
+    __tablename__ = "trading_volume_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    hourly = Column(JSON, nullable=False)
+    daily = Column(JSON, nullable=False)
+    last_hour = Column(Integer, nullable=False)   # شماره ساعت (epoch) آخرین به‌روزرسانی
+    last_day = Column(Integer, nullable=False)    # شماره روز (epoch) آخرین به‌روزرسانی
+    volume_24h = Column(BigInteger, nullable=False, default=0)
+    volume_7d = Column(BigInteger, nullable=False, default=0)
+    volume_30d = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
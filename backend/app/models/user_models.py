@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum, ForeignKey, JSON, Index
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Text, Enum, ForeignKey, JSON, Index, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 from app.database import Base
+from app.utils.text_normalization import PHONE_SEPARATORS, build_search_text
 import uuid
 
 class UserStatus(enum.Enum):
@@ -11,6 +12,12 @@ class UserStatus(enum.Enum):
     SUSPENDED = "suspended"
     PENDING = "pending"
 
+def phone_digits_expression(column):
+    """شماره بدون جداکننده در SQL (هم‌خوان با normalize_phone؛ ارقام فارسی را پوشش نمی‌دهد)"""
+    for separator in PHONE_SEPARATORS:
+        column = func.replace(column, separator, "")
+    return column
+
 class User(Base):
     __tablename__ = "users"
     
@@ -48,6 +55,7 @@ class User(Base):
     # فیلدهای جدید برای سیستم مرکزی
     user_type = Column(String(20), default="regular")  # regular, admin, staff, support
     full_name = Column(String(200))  # ترکیب first_name + last_name
+    search_text = Column(Text)  # متن نرمال‌شده برای ایندکس جستجو (trigram/FTS)
     
     # timestamps (حفظ فیلدهای موجود)
     created_at = Column(DateTime, default=func.now())
@@ -62,6 +70,10 @@ class User(Base):
     __table_args__ = (
         Index('idx_user_type_status', 'user_type', 'status'),
         Index('idx_email_phone', 'email', 'phone'),
+        Index('idx_user_type_created_id', 'user_type', 'created_at', 'id'),  # صفحه‌بندی keyset
+        # تشخیص تکراری import روی ردیف‌های قدیمی نرمال‌نشده
+        Index('idx_user_email_lower', func.lower(email)),
+        Index('idx_user_phone_digits', phone_digits_expression(phone)),
     )
     
     def __init__(self, **kwargs):
@@ -70,6 +82,15 @@ class User(Base):
         if self.first_name and self.last_name:
             self.full_name = f"{self.first_name} {self.last_name}"
 
+@event.listens_for(User, "before_insert")
+@event.listens_for(User, "before_update")
+def _refresh_user_search_text(mapper, connection, target):
+    """به‌روزرسانی search_text پیش از ذخیره - ایندکس جستجو از این ستون تغذیه می‌شود"""
+    target.search_text = build_search_text(
+        [target.email, target.full_name, target.first_name, target.last_name],
+        phone=target.phone
+    )
+
 class RegularUserProfile(Base):
     """پروفایل مخصوص کاربران عادی - برای اطلاعات مالی و تجاری"""
     __tablename__ = "regular_user_profiles"
@@ -78,10 +99,10 @@ class RegularUserProfile(Base):
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), unique=True)
     
     # اطلاعات مالی و تجاری
-    balance = Column(Integer, default=0)
+    balance = Column(BigInteger, default=0)
     credit_score = Column(Integer, default=0)
     risk_level = Column(String(20), default='low')
-    trading_volume = Column(Integer, default=0)
+    trading_volume = Column(BigInteger, default=0)  # حجم 30 روز اخیر (app.services.trading_volume)
     preferred_assets = Column(JSON, default=list)  # طلا، نقره، نفت
     
     # تنظیمات تجاری
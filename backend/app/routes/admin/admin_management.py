@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
+from app.db_routing import get_read_db
 from app.core.auth import get_current_admin, get_password_hash
 from app.core.permissions import require_permission, check_permission
 from app.core.audit_logger import log_admin_activity
@@ -12,7 +13,7 @@ router = APIRouter()
 @router.get("/", response_model=List[dict])
 @require_permission("admin:read")
 async def get_admins(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin: AdminUser = Depends(get_current_admin)
 ):
     """
@@ -3,10 +3,11 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from app.database import get_db
+from app.db_routing import get_read_db
 from app.core.user_management import get_user_manager
 from app.models.user_models import User, UserStatus
 from app.core.auth import get_current_admin  # ✅ تغییر اینجا
+from app.core.pool_monitor import PoolTimeoutError
 
 router = APIRouter(prefix="/api/central/admin-users", tags=["Central Management - Admin Users"])
 
@@ -15,7 +16,7 @@ async def get_admin_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin=Depends(get_current_admin)  # ✅ تغییر اینجا
 ):
     """دریافت لیست ادمین‌ها"""
@@ -30,7 +31,8 @@ async def get_admin_users(
             user_type="admin",
             skip=skip,
             limit=limit,
-            filters=filters
+            filters=filters,
+            include_profile=True
         )
         
         return [
@@ -49,6 +51,8 @@ async def get_admin_users(
             for admin in admins
         ]
     
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,25 +1,38 @@
 # backend/app/routes/central_management/regular_users.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional
+import json
 
 from app.database import get_db
+from app.db_routing import get_read_db
 from app.core.user_management import get_user_manager
 from app.models.user_models import User, UserStatus
 from app.core.auth import get_current_admin
+from app.core.pool_monitor import PoolTimeoutError
+from app.utils.pagination import next_cursor
+from app.schemas.user_schemas import BulkUserSelection, BulkStatusUpdate
+from app.services.user_import import UserImportService, detect_format
 
 router = APIRouter(prefix="/api/central/regular-users", tags=["Central Management - Regular Users"])
 
 @router.get("/", response_model=list)
 async def get_regular_users(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
     status: Optional[UserStatus] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_admin=Depends(get_current_admin)
 ):
-    """دریافت لیست کاربران عادی از دیتابیس"""
+    """
+    دریافت لیست کاربران عادی از دیتابیس
+
+    صفحه بعد با cursor موجود در هدر X-Next-Cursor دریافت می‌شود
+    """
     try:
         user_manager = get_user_manager(db)
         
@@ -29,43 +42,157 @@ async def get_regular_users(
         if search:
             filters['search'] = search
         
-        users = user_manager.get_users_by_type(
-            user_type="regular",
-            skip=skip,
-            limit=limit,
-            filters=filters
-        )
+        try:
+            rows = user_manager.get_regular_user_rows(
+                skip=skip,
+                limit=limit,
+                filters=filters,
+                cursor=cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        cursor_value = next_cursor(rows, limit)
+        if cursor_value:
+            response.headers["X-Next-Cursor"] = cursor_value
         
         return [
             {
-                "id": user.id,
-                "public_id": user.public_id,
-                "email": user.email,
-                "phone": user.phone,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "full_name": user.full_name,
-                "status": user.status.value,
-                "email_verified": user.email_verified,
-                "phone_verified": user.phone_verified,
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-                "last_login": user.last_login.isoformat() if user.last_login else None,
-                "balance": user.regular_profile.balance if user.regular_profile else 0,
-                "risk_level": user.regular_profile.risk_level if user.regular_profile else "low",
-                "credit_score": user.regular_profile.credit_score if user.regular_profile else 0,
-                "national_id": user.national_id,
-                "country": user.country,
-                "city": user.city
+                "id": row.id,
+                "public_id": row.public_id,
+                "email": row.email,
+                "phone": row.phone,
+                "first_name": row.first_name,
+                "last_name": row.last_name,
+                "full_name": row.full_name,
+                "status": row.status.value,
+                "email_verified": row.email_verified,
+                "phone_verified": row.phone_verified,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "last_login": row.last_login.isoformat() if row.last_login else None,
+                "balance": row.balance,
+                "risk_level": row.risk_level,
+                "credit_score": row.credit_score,
+                "national_id": row.national_id,
+                "country": row.country,
+                "city": row.city
             }
-            for user in users
+            for row in rows
         ]
     
+    except (HTTPException, PoolTimeoutError):
+        raise
     except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status_code=500,
             detail=f"خطا در دریافت کاربران: {str(e)}"
         )
 
+def _bulk_selection(selection: BulkUserSelection):
+    """اعتبارسنجی انتخاب گروهی: دقیقاً یکی از ids یا filter"""
+    if (selection.ids is None) == (selection.filter is None):
+        raise HTTPException(status_code=400, detail="دقیقاً یکی از ids یا filter باید ارسال شود")
+    
+    filters = selection.filter.to_filters() if selection.filter else None
+    if selection.filter is not None and not filters:
+        raise HTTPException(status_code=400, detail="فیلتر خالی مجاز نیست")
+    
+    return selection.ids, filters
+
+@router.patch("/bulk/status")
+def bulk_update_regular_users_status(
+    payload: BulkStatusUpdate,
+    db: Session = Depends(get_db),
+    current_admin=Depends(get_current_admin)
+):
+    """تغییر گروهی وضعیت کاربران عادی (لیست ID یا فیلتر)"""
+    ids, filters = _bulk_selection(payload)
+    
+    try:
+        user_manager = get_user_manager(db)
+        result = user_manager.bulk_update_status(
+            user_type="regular",
+            status=payload.status,
+            ids=ids,
+            filters=filters,
+            reason=payload.reason,
+            admin_user_id=current_admin.id
+        )
+        
+        return {
+            "message": "وضعیت کاربران با موفقیت به‌روزرسانی شد",
+            "new_status": payload.status.value,
+            **result
+        }
+    
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطا در به‌روزرسانی گروهی وضعیت: {str(e)}")
+
+@router.post("/bulk/verify-email")
+def bulk_verify_users_email(
+    selection: BulkUserSelection,
+    db: Session = Depends(get_db),
+    current_admin=Depends(get_current_admin)
+):
+    """تأیید دستی گروهی ایمیل کاربران"""
+    ids, filters = _bulk_selection(selection)
+    
+    try:
+        user_manager = get_user_manager(db)
+        result = user_manager.bulk_set_verified("regular", "email_verified", ids=ids, filters=filters)
+        return {"message": "ایمیل کاربران با موفقیت تأیید شد", **result}
+    
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطا در تأیید گروهی ایمیل: {str(e)}")
+
+@router.post("/bulk/verify-phone")
+def bulk_verify_users_phone(
+    selection: BulkUserSelection,
+    db: Session = Depends(get_db),
+    current_admin=Depends(get_current_admin)
+):
+    """تأیید دستی گروهی تلفن کاربران"""
+    ids, filters = _bulk_selection(selection)
+    
+    try:
+        user_manager = get_user_manager(db)
+        result = user_manager.bulk_set_verified("regular", "phone_verified", ids=ids, filters=filters)
+        return {"message": "تلفن کاربران با موفقیت تأیید شد", **result}
+    
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطا در تأیید گروهی تلفن: {str(e)}")
+
+@router.post("/import")
+def import_regular_users(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv یا ndjson (پیش‌فرض: از روی پسوند فایل)"),
+    db: Session = Depends(get_db),
+    current_admin=Depends(get_current_admin)
+):
+    """
+    ورود گروهی کاربران عادی از فایل CSV/NDJSON
+
+    پاسخ به صورت NDJSON جریانی است: خطای هر ردیف، پیشرفت پس از هر دسته و خلاصه نهایی
+    (generator همگام است و StreamingResponse آن را در threadpool پیمایش می‌کند)
+    """
+    try:
+        fmt = detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    events = UserImportService(db).run(file.file, fmt, admin_user_id=current_admin.id)
+    
+    return StreamingResponse(
+        (json.dumps(event, ensure_ascii=False) + "\n" for event in events),
+        media_type="application/x-ndjson"
+    )
+
 @router.get("/{user_id}", response_model=dict)
 async def get_regular_user_details(
     user_id: int,
@@ -115,7 +242,7 @@ async def get_regular_user_details(
             } if user.regular_profile else {}
         }
     
-    except HTTPException:
+    except (HTTPException, PoolTimeoutError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -157,7 +284,7 @@ async def update_regular_user_status(
             "reason": reason
         }
     
-    except HTTPException:
+    except (HTTPException, PoolTimeoutError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -184,6 +311,8 @@ async def verify_user_email(
         
         return {"message": "ایمیل کاربر با موفقیت تأیید شد", "user_id": user_id}
     
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"خطا در تأیید ایمیل: {str(e)}")
@@ -207,6 +336,8 @@ async def verify_user_phone(
         
         return {"message": "تلفن کاربر با موفقیت تأیید شد", "user_id": user_id}
     
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"خطا در تأیید تلفن: {str(e)}")
\ No newline at end of file
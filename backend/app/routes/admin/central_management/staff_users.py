@@ -3,10 +3,11 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from app.database import get_db
+from app.db_routing import get_read_db
 from app.core.user_management import get_user_manager
 from app.models.user_models import User, UserStatus
 from app.core.auth import get_current_admin  # ✅ تغییر اینجا
+from app.core.pool_monitor import PoolTimeoutError
 
 router = APIRouter(prefix="/api/central/staff-users", tags=["Central Management - Staff Users"])
 
@@ -16,7 +17,7 @@ async def get_staff_users(
     limit: int = Query(100, ge=1, le=500),
     department: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin=Depends(get_current_admin)  # ✅ تغییر اینجا
 ):
     """دریافت لیست پرسنل"""
@@ -31,7 +32,8 @@ async def get_staff_users(
             user_type="staff",
             skip=skip,
             limit=limit,
-            filters=filters
+            filters=filters,
+            include_profile=True
         )
         
         # فیلتر بر اساس دپارتمان
@@ -58,6 +60,8 @@ async def get_staff_users(
             for staff in staff_members
         ]
     
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,164 @@
+# backend/app/routes/admin/diagnostics.py
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.db_routing import get_read_db
+from app.core.auth import get_current_admin
+from app.core.permissions import check_permission
+from app.core.query_profiler import SLOW_QUERY_MODULE
+from app.models.audit_models import SystemLog
+from app.services.ledger import reconcile
+from app.services.positions import rebuild_positions
+from app.services.trading_volume import rebuild_trading_stats
+from app.utils.pagination import apply_time_range
+
+router = APIRouter()
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    hours: int = Query(24, ge=1, le=24 * 30),
+    route: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+    current_admin=Depends(get_current_admin)
+):
+    """
+    گزارش کوئری‌های کند گروه‌بندی‌شده بر اساس fingerprint
+
+    تجمیع در خود دیتابیس (GROUP BY روی fingerprint و route، p95 با window function)؛
+    مرتب‌سازی بر اساس مجموع زمان صرف‌شده (بیشترین تأثیر در بالا)
+    """
+    check_permission(current_admin, "audit:read")
+
+    since = datetime.utcnow() - timedelta(hours=hours)
+    fingerprint = SystemLog.details["fingerprint"].as_string()
+    route_name = SystemLog.details["route"].as_string()
+    duration = SystemLog.details["duration_ms"].as_float()
+
+    def scoped(query):
+        query = apply_time_range(query.filter(SystemLog.module == SLOW_QUERY_MODULE), SystemLog.created_at, since)
+        if route:
+            query = query.filter(route_name == route)
+        return query
+
+    # یک ردیف برای هر (fingerprint, route)
+    rows = scoped(db.query(
+        fingerprint.label("fingerprint"),
+        route_name.label("route"),
+        func.count().label("count"),
+        func.sum(duration).label("total_ms"),
+        func.max(duration).label("max_ms"),
+        func.max(SystemLog.created_at).label("last_seen"),
+        func.max(SystemLog.id).label("sample_id"),
+    )).group_by(fingerprint, route_name).all()
+
+    groups = {}
+    for row in rows:
+        group = groups.get(row.fingerprint)
+        if group is None:
+            group = groups[row.fingerprint] = {
+                "fingerprint": row.fingerprint, "routes": {}, "count": 0, "total_ms": 0.0,
+                "max_ms": row.max_ms, "last_seen": row.last_seen, "sample_id": row.sample_id,
+            }
+        group["routes"][row.route or "unknown"] = row.count
+        group["count"] += row.count
+        group["total_ms"] += row.total_ms or 0
+        group["max_ms"] = max(group["max_ms"] or 0, row.max_ms or 0)
+        group["last_seen"] = max(group["last_seen"], row.last_seen)
+        group["sample_id"] = max(group["sample_id"], row.sample_id)
+
+    top = sorted(groups.values(), key=lambda item: item["total_ms"], reverse=True)[:limit]
+    fingerprints = [group["fingerprint"] for group in top]
+
+    p95 = {}
+    samples = {}
+    if fingerprints:
+        # p95 به روش nearest-rank: ردیف ceil(0.95 * n) با حساب صحیح (یکسان در SQLite و PostgreSQL)
+        ranked = scoped(db.query(
+            fingerprint.label("fingerprint"),
+            duration.label("duration"),
+            func.row_number().over(partition_by=fingerprint, order_by=duration).label("position"),
+            func.count().over(partition_by=fingerprint).label("total"),
+        )).filter(fingerprint.in_(fingerprints)).subquery()
+        p95 = dict(db.query(ranked.c.fingerprint, func.max(ranked.c.duration)).filter(
+            ranked.c.position == (ranked.c.total * 95 + 99) // 100
+        ).group_by(ranked.c.fingerprint).all())
+
+        # SQL و شکل پارامترها از آخرین نمونه هر fingerprint
+        sample_ids = [group["sample_id"] for group in top]
+        samples = dict(db.query(SystemLog.id, SystemLog.details).filter(SystemLog.id.in_(sample_ids)).all())
+
+    results = []
+    for group in top:
+        details = samples.get(group.pop("sample_id")) or {}
+        total = group["total_ms"]
+        results.append({
+            "fingerprint": group["fingerprint"],
+            "sql": details.get("sql"),
+            "params_shape": details.get("params_shape"),
+            "routes": group["routes"],
+            "last_seen": group["last_seen"],
+            "count": group["count"],
+            "total_ms": round(total, 2),
+            "avg_ms": round(total / group["count"], 2),
+            "p95_ms": p95.get(group["fingerprint"]),
+            "max_ms": group["max_ms"],
+        })
+
+    return {
+        "since": since,
+        "scanned": sum(group["count"] for group in groups.values()),
+        "fingerprints": len(groups),
+        "slow_queries": results,
+    }
+
+
+@router.post("/ledger/reconcile")
+def reconcile_ledger(
+    account: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_admin=Depends(get_current_admin)
+):
+    """
+    تطبیق افزایشی دفتر کل با snapshot موجودی‌ها
+
+    فقط postingهای پس از آخرین checkpoint هر حساب بازپخش می‌شوند
+    """
+    check_permission(current_admin, "wallet:read")
+    return reconcile(db, accounts=[account] if account else None)
+
+
+@router.post("/positions/rebuild")
+def rebuild_user_positions(
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_admin=Depends(get_current_admin)
+):
+    """
+    ساخت دوباره جدول positions از تاریخچه معاملات
+
+    برای معاملات ثبت‌شده پیش از جدول positions یا بررسی صحت به‌روزرسانی افزایشی
+    """
+    check_permission(current_admin, "wallet:update")
+    return rebuild_positions(db, user_id=user_id)
+
+
+@router.post("/trading-stats/rebuild")
+def rebuild_trading_volume(
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_admin=Depends(get_current_admin)
+):
+    """
+    ساخت دوباره حجم معاملات غلتان و سطح ریسک کاربران از معاملات 30 روز اخیر
+
+    حجم ذخیره‌شده در پروفایل تا معامله بعدی کاربر ثابت می‌ماند؛ این endpoint آن را
+    برای کاربران غیرفعال تازه می‌کند (مثلاً روزانه از cron)
+    """
+    check_permission(current_admin, "wallet:update")
+    return rebuild_trading_stats(db, user_id=user_id)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, timedelta
-from app.database import get_db
+from app.db_routing import get_async_read_db
 from app.core.auth import get_current_admin
 from app.core.permissions import require_permission
 from app.core.audit_logger import get_audit_logs
@@ -23,7 +24,7 @@ async def get_audit_logs_endpoint(
     resource_id: Optional[int] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_admin: AdminUser = Depends(get_current_admin)
 ):
     """
@@ -51,20 +52,20 @@ async def get_audit_logs_endpoint(
                 detail="Invalid end_date format. Use ISO format."
             )
     
-    # ساخت کوئری پایه
-    query = db.query(AuditLog)
+    # ساخت کوئری پایه (session async - event loop مسدود نمی‌شود)
+    query = select(AuditLog)
     
     # اعمال فیلترها
     if user_id:
-        query = query.filter(AuditLog.user_id == user_id)
+        query = query.where(AuditLog.user_id == user_id)
     
     if admin_user_id:
-        query = query.filter(AuditLog.admin_user_id == admin_user_id)
+        query = query.where(AuditLog.admin_user_id == admin_user_id)
     
     if action:
         try:
             audit_action = AuditAction(action)
-            query = query.filter(AuditLog.action == audit_action)
+            query = query.where(AuditLog.action == audit_action)
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -72,19 +73,21 @@ async def get_audit_logs_endpoint(
             )
     
     if resource_type:
-        query = query.filter(AuditLog.resource_type == resource_type)
+        query = query.where(AuditLog.resource_type == resource_type)
     
     if resource_id:
-        query = query.filter(AuditLog.resource_id == resource_id)
+        query = query.where(AuditLog.resource_id == resource_id)
     
     if start_datetime:
-        query = query.filter(AuditLog.created_at >= start_datetime)
+        query = query.where(AuditLog.created_at >= start_datetime)
     
     if end_datetime:
-        query = query.filter(AuditLog.created_at <= end_datetime)
+        query = query.where(AuditLog.created_at <= end_datetime)
     
     # دریافت نتایج
-    logs = query.order_by(AuditLog.created_at.desc()).offset(skip).limit(limit).all()
+    logs = (await db.execute(
+        query.order_by(AuditLog.created_at.desc()).offset(skip).limit(limit)
+    )).scalars().all()
     
     return [
         {
@@ -112,7 +115,7 @@ async def get_audit_logs_endpoint(
 @require_permission("audit:read")
 async def get_audit_stats(
     days: int = Query(7, ge=1, le=365),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_admin: AdminUser = Depends(get_current_admin)
 ):
     """
@@ -121,33 +124,31 @@ async def get_audit_stats(
     start_date = datetime.utcnow() - timedelta(days=days)
     
     # تعداد کل لاگ‌ها
-    total_logs = db.query(AuditLog).filter(AuditLog.created_at >= start_date).count()
+    total_logs = await db.scalar(
+        select(func.count(AuditLog.id)).where(AuditLog.created_at >= start_date)
+    )
     
     # تعداد لاگ‌ها بر اساس action
-    action_stats = db.query(
-        AuditLog.action, 
-        db.func.count(AuditLog.id)
-    ).filter(
-        AuditLog.created_at >= start_date
-    ).group_by(
-        AuditLog.action
-    ).all()
+    action_stats = (await db.execute(
+        select(AuditLog.action, func.count(AuditLog.id))
+        .where(AuditLog.created_at >= start_date)
+        .group_by(AuditLog.action)
+    )).all()
     
     # تعداد لاگ‌ها بر اساس resource_type
-    resource_stats = db.query(
-        AuditLog.resource_type,
-        db.func.count(AuditLog.id)
-    ).filter(
-        AuditLog.created_at >= start_date
-    ).group_by(
-        AuditLog.resource_type
-    ).all()
+    resource_stats = (await db.execute(
+        select(AuditLog.resource_type, func.count(AuditLog.id))
+        .where(AuditLog.created_at >= start_date)
+        .group_by(AuditLog.resource_type)
+    )).all()
     
     # لاگ‌های خطا
-    error_logs = db.query(AuditLog).filter(
-        AuditLog.created_at >= start_date,
-        AuditLog.status_code >= 400
-    ).count()
+    error_logs = await db.scalar(
+        select(func.count(AuditLog.id)).where(
+            AuditLog.created_at >= start_date,
+            AuditLog.status_code >= 400
+        )
+    )
     
     return {
         "period_days": days,
@@ -168,17 +169,18 @@ async def get_user_audit_logs(
     user_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_admin: AdminUser = Depends(get_current_admin)
 ):
     """
     دریافت لاگ‌های مربوط به یک کاربر خاص
     """
-    logs = db.query(AuditLog).filter(
-        AuditLog.user_id == user_id
-    ).order_by(
-        AuditLog.created_at.desc()
-    ).offset(skip).limit(limit).all()
+    logs = (await db.execute(
+        select(AuditLog)
+        .where(AuditLog.user_id == user_id)
+        .order_by(AuditLog.created_at.desc())
+        .offset(skip).limit(limit)
+    )).scalars().all()
     
     return [
         {
@@ -199,17 +201,18 @@ async def get_admin_audit_logs(
     admin_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_admin: AdminUser = Depends(get_current_admin)
 ):
     """
     دریافت لاگ‌های مربوط به یک ادمین خاص
     """
-    logs = db.query(AuditLog).filter(
-        AuditLog.admin_user_id == admin_id
-    ).order_by(
-        AuditLog.created_at.desc()
-    ).offset(skip).limit(limit).all()
+    logs = (await db.execute(
+        select(AuditLog)
+        .where(AuditLog.admin_user_id == admin_id)
+        .order_by(AuditLog.created_at.desc())
+        .offset(skip).limit(limit)
+    )).scalars().all()
     
     return [
         {
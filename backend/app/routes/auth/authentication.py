@@ -1,16 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.core.auth import (
     verify_password, get_password_hash, create_access_token, 
     create_refresh_token, verify_token, ACCESS_TOKEN_EXPIRE_MINUTES,
     get_current_user
 )
+from app.core.pool_monitor import PoolTimeoutError
 from app.models.user_models import User, UserStatus, RegularUserProfile
 from app.models.admin_models import AdminUser, AdminStatus
-from app.core.audit_logger import log_audit
+from app.core.audit_logger import log_audit, log_audit_async
 from app.security.core.hashing import password_manager
 
 # تعریف router - باید در بالاترین قسمت باشد
@@ -20,21 +24,22 @@ router = APIRouter()
 async def admin_login(
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     لاگین مخصوص ادمین
     """
     print(f"🔐 درخواست لاگین ادمین برای: {username}")
     
-    admin_user = db.query(AdminUser).filter(
+    admin_user = (await db.execute(select(AdminUser).where(
         (AdminUser.username == username) | 
         (AdminUser.email == username)
-    ).first()
+    ))).scalars().first()
     
     if not admin_user:
         print(f"❌ ادمین پیدا نشد: {username}")
-        await log_audit(
+        await log_audit_async(
+            db,
             action="admin_login",
             description=f"Failed admin login - user not found: {username}",
             status_code=401
@@ -44,9 +49,10 @@ async def admin_login(
             detail="Invalid credentials"
         )
     
-    if not verify_password(password, admin_user.password_hash):
+    if not await run_in_threadpool(verify_password, password, admin_user.password_hash):
         print(f"❌ پسورد اشتباه برای ادمین: {username}")
-        await log_audit(
+        await log_audit_async(
+            db,
             action="admin_login",
             description=f"Failed admin login - wrong password: {username}",
             status_code=401
@@ -58,7 +64,8 @@ async def admin_login(
     
     if admin_user.status != AdminStatus.ACTIVE:
         print(f"❌ ادمین غیرفعال: {username}")
-        await log_audit(
+        await log_audit_async(
+            db,
             action="admin_login",
             description=f"Failed admin login - account not active: {username}",
             status_code=401
@@ -77,7 +84,8 @@ async def admin_login(
     
     print(f"✅ لاگین موفق ادمین: {username}")
     
-    await log_audit(
+    await log_audit_async(
+        db,
         action="admin_login",
         resource_type="admin",
         resource_id=admin_user.id,
@@ -102,18 +110,19 @@ async def admin_login(
 @router.post("/auth/login")
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # ابتدا در ادمین‌ها جستجو کن
-    admin_user = db.query(AdminUser).filter(
+    # ابتدا در ادمین‌ها جستجو کن (session async - event loop در طول کوئری آزاد است)
+    admin_user = (await db.execute(select(AdminUser).where(
         (AdminUser.username == form_data.username) | 
         (AdminUser.email == form_data.username)
-    ).first()
+    ))).scalars().first()
     
     if admin_user:
         # احراز هویت ادمین
-        if not verify_password(form_data.password, admin_user.password_hash):
-            await log_audit(
+        if not await run_in_threadpool(verify_password, form_data.password, admin_user.password_hash):
+            await log_audit_async(
+                db,
                 action="login",
                 resource_type="admin",
                 resource_id=admin_user.id,
@@ -127,7 +136,8 @@ async def login(
         
         # ✅ اصلاح شده: استفاده از Enum برای بررسی وضعیت
         if admin_user.status != AdminStatus.ACTIVE:
-            await log_audit(
+            await log_audit_async(
+                db,
                 action="login", 
                 resource_type="admin",
                 resource_id=admin_user.id,
@@ -149,7 +159,8 @@ async def login(
             data={"user_id": admin_user.id, "type": "admin"}
         )
         
-        await log_audit(
+        await log_audit_async(
+            db,
             action="login",
             resource_type="admin", 
             resource_id=admin_user.id,
@@ -173,14 +184,15 @@ async def login(
         }
     
     # اگر ادمین نبود، در کاربران عادی جستجو کن
-    user = db.query(User).filter(
+    user = (await db.execute(select(User).where(
         (User.email == form_data.username) | 
         (User.phone == form_data.username)
-    ).first()
+    ))).scalars().first()
     
     if user:
-        if not verify_password(form_data.password, user.password_hash):
-            await log_audit(
+        if not await run_in_threadpool(verify_password, form_data.password, user.password_hash):
+            await log_audit_async(
+                db,
                 action="login",
                 resource_type="user",
                 resource_id=user.id,
@@ -194,7 +206,8 @@ async def login(
         
         # ✅ اصلاح شده: استفاده از Enum برای بررسی وضعیت کاربر
         if user.status != UserStatus.ACTIVE:
-            await log_audit(
+            await log_audit_async(
+                db,
                 action="login",
                 resource_type="user",
                 resource_id=user.id,
@@ -216,7 +229,8 @@ async def login(
             data={"user_id": user.id, "type": "user"}
         )
         
-        await log_audit(
+        await log_audit_async(
+            db,
             action="login",
             resource_type="user",
             resource_id=user.id,
@@ -240,7 +254,8 @@ async def login(
         }
     
     # اگر کاربری یافت نشد
-    await log_audit(
+    await log_audit_async(
+        db,
         action="login",
         description=f"Failed login attempt - user not found: {form_data.username}",
         status_code=401
@@ -372,8 +387,8 @@ async def quick_register(
             }
         }
         
-    except HTTPException:
-        # خطاهای HTTP که قبلاً مدیریت شده‌اند
+    except (HTTPException, PoolTimeoutError):
+        # خطاهای HTTP که قبلاً مدیریت شده‌اند (و اشباع pool که handler سراسری 503 می‌دهد)
         raise
     except Exception as e:
         db.rollback()
@@ -501,6 +516,8 @@ async def register_user(
             }
         }
         
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         db.rollback()
         await log_audit(
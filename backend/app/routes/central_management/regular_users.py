@@ -7,6 +7,7 @@ from app.database import get_db
 from app.core.user_management import get_user_manager
 from app.models.user_models import User, UserStatus
 from app.core.auth import get_current_admin
+from app.core.pool_monitor import PoolTimeoutError
 
 router = APIRouter(prefix="/api/central/regular-users", tags=["Central Management - Regular Users"])
 
@@ -60,6 +61,8 @@ async def get_regular_users(
             for user in users
         ]
     
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -115,7 +118,7 @@ async def get_regular_user_details(
             } if user.regular_profile else {}
         }
     
-    except HTTPException:
+    except (HTTPException, PoolTimeoutError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -157,7 +160,7 @@ async def update_regular_user_status(
             "reason": reason
         }
     
-    except HTTPException:
+    except (HTTPException, PoolTimeoutError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -184,6 +187,8 @@ async def verify_user_email(
         
         return {"message": "ایمیل کاربر با موفقیت تأیید شد", "user_id": user_id}
     
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"خطا در تأیید ایمیل: {str(e)}")
@@ -207,6 +212,8 @@ async def verify_user_phone(
         
         return {"message": "تلفن کاربر با موفقیت تأیید شد", "user_id": user_id}
     
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"خطا در تأیید تلفن: {str(e)}")
\ No newline at end of file
@@ -7,6 +7,7 @@ from app.database import get_db
 from app.core.user_management import get_user_manager
 from app.models.user_models import User, UserStatus
 from app.core.auth import get_current_admin  # ✅ تغییر اینجا
+from app.core.pool_monitor import PoolTimeoutError
 
 router = APIRouter(prefix="/api/central/staff-users", tags=["Central Management - Staff Users"])
 
@@ -58,6 +59,8 @@ async def get_staff_users(
             for staff in staff_members
         ]
     
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
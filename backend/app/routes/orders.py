@@ -0,0 +1,122 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models.user_models import User
+from ..schemas.trade_schemas import LimitOrderCreate
+from ..routes.trades import get_current_trader
+from ..services.order_book import order_books, notional, Order, QUANTITY_SCALE, INSTRUMENTS, BUY, SelfMatchError
+from ..services.trade_execution import (
+    reserve_order_funds, release_order_funds, settle_fills, order_reference,
+    InsufficientBalanceError, WalletNotFoundError
+)
+
+router = APIRouter(prefix="/api/orders", tags=["orders"])
+
+def _get_book(instrument: str):
+    if instrument not in INSTRUMENTS:
+        raise HTTPException(status_code=404, detail="Instrument not found")
+    return order_books.get(instrument)
+
+def _order_response(instrument: str, order: Order) -> dict:
+    return {
+        "order_id": order.order_id,
+        "instrument": instrument,
+        "side": order.side,
+        "price": order.price,
+        "amount": order.quantity / QUANTITY_SCALE,
+        "filled": order.filled / QUANTITY_SCALE,
+        "remaining": order.remaining / QUANTITY_SCALE,
+        "status": "filled" if not order.remaining else ("partial" if order.filled else "open"),
+    }
+
+@router.post("/")
+def place_limit_order(
+    order: LimitOrderCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_trader)
+):
+    """
+    ثبت سفارش محدود؛ بخش قابل تطبیق فوراً اجرا و باقی‌مانده در دفتر می‌ماند
+
+    وجه سفارش خرید پیش از ورود به دفتر رزرو می‌شود تا تسویه fillها همیشه ممکن باشد؛
+    اگر تسویه یا ثبت شکست بخورد دفتر دست‌نخورده می‌ماند و رزرو آزاد می‌شود.
+    سفارشی که با سفارش منتظر خود کاربر تطبیق بخورد رد می‌شود
+    """
+    book = _get_book(order.instrument)
+    quantity = round(order.amount * QUANTITY_SCALE)
+    if quantity <= 0:
+        raise HTTPException(status_code=400, detail="Amount too small")
+    
+    reserved = notional(order.price, quantity) if order.side == BUY else 0
+    if reserved:
+        try:
+            reserve_order_funds(db, current_user.id, reserved)
+        except InsufficientBalanceError:
+            raise HTTPException(status_code=400, detail="Insufficient balance")
+        except WalletNotFoundError:
+            raise HTTPException(status_code=404, detail="Wallet not found")
+    
+    try:
+        # تسویه بین intent و commit سفارش در journal انجام می‌شود؛ اگر شکست بخورد تطبیق در دفتر
+        # برمی‌گردد و رزرو (با مرجع سفارش، برای بازیابی journal) زیر قفل دفتر آزاد می‌شود
+        # سهم هر fill از رزرو خریدار همان‌جا مصرف می‌شود (اختلاف قیمت به کیف پول برمی‌گردد)
+        placed, fills, trades = book.place_and_settle(
+            current_user.id, order.side, order.price, quantity,
+            settle=lambda fills: settle_fills(db, fills),
+            abort=lambda failed: release_order_funds(
+                db, current_user.id, reserved, order_reference(order.instrument), failed.order_id
+            )
+        )
+    except SelfMatchError:
+        release_order_funds(db, current_user.id, reserved)
+        raise HTTPException(status_code=400, detail="Order would match your own resting order")
+    
+    return {
+        **_order_response(order.instrument, placed),
+        "fills": [
+            {"price": fill.price, "amount": fill.quantity / QUANTITY_SCALE, "taker_side": fill.taker_side}
+            for fill in fills
+        ],
+        "trade_ids": [trade.id for trade in trades],
+    }
+
+@router.delete("/{instrument}/{order_id}")
+def cancel_limit_order(
+    instrument: str,
+    order_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_trader)
+):
+    """لغو باقی‌مانده سفارش و آزادسازی وجه رزروشده آن"""
+    book = _get_book(instrument)
+    resting = book.orders.get(order_id)
+    if resting is None or resting.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    def release(resting: Order) -> None:
+        # زیر قفل دفتر و پیش از حذف سفارش: فقط سهم بخش پرنشده برمی‌گردد؛ اگر شکست بخورد سفارش می‌ماند
+        if resting.side == BUY:
+            release_order_funds(
+                db, current_user.id,
+                notional(resting.price, resting.quantity) - notional(resting.price, resting.filled),
+                order_reference(instrument), resting.order_id
+            )
+
+    cancelled = book.cancel(order_id, release=release)
+    if cancelled is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return {**_order_response(instrument, cancelled), "status": "cancelled"}
+
+@router.get("/book/{instrument}")
+def get_order_book(instrument: str, levels: int = Query(10, ge=1, le=100)):
+    """عمق دفتر سفارش (مجموع مقدار هر سطح قیمت)"""
+    book = _get_book(instrument)
+    depth = book.depth(levels)
+    return {
+        "instrument": instrument,
+        "best_bid": depth["best_bid"],
+        "best_ask": depth["best_ask"],
+        "bids": [{"price": price, "amount": total / QUANTITY_SCALE} for price, total in depth["bids"]],
+        "asks": [{"price": price, "amount": total / QUANTITY_SCALE} for price, total in depth["asks"]],
+    }
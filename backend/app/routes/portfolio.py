@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models.trade_models import Position
+from ..models.user_models import User, RegularUserProfile
+from ..schemas.trade_schemas import PortfolioResponse
+from ..routes.trades import get_current_trader
+from ..services.ledger import get_balance, hold_account, wallet_account
+from ..services.positions import value_positions
+from ..services.price_table import price_table
+
+router = APIRouter(prefix="/api/portfolio", tags=["portfolio"])
+
+@router.get("/", response_model=PortfolioResponse)
+def get_portfolio(
+    # primary: پورتفو بلافاصله پس از معامله یا سفارش خوانده می‌شود (read-your-writes)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_trader)
+):
+    """
+    پورتفوی کاربر از جدول positions (بدون جمع زدن معاملات)
+
+    سود/زیان تحقق‌نیافته با قیمت لحظه‌ای محاسبه می‌شود؛ موقعیت‌های کاملاً بسته‌شده
+    فقط برای سود/زیان تحقق‌یافته برگردانده می‌شوند. وجه رزروشده سفارش‌های باز (حساب hold)
+    جزو دارایی کل است
+    """
+    positions = (
+        db.query(Position)
+        .filter(Position.user_id == current_user.id, or_(Position.quantity != 0, Position.realized_pnl != 0))
+        .order_by(Position.instrument)
+        .all()
+    )
+    prices = price_table.prices(position.instrument for position in positions)
+    portfolio = value_positions(positions, prices)
+    cash = get_balance(db, wallet_account(current_user.id))
+    if cash is None:
+        # کیف پول هنوز در دفتر کل باز نشده
+        cash = db.query(RegularUserProfile.balance).filter(RegularUserProfile.user_id == current_user.id).scalar()
+    held = get_balance(db, hold_account(current_user.id)) or 0
+    portfolio["cash_balance"] = cash
+    portfolio["held_balance"] = held
+    portfolio["total_equity"] = cash + held + portfolio["market_value"] if cash is not None else None
+    return portfolio
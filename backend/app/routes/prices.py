@@ -1,21 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException
 from typing import List
 
-from ..database import get_db
-from ..models.models import GoldPrice
-from ..schemas.schemas import GoldPriceResponse
+from ..schemas.trade_schemas import GoldPriceResponse
+from ..services.price_table import price_table
 
 router = APIRouter(prefix="/api/prices", tags=["prices"])
 
+# قیمت‌ها از جدول درون‌حافظه‌ای خوانده می‌شوند (بدون کوئری دیتابیس)
+
 @router.get("/", response_model=List[GoldPriceResponse])
-def get_gold_prices(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    prices = db.query(GoldPrice).offset(skip).limit(limit).all()
-    return prices
+def get_gold_prices(skip: int = 0, limit: int = 100):
+    return price_table.all()[skip:skip + limit]
 
 @router.get("/{gold_type}", response_model=GoldPriceResponse)
-def get_gold_price(gold_type: str, db: Session = Depends(get_db)):
-    price = db.query(GoldPrice).filter(GoldPrice.gold_type == gold_type).first()
+def get_gold_price(gold_type: str):
+    price = price_table.get(gold_type)
     if price is None:
         raise HTTPException(status_code=404, detail="Gold type not found")
-    return price
\ No newline at end of file
+    return price
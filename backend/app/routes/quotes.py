@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..models.user_models import User
+from ..schemas.trade_schemas import QuoteRequest, QuoteResponse
+from ..routes.trades import get_current_trader
+from ..services.price_table import price_table
+from ..services.quotes import issue_quote
+
+router = APIRouter(prefix="/api/quotes", tags=["quotes"])
+
+@router.post("/", response_model=QuoteResponse)
+def create_quote(
+    request: QuoteRequest,
+    current_user: User = Depends(get_current_trader)
+):
+    """
+    صدور quote امضاشده و کوتاه‌عمر (QUOTE_TTL_SECONDS) برای یک دارایی
+
+    ارسال quote_token همراه ثبت معامله، معامله را با همین قیمت و بدون خواندن قیمت اجرا می‌کند
+    """
+    price = price_table.price(request.gold_type)
+    if price is None:
+        raise HTTPException(status_code=404, detail="Gold type not found")
+    return issue_quote(current_user.id, request.gold_type, price)
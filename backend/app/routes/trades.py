@@ -1,83 +1,247 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
 from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
 
 from ..database import get_db
-from ..models.models import Trade, User, GoldPrice
-from ..schemas.schemas import TradeCreate, TradeResponse
-from app.security.auth import verify_token
+from ..models.trade_models import Trade
+from ..models.user_models import User
+from ..schemas.trade_schemas import (
+    TradeCreate, TradeResponse, TradeBatchCreate, TradeBatchResponse, TradeLegResult
+)
+from ..core.auth import get_current_user
+from ..services.trade_execution import (
+    execute_trade, execute_trade_batch, InsufficientBalanceError, TradingLimitError, WalletNotFoundError
+)
+from ..services import idempotency
+from ..services.price_table import price_table
+from ..services.quotes import QuoteError, verify_quote
+from ..services.idempotency import (
+    IdempotencyClaimLostError, IdempotencyInProgressError, IdempotencyKeyReusedError, StoredResponse,
+    request_fingerprint
+)
+from ..utils.pagination import apply_keyset, apply_time_range, decode_cursor, next_cursor
 
 router = APIRouter(prefix="/api/trades", tags=["trades"])
 
-def get_current_user(token: str, db: Session = Depends(get_db)):
-    username = verify_token(token)
-    if username is None:
+EXPORT_BATCH_SIZE = 1000
+
+def get_current_trader(current_user=Depends(get_current_user)) -> User:
+    """فقط کاربران عادی معامله می‌کنند (توکن ادمین پذیرفته نمی‌شود)"""
+    if not isinstance(current_user, User):
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only regular users can trade",
         )
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return current_user
 
 @router.post("/", response_model=TradeResponse)
 def create_trade(
     trade: TradeCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_trader),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255)
 ):
-    # Get current gold price
-    gold_price = db.query(GoldPrice).filter(GoldPrice.gold_type == trade.gold_type).first()
-    if not gold_price:
-        raise HTTPException(status_code=404, detail="Gold type not found")
-    
-    total_amount = trade.amount * gold_price.price
-    
-    # Check user balance for buy trades
-    if trade.trade_type == "buy":
-        if current_user.balance < total_amount:
-            raise HTTPException(
-                status_code=400, 
-                detail="Insufficient balance"
-            )
-        # Deduct from balance
-        current_user.balance -= total_amount
-    else:  # sell
-        # For now, just add to balance
-        current_user.balance += total_amount
+    """
+    ثبت معامله با قیمت لحظه‌ای یا قیمت quote_token (از POST /api/quotes/)
+
+    با هدر Idempotency-Key تکرار درخواست (مثلاً پس از timeout) معامله دوباره اجرا نمی‌کند
+    و همان پاسخ اول (با هدر Idempotent-Replayed) برمی‌گردد
+    """
+    if idempotency_key is None:
+        return _execute_trade(db, trade, current_user)
+
+    try:
+        outcome = idempotency.begin(
+            db, current_user.id, idempotency_key, "POST /api/trades/", request_fingerprint(trade.model_dump())
+        )
+    except IdempotencyKeyReusedError:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was used with a different request")
+    except IdempotencyInProgressError:
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"},
+        )
+
+    if isinstance(outcome, StoredResponse):
+        return JSONResponse(outcome.body, status_code=outcome.status_code, headers={"Idempotent-Replayed": "true"})
+
+    claim = outcome
+    try:
+        # پاسخ در همان تراکنش معامله ذخیره می‌شود
+        return _execute_trade(db, trade, current_user, on_executed=lambda executed: idempotency.complete(
+            db, claim, 200, TradeResponse.model_validate(executed).model_dump(mode="json")
+        ))
+    except IdempotencyClaimLostError:
+        # رزرو پس از مهلت قفل توسط تکرار دیگری تصاحب شد: معامله برگردانده می‌شود و صاحب جدید اجرا می‌کند
+        idempotency.release(db, claim)
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"},
+        )
+    except Exception:
+        # فقط پاسخ موفق ذخیره می‌شود: خطاها (موجودی ناکافی، سقف حجم، quote منقضی و ...) اثری
+        # نگذاشته‌اند و ممکن است در تکرار تغییر کنند (مثلاً پس از واریز)، پس تکرار دوباره اجرا می‌شود
+        idempotency.release(db, claim)
+        raise
+    finally:
+        idempotency.finish(claim)
+
+def _execute_trade(db: Session, trade: TradeCreate, current_user: User, on_executed=None) -> Trade:
+    if trade.quote_token:
+        # قیمت از quote امضاشده (همان قیمتی که کاربر دیده)؛ بدون خواندن قیمت از دیتابیس
+        try:
+            unit_price = verify_quote(trade.quote_token, current_user.id, trade.gold_type)
+        except QuoteError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        # قیمت لحظه‌ای از جدول قیمت درون‌حافظه‌ای
+        unit_price = price_table.price(trade.gold_type)
+        if unit_price is None:
+            raise HTTPException(status_code=404, detail="Gold type not found")
     
-    # Create trade record
-    db_trade = Trade(
-        user_id=current_user.id,
-        gold_type=trade.gold_type,
-        amount=trade.amount,
-        price=gold_price.price,
-        total_amount=total_amount,
-        trade_type=trade.trade_type,
-        status="completed"
+    # بررسی و کسر موجودی در یک UPDATE شرطی (بدون خواندن موجودی در پایتون)
+    try:
+        return execute_trade(
+            db,
+            user_id=current_user.id,
+            gold_type=trade.gold_type,
+            amount=trade.amount,
+            trade_type=trade.trade_type,
+            unit_price=unit_price,
+            on_executed=on_executed
+        )
+    except InsufficientBalanceError:
+        raise HTTPException(
+            status_code=400, 
+            detail="Insufficient balance"
+        )
+    except TradingLimitError:
+        raise HTTPException(status_code=403, detail="Trading limit exceeded")
+    except WalletNotFoundError:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+
+@router.post("/batch", response_model=TradeBatchResponse)
+def create_trade_batch(
+    batch: TradeBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_trader)
+):
+    """
+    ثبت دسته‌ای معاملات (میز OTC)
+
+    همه legها با یک snapshot از جدول قیمت یا quote_token خودشان قیمت‌گذاری می‌شوند؛
+    legهای با دارایی یا quote نامعتبر رد و بقیه با یک INSERT چندردیفی و یک بررسی موجودی خالص در یک تراکنش ثبت می‌شوند
+    """
+    prices = price_table.prices({leg.gold_type for leg in batch.trades if not leg.quote_token})
+
+    results = [None] * len(batch.trades)
+    accepted = []
+    legs = []
+    for index, leg in enumerate(batch.trades):
+        if leg.quote_token:
+            try:
+                unit_price = verify_quote(leg.quote_token, current_user.id, leg.gold_type)
+            except QuoteError as e:
+                results[index] = TradeLegResult(index=index, status="rejected", error=str(e))
+                continue
+        elif leg.gold_type in prices:
+            unit_price = prices[leg.gold_type]
+        else:
+            results[index] = TradeLegResult(index=index, status="rejected", error="Gold type not found")
+            continue
+        accepted.append(index)
+        legs.append((leg.gold_type, leg.amount, leg.trade_type, unit_price))
+
+    trades, balance_after = [], None
+    if accepted:
+        try:
+            trades, balance_after = execute_trade_batch(db, current_user.id, legs)
+        except InsufficientBalanceError:
+            raise HTTPException(status_code=400, detail="Insufficient balance")
+        except TradingLimitError:
+            raise HTTPException(status_code=403, detail="Trading limit exceeded")
+        except WalletNotFoundError:
+            raise HTTPException(status_code=404, detail="Wallet not found")
+
+    for index, executed in zip(accepted, trades):
+        results[index] = TradeLegResult(
+            index=index, status="completed", trade=TradeResponse.model_validate(executed)
+        )
+
+    return TradeBatchResponse(
+        completed=len(trades),
+        rejected=len(batch.trades) - len(trades),
+        total_debit=sum(t.total_amount for t in trades if t.trade_type == "buy"),
+        total_credit=sum(t.total_amount for t in trades if t.trade_type == "sell"),
+        balance_after=balance_after,
+        results=results
     )
-    
-    db.add(db_trade)
-    db.commit()
-    db.refresh(db_trade)
-    
-    return db_trade
+
+def _trade_history_query(db: Session, user_id: int, instrument: Optional[str], side: Optional[str],
+                         since: Optional[datetime], until: Optional[datetime]):
+    query = db.query(Trade).filter(Trade.user_id == user_id)
+    if instrument:
+        query = query.filter(Trade.gold_type == instrument)
+    if side:
+        query = query.filter(Trade.trade_type == side)
+    return apply_time_range(query, Trade.created_at, since, until)
+
+def _stream_trades(query, cursor: Optional[str], batch_size: int = EXPORT_BATCH_SIZE):
+    """خروجی NDJSON با صفحه‌های keyset پشت سر هم (بدون نگه داشتن cursor باز دیتابیس)"""
+    while True:
+        page = apply_keyset(query, Trade.created_at, Trade.id, cursor).limit(batch_size).all()
+        for trade in page:
+            yield TradeResponse.model_validate(trade).model_dump_json() + "\n"
+        cursor = next_cursor(page, batch_size)
+        if cursor is None:
+            return
 
 @router.get("/", response_model=List[TradeResponse])
 def get_user_trades(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    instrument: Optional[str] = Query(None, max_length=50, description="نوع دارایی (gold_type)"),
+    side: Optional[Literal["buy", "sell"]] = None,
+    since: Optional[datetime] = Query(None, description="از این زمان (شامل)"),
+    until: Optional[datetime] = Query(None, description="تا این زمان (غیرشامل)"),
+    format: Literal["json", "ndjson"] = "json",
+    # primary: معامله‌ای که کاربر همین حالا ثبت کرده باید در تاریخچه باشد (replica ممکن است عقب باشد)
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_trader)
 ):
-    trades = db.query(Trade).filter(Trade.user_id == current_user.id).all()
+    """
+    تاریخچه معاملات کاربر، جدیدترین اول
+
+    صفحه‌بندی keyset روی (created_at, id): cursor صفحه بعد در هدر X-Next-Cursor برگردانده می‌شود
+    format=ndjson همه معاملات (از cursor به بعد) را به صورت جریانی برای خروجی گرفتن می‌فرستد
+    """
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    query = _trade_history_query(db, current_user.id, instrument, side, since, until)
+
+    if format == "ndjson":
+        return StreamingResponse(_stream_trades(query, cursor), media_type="application/x-ndjson")
+
+    trades = apply_keyset(query, Trade.created_at, Trade.id, cursor).limit(limit).all()
+    cursor_value = next_cursor(trades, limit)
+    if cursor_value:
+        response.headers["X-Next-Cursor"] = cursor_value
     return trades
 
 @router.get("/{trade_id}", response_model=TradeResponse)
 def get_trade(
     trade_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_trader)
 ):
     trade = db.query(Trade).filter(
         Trade.id == trade_id, 
@@ -86,4 +250,4 @@ def get_trade(
     
     if trade is None:
         raise HTTPException(status_code=404, detail="Trade not found")
-    return trade
\ No newline at end of file
+    return trade
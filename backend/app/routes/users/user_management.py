@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
+from app.db_routing import get_read_db
 from app.core.auth import get_current_admin
 from app.core.permissions import require_permission, check_permission
 from app.core.audit_logger import log_admin_activity
+from app.core.user_search import apply_user_search
+from app.utils.pagination import apply_keyset, next_cursor
+from app.services.user_stats import user_stats_service
 from app.models.user_models import User, UserStatus
 from app.models.admin_models import AdminUser
 
@@ -13,15 +17,19 @@ router = APIRouter()
 @router.get("/", response_model=List[dict])
 @require_permission("user:read")
 async def get_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_admin: AdminUser = Depends(get_current_admin)
 ):
     """
     دریافت لیست کاربران با قابلیت فیلتر و جستجو
+
+    صفحه‌بندی keyset: cursor صفحه بعد در هدر X-Next-Cursor برگردانده می‌شود
     """
     query = db.query(User)
     
@@ -29,17 +37,26 @@ async def get_users(
     if status:
         query = query.filter(User.status == UserStatus(status))
     
-    # جستجو در نام، ایمیل و تلفن
+    # جستجو در نام، ایمیل و تلفن (از طریق ایندکس جستجو)
     if search:
-        search_filter = (
-            (User.first_name.ilike(f"%{search}%")) |
-            (User.last_name.ilike(f"%{search}%")) |
-            (User.email.ilike(f"%{search}%")) |
-            (User.phone.ilike(f"%{search}%"))
+        query = apply_user_search(query, db, search)
+    
+    try:
+        query = apply_keyset(query, User.created_at, User.id, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
         )
-        query = query.filter(search_filter)
     
-    users = query.offset(skip).limit(limit).all()
+    if not cursor and skip:
+        query = query.offset(skip)
+    
+    users = query.limit(limit).all()
+    
+    cursor_value = next_cursor(users, limit)
+    if cursor_value:
+        response.headers["X-Next-Cursor"] = cursor_value
     
     return [
         {
@@ -151,20 +168,17 @@ async def update_user_status(
 @router.get("/count/stats")
 @require_permission("user:read")
 async def get_user_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin: AdminUser = Depends(get_current_admin)
 ):
     """
-    دریافت آمار کاربران
+    دریافت آمار کاربران (یک کوئری GROUP BY با کش کوتاه‌مدت)
     """
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.status == UserStatus.ACTIVE).count()
-    pending_users = db.query(User).filter(User.status == UserStatus.PENDING).count()
-    suspended_users = db.query(User).filter(User.status == UserStatus.SUSPENDED).count()
+    stats = user_stats_service.get_stats(db)
     
     return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "pending_users": pending_users,
-        "suspended_users": suspended_users
+        "total_users": user_stats_service.count_users(stats),
+        "active_users": user_stats_service.count_users(stats, status=UserStatus.ACTIVE.value),
+        "pending_users": user_stats_service.count_users(stats, status=UserStatus.PENDING.value),
+        "suspended_users": user_stats_service.count_users(stats, status=UserStatus.SUSPENDED.value)
     }
\ No newline at end of file
@@ -0,0 +1,101 @@
+# backend/app/schemas/trade_schemas.py
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class TradeCreate(BaseModel):
+    """درخواست خرید/فروش با قیمت لحظه‌ای"""
+    gold_type: str = Field(..., min_length=1, max_length=50)
+    amount: float = Field(..., gt=0)
+    trade_type: Literal["buy", "sell"]
+    quote_token: Optional[str] = Field(None, max_length=1024)  # اجرا با قیمت quote (بدون خواندن قیمت)
+
+
+class QuoteRequest(BaseModel):
+    gold_type: str = Field(..., min_length=1, max_length=50)
+
+
+class QuoteResponse(BaseModel):
+    quote_token: str
+    gold_type: str
+    price: int
+    expires_at: datetime
+
+
+class TradeResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: int
+    gold_type: str
+    amount: float
+    price: int
+    total_amount: int
+    trade_type: str
+    status: str
+    created_at: Optional[datetime] = None
+    balance_after: Optional[int] = None
+
+
+class TradeBatchCreate(BaseModel):
+    """چند معامله در یک درخواست (میز OTC) - همه با یک snapshot قیمت و در یک تراکنش"""
+    trades: List[TradeCreate] = Field(..., min_length=1, max_length=500)
+
+
+class TradeLegResult(BaseModel):
+    index: int
+    status: Literal["completed", "rejected"]
+    trade: Optional[TradeResponse] = None
+    error: Optional[str] = None
+
+
+class TradeBatchResponse(BaseModel):
+    completed: int
+    rejected: int
+    total_debit: int       # مجموع خریدها (ریال)
+    total_credit: int      # مجموع فروش‌ها (ریال)
+    balance_after: Optional[int] = None
+    results: List[TradeLegResult]
+
+
+class LimitOrderCreate(BaseModel):
+    """سفارش محدود در دفتر سفارش (قیمت به ریال برای هر واحد)"""
+    instrument: Literal["gold", "silver", "brent"]
+    side: Literal["buy", "sell"]
+    price: int = Field(..., gt=0)
+    amount: float = Field(..., gt=0)
+
+
+class GoldPriceResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    gold_type: str
+    price: int
+    updated_at: Optional[datetime] = None
+
+
+class PositionResponse(BaseModel):
+    instrument: str
+    quantity: float
+    avg_cost: Optional[int] = None
+    cost_basis: int
+    market_price: Optional[int] = None
+    market_value: Optional[int] = None
+    unrealized_pnl: Optional[int] = None
+    realized_pnl: int
+    trade_count: int
+
+
+class PortfolioResponse(BaseModel):
+    """پورتفو: موقعیت‌ها با ارزش روز، موجودی نقد و جمع‌ها (ریال)"""
+    cash_balance: Optional[int] = None
+    held_balance: int = 0  # وجه رزروشده سفارش‌های خرید باز (بخشی از دارایی کاربر)
+    market_value: int
+    cost_basis: int
+    unrealized_pnl: int
+    realized_pnl: int
+    total_equity: Optional[int] = None
+    positions: List[PositionResponse]
@@ -0,0 +1,36 @@
+# backend/app/schemas/user_schemas.py
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.models.user_models import UserStatus
+
+# سقف تعداد ID در یک درخواست گروهی
+MAX_BULK_IDS = 50000
+
+
+class BulkUserFilter(BaseModel):
+    """عبارت فیلتر برای انتخاب گروهی کاربران"""
+    status: Optional[UserStatus] = None
+    search: Optional[str] = None
+    email_verified: Optional[bool] = None
+    phone_verified: Optional[bool] = None
+    created_from: Optional[datetime] = None  # بازه [created_from, created_to) مانند لیست‌ها
+    created_to: Optional[datetime] = None
+
+    def to_filters(self) -> dict:
+        """تبدیل به دیکشنری filters مورد استفاده CentralUserManager"""
+        return self.model_dump(exclude_none=True)
+
+
+class BulkUserSelection(BaseModel):
+    """انتخاب کاربران: لیست ID یا عبارت فیلتر (دقیقاً یکی)"""
+    ids: Optional[List[int]] = Field(default=None, max_length=MAX_BULK_IDS)
+    filter: Optional[BulkUserFilter] = None
+
+
+class BulkStatusUpdate(BulkUserSelection):
+    """تغییر گروهی وضعیت کاربران"""
+    status: UserStatus
+    reason: str = ""
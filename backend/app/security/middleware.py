@@ -1,43 +1,99 @@
-from fastapi import Request
 from fastapi.responses import JSONResponse
-import time
-from typing import Dict, List
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.request_context import ip_in_networks, parse_networks, resolve_client_ip
+from app.security.rate_limit import (
+    SlidingWindowRateLimiter, SharedSlidingWindowRateLimiter, IPBlockList,
+    DEFAULT_ROUTE_LIMITS, classify_route
+)
+from app.security.shared_state import MemoryStore, create_store
 
-class SecurityMiddleware(BaseHTTPMiddleware):
+# هدرهای امنیتی که به همه پاسخ‌ها اضافه می‌شوند
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+}
+
+class SecurityMiddleware:
     """
-    میدلور امنیتی برای پارسا گلد
+    میدلور امنیتی برای پارسا گلد (ASGI خام)
     - Rate Limiting
     - Block ابزارهای هک
     - هدرهای امنیتی
+    
+    بدون BaseHTTPMiddleware: پاسخ بافر نمی‌شود و هدرها هنگام ارسال
+    پیام http.response.start اضافه می‌شوند (استریم‌ها سالم می‌مانند)
     """
     
-    def __init__(self, app):
-        super().__init__(app)
-        self.rate_limit_requests: Dict[str, List[float]] = {}
+    def __init__(self, app: ASGIApp, rate_limiter=None, store=None, trusted_proxies: str = None):
+        self.app = app
+        self.trusted_proxies = parse_networks(
+            settings.TRUSTED_PROXIES if trusted_proxies is None else trusted_proxies
+        )
         self.rate_limit_window = 60  # 60 ثانیه
         self.max_requests_per_minute = 100
-        self.blocked_ips = set()
+        limits = {**DEFAULT_ROUTE_LIMITS, "default": self.max_requests_per_minute}
+        
+        if store is None and settings.RATE_LIMIT_BACKEND != "memory":
+            store = create_store(settings.RATE_LIMIT_BACKEND, settings.RATE_LIMIT_STORE_URL)
+        
+        if store is not None:
+            # وضعیت مشترک بین workerها
+            if rate_limiter is None:
+                rate_limiter = SharedSlidingWindowRateLimiter(
+                    store, window_seconds=self.rate_limit_window, limits=limits
+                )
+            self.blocked_ips = IPBlockList(store)
+        else:
+            if rate_limiter is None:
+                rate_limiter = SlidingWindowRateLimiter(
+                    window_seconds=self.rate_limit_window, limits=limits
+                )
+            self.blocked_ips = set()
+        
+        self.rate_limiter = rate_limiter
+        # backendهای SQLite/Redis I/O مسدودکننده دارند (قفل فایل تا timeout)؛ خارج از event loop اجرا می‌شوند
+        self.offload_checks = store is not None and not isinstance(store, MemoryStore)
     
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        client_ip = resolve_client_ip(scope, self.trusted_proxies)
+        
+        route_class = classify_route(scope["path"])
+        if self.offload_checks:
+            verdict = await run_in_threadpool(self.admit, client_ip, route_class)
+        else:
+            verdict = self.admit(client_ip, route_class)
         
         # بررسی IP bloque شده
-        if client_ip in self.blocked_ips:
-            return JSONResponse(
+        if verdict == "blocked":
+            response = JSONResponse(
                 status_code=403,
-                content={"detail": "دسترسی مسدود شده"}
+                content={"detail": "دسترسی مسدود شده"},
+                headers=SECURITY_HEADERS
             )
+            await response(scope, receive, send)
+            return
         
         # بررسی Rate Limiting
-        if not self.check_rate_limit(client_ip):
-            return JSONResponse(
+        if verdict == "rate_limited":
+            response = JSONResponse(
                 status_code=429,
-                content={"detail": "تعداد درخواست‌ها بیش از حد مجاز است"}
+                content={"detail": "تعداد درخواست‌ها بیش از حد مجاز است"},
+                headers={**SECURITY_HEADERS, "Retry-After": str(self.rate_limiter.retry_after())}
             )
+            await response(scope, receive, send)
+            return
         
         # بررسی User-Agent (غیرفعال موقت برای تست)
-        user_agent = request.headers.get("user-agent", "")
+        user_agent = Headers(scope=scope).get("user-agent", "")
         if self.is_suspicious_user_agent(user_agent):
             print(f"⚠️ User-Agent مشکوک شناسایی شد: {user_agent}")
             # فعلاً فقط لاگ کن، مسدود نکن
@@ -47,36 +103,28 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             #     content={"detail": "دسترسی غیرمجاز"}
             # )
         
-        # ادامه پردازش درخواست
-        response = await call_next(request)
+        async def send_with_headers(message: Message):
+            # اضافه کردن هدرهای امنیتی بدون بافر کردن بدنه پاسخ
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in SECURITY_HEADERS.items():
+                    headers[name] = value
+            await send(message)
         
-        # اضافه کردن هدرهای امنیتی
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
-        return response
+        # ادامه پردازش درخواست
+        await self.app(scope, receive, send_with_headers)
     
-    def check_rate_limit(self, client_ip: str) -> bool:
-        """بررسی محدودیت نرخ درخواست"""
-        now = time.time()
-        if client_ip not in self.rate_limit_requests:
-            self.rate_limit_requests[client_ip] = []
-        
-        # حذف درخواست‌های قدیمی
-        self.rate_limit_requests[client_ip] = [
-            req_time for req_time in self.rate_limit_requests[client_ip]
-            if now - req_time < self.rate_limit_window
-        ]
-        
-        # بررسی تعداد درخواست‌ها
-        if len(self.rate_limit_requests[client_ip]) >= self.max_requests_per_minute:
-            return False
-        
-        # اضافه کردن درخواست جدید
-        self.rate_limit_requests[client_ip].append(now)
-        return True
+    def admit(self, client_ip: str, route_class: str = "default") -> str:
+        """بررسی IP مسدود و محدودیت نرخ: ok / blocked / rate_limited (sync؛ روی backend مشترک در threadpool)"""
+        if client_ip in self.blocked_ips:
+            return "blocked"
+        if not self.check_rate_limit(client_ip, route_class):
+            return "rate_limited"
+        return "ok"
+    
+    def check_rate_limit(self, client_ip: str, route_class: str = "default") -> bool:
+        """بررسی محدودیت نرخ درخواست (پنجره لغزان دو-سطلی، O(1) به ازای هر درخواست)"""
+        return self.rate_limiter.hit(client_ip, route_class)
     
     def is_suspicious_user_agent(self, user_agent: str) -> bool:
         """بررسی User-Agent مشکوک"""
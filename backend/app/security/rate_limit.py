@@ -0,0 +1,138 @@
+# backend/app/security/rate_limit.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# کلاس‌های مسیر و سقف درخواست در هر پنجره
+DEFAULT_ROUTE_LIMITS = {
+    "auth": 20,       # لاگین/ثبت‌نام - حساس به brute force
+    "admin": 300,
+    "default": 100,
+}
+
+
+def classify_route(path: str) -> str:
+    """تعیین کلاس مسیر برای محدودیت نرخ"""
+    if path.startswith(("/api/auth", "/auth")):
+        return "auth"
+    if path.startswith(("/api/admin", "/api/central", "/api/audit")):
+        return "admin"
+    return "default"
+
+
+class SlidingWindowRateLimiter:
+    """
+    محدودکننده نرخ با شمارنده پنجره لغزان دو-سطلی
+
+    برای هر کلید فقط [شماره پنجره، شمارش پنجره جاری، شمارش پنجره قبل] نگه داشته می‌شود:
+    هزینه هر درخواست O(1) و حافظه محدود به max_keys (کلیدهای بیکار به ترتیب LRU حذف می‌شوند)
+    """
+
+    def __init__(self, window_seconds: int = 60, limits: Optional[Dict[str, int]] = None,
+                 max_keys: int = 100_000):
+        self.window_seconds = window_seconds
+        self.limits = dict(limits or DEFAULT_ROUTE_LIMITS)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[tuple[str, str], list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _estimate(self, bucket: list, window: int, now: float) -> float:
+        """چرخش سطل‌ها و تخمین تعداد درخواست‌ها در پنجره لغزان"""
+        if bucket[0] != window:
+            bucket[2] = bucket[1] if bucket[0] == window - 1 else 0
+            bucket[1] = 0
+            bucket[0] = window
+        elapsed_fraction = (now % self.window_seconds) / self.window_seconds
+        return bucket[2] * (1.0 - elapsed_fraction) + bucket[1]
+
+    def hit(self, client_key: str, route_class: str = "default", now: Optional[float] = None) -> bool:
+        """ثبت یک درخواست؛ False اگر از سقف عبور کرده باشد"""
+        now = time.time() if now is None else now
+        window = int(now // self.window_seconds)
+        limit = self.limits.get(route_class, self.limits["default"])
+        key = (client_key, route_class)
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [window, 0, 0]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    # قدیمی‌ترین کلید (بیکارترین) حذف می‌شود
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+
+            if self._estimate(bucket, window, now) >= limit:
+                return False
+
+            bucket[1] += 1
+            return True
+
+    def retry_after(self, now: Optional[float] = None) -> int:
+        """ثانیه‌های باقی‌مانده تا شروع پنجره بعد (برای هدر Retry-After)"""
+        now = time.time() if now is None else now
+        return max(1, int(self.window_seconds - (now % self.window_seconds)))
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SharedSlidingWindowRateLimiter:
+    """
+    همان الگوریتم پنجره لغزان دو-سطلی روی backend مشترک (SQLite/Redis)
+
+    شمارنده هر پنجره یک کلید جدا با TTL دو پنجره است؛ سقف بین همه workerها اعمال می‌شود
+    """
+
+    def __init__(self, store, window_seconds: int = 60, limits: Optional[Dict[str, int]] = None,
+                 prefix: str = "rl"):
+        self.store = store
+        self.window_seconds = window_seconds
+        self.limits = dict(limits or DEFAULT_ROUTE_LIMITS)
+        self.prefix = prefix
+
+    def hit(self, client_key: str, route_class: str = "default", now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        window = int(now // self.window_seconds)
+        limit = self.limits.get(route_class, self.limits["default"])
+        base = f"{self.prefix}:{route_class}:{client_key}:"
+        ttl = self.window_seconds * 2
+
+        current = self.store.incr(f"{base}{window}", 1, ttl=ttl)
+        previous = self.store.get(f"{base}{window - 1}")
+        elapsed_fraction = (now % self.window_seconds) / self.window_seconds
+
+        # تخمین بدون احتساب همین درخواست
+        if previous * (1.0 - elapsed_fraction) + current - 1 >= limit:
+            # درخواست رد شده در سهمیه حساب نمی‌شود
+            self.store.incr(f"{base}{window}", -1, ttl=ttl)
+            return False
+        return True
+
+    def retry_after(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return max(1, int(self.window_seconds - (now % self.window_seconds)))
+
+
+class IPBlockList:
+    """لیست IPهای مسدود با انقضا روی backend مشترک"""
+
+    def __init__(self, store, default_ttl: int = 3600, prefix: str = "block"):
+        self.store = store
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def block(self, client_ip: str, ttl: Optional[int] = None) -> None:
+        self.store.set(f"{self.prefix}:{client_ip}", 1, ttl or self.default_ttl)
+
+    def unblock(self, client_ip: str) -> None:
+        self.store.delete(f"{self.prefix}:{client_ip}")
+
+    # سازگاری با رابط set قبلی (blocked_ips.add / discard)
+    add = block
+    discard = unblock
+
+    def __contains__(self, client_ip: str) -> bool:
+        return self.store.get(f"{self.prefix}:{client_ip}") > 0
@@ -0,0 +1,266 @@
+# backend/app/security/shared_state.py
+"""
+وضعیت مشترک بین workerها برای محدودیت نرخ و لیست IPهای مسدود
+
+همه backendها افزایش اتمیک با انقضا (increment-with-expiry) ارائه می‌دهند:
+- MemoryStore: داخل یک process (پیش‌فرض و تست)
+- SQLiteStore: جدول WAL روی دیسک برای چند worker روی یک سرور
+- RedisStore: هر کلاینت سازگار با Redis (یا LocalRedisStandIn در تست)
+"""
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class SharedStateStore(ABC):
+    """رابط مشترک backendهای وضعیت"""
+
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1, ttl: int = 60) -> int:
+        """افزایش اتمیک؛ اگر کلید وجود نداشته یا منقضی شده باشد با TTL جدید ساخته می‌شود"""
+
+    @abstractmethod
+    def get(self, key: str) -> int:
+        """مقدار فعلی (۰ برای کلید ناموجود/منقضی)"""
+
+    def get_many(self, keys: List[str]) -> List[int]:
+        return [self.get(key) for key in keys]
+
+    @abstractmethod
+    def set(self, key: str, value: int, ttl: int) -> None:
+        """مقداردهی با TTL"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """حذف کلید"""
+
+
+class MemoryStore(SharedStateStore):
+    """backend داخل process با حذف LRU کلیدهای قدیمی"""
+
+    def __init__(self, max_keys: int = 200_000):
+        self.max_keys = max_keys
+        self._data: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str, now: float) -> Optional[list]:
+        entry = self._data.get(key)
+        if entry is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def incr(self, key: str, amount: int = 1, ttl: int = 60) -> int:
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None:
+                entry = [0, now + ttl]
+                self._data[key] = entry
+                if len(self._data) > self.max_keys:
+                    self._data.popitem(last=False)
+            else:
+                self._data.move_to_end(key)
+            entry[0] += amount
+            return entry[0]
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            entry = self._live(key, time.time())
+            return entry[0] if entry else 0
+
+    def set(self, key: str, value: int, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = [value, time.time() + ttl]
+            self._data.move_to_end(key)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteStore(SharedStateStore):
+    """
+    backend SQLite در حالت WAL - مشترک بین workerهای یک سرور
+
+    هر افزایش یک دستور UPSERT ... RETURNING است و در خود SQLite اتمیک اجرا می‌شود
+    """
+
+    CLEANUP_EVERY = 1000
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_counters ("
+            "key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def incr(self, key: str, amount: int = 1, ttl: int = 60) -> int:
+        now = time.time()
+        with self._lock:
+            value = self._conn.execute(
+                """
+                INSERT INTO shared_counters (key, value, expires_at) VALUES (:key, :amount, :expires)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = CASE WHEN expires_at <= :now THEN excluded.value ELSE value + excluded.value END,
+                    expires_at = CASE WHEN expires_at <= :now THEN excluded.expires_at ELSE expires_at END
+                RETURNING value
+                """,
+                {"key": key, "amount": amount, "expires": now + ttl, "now": now}
+            ).fetchone()[0]
+            self._writes += 1
+            if self._writes % self.CLEANUP_EVERY == 0:
+                self._conn.execute("DELETE FROM shared_counters WHERE expires_at <= ?", (now,))
+            return value
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM shared_counters WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def set(self, key: str, value: int, ttl: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO shared_counters (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, value, time.time() + ttl)
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_counters WHERE key = ?", (key,))
+
+
+class RedisStore(SharedStateStore):
+    """
+    backend سازگار با Redis
+
+    SET NX EX و INCRBY در یک تراکنش MULTI/EXEC اجرا می‌شوند تا افزایش و انقضا اتمیک باشند
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisStore":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("برای RATE_LIMIT_BACKEND=redis پکیج redis باید نصب باشد") from e
+        return cls(redis.Redis.from_url(url))
+
+    def incr(self, key: str, amount: int = 1, ttl: int = 60) -> int:
+        pipe = self.client.pipeline(transaction=True)
+        pipe.set(key, 0, ex=ttl, nx=True)
+        pipe.incrby(key, amount)
+        _, value = pipe.execute()
+        return int(value)
+
+    def get(self, key: str) -> int:
+        value = self.client.get(key)
+        return int(value) if value is not None else 0
+
+    def get_many(self, keys: List[str]) -> List[int]:
+        return [int(value) if value is not None else 0 for value in self.client.mget(keys)]
+
+    def set(self, key: str, value: int, ttl: int) -> None:
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+
+class LocalRedisStandIn:
+    """
+    جایگزین محلی Redis با همان زیرمجموعه دستورات RedisStore
+
+    برای تست و توسعه بدون سرور Redis؛ بین processها مشترک نیست
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.RLock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return None
+            self._data[key] = [int(value), time.time() + ex if ex else None]
+            return True
+
+    def incrby(self, key, amount=1):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                entry = self._data[key] = [0, None]
+            entry[0] += amount
+            return entry[0]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return str(entry[0]).encode() if entry else None
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def delete(self, key):
+        with self._lock:
+            return 1 if self._data.pop(key, None) else 0
+
+    def pipeline(self, transaction=True):
+        return _StandInPipeline(self)
+
+
+class _StandInPipeline:
+    """صف دستورات که زیر یک قفل اجرا می‌شود (معادل MULTI/EXEC)"""
+
+    def __init__(self, client: LocalRedisStandIn):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        with self.client._lock:
+            results = [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+
+def create_store(backend: str, url: Optional[str] = None) -> SharedStateStore:
+    """ساخت backend وضعیت مشترک از روی تنظیمات"""
+    backend = (backend or "memory").lower()
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "sqlite":
+        return SQLiteStore(url or "./data/shared_state.db")
+    if backend == "redis":
+        return RedisStore.from_url(url or "redis://localhost:6379/0")
+    if backend == "redis-local":
+        return RedisStore(LocalRedisStandIn())
+    raise ValueError(f"backend نامعتبر برای وضعیت مشترک: {backend}")
@@ -210,31 +210,21 @@ class AdminRegistrationService:
             dict: آمار سیستم
         """
         try:
-            from ..models import User, UserRole, AccessGrade
-            
-            total_admins = db.query(User).filter(
-                User.role.in_([UserRole.ADMIN, UserRole.SUPER_ADMIN])
-            ).count()
-            
-            active_admins = db.query(User).filter(
-                User.role.in_([UserRole.ADMIN, UserRole.SUPER_ADMIN]),
-                User.is_active == True
-            ).count()
-            
-            chief_count = db.query(User).filter(
-                User.access_grade == AccessGrade.CHIEF,
-                User.is_active == True
-            ).count()
-            
-            super_admin_count = db.query(User).filter(
-                User.role == UserRole.SUPER_ADMIN,
-                User.is_active == True
-            ).count()
-            
-            pending_approvals = db.query(User).filter(
-                User.role == UserRole.ADMIN,
-                User.needs_approval == True
-            ).count()
+            from .user_stats import user_stats_service
+            from ..models import AdminRole, AdminStatus, UserStatus
+            
+            # همان snapshot کش‌شده‌ی آمار کاربران (یک کوئری GROUP BY)
+            stats = user_stats_service.get_stats(db)
+            admin_roles = [AdminRole.ADMIN.value, AdminRole.SUPER_ADMIN.value]
+            active = AdminStatus.ACTIVE.value
+            
+            total_admins = user_stats_service.count_admins(stats, roles=admin_roles)
+            active_admins = user_stats_service.count_admins(stats, roles=admin_roles, status=active)
+            chief_count = user_stats_service.count_admins(stats, roles=[AdminRole.CHIEF.value], status=active)
+            super_admin_count = user_stats_service.count_admins(stats, roles=[AdminRole.SUPER_ADMIN.value], status=active)
+            pending_approvals = user_stats_service.count_users(
+                stats, status=UserStatus.PENDING.value, user_type="admin"
+            )
             
             return {
                 "total_admins": total_admins,
@@ -0,0 +1,240 @@
+# backend/app/services/idempotency.py
+"""
+کلیدهای Idempotency-Key برای درخواست‌هایی که کلاینت ممکن است تکرار کند (ثبت معامله)
+
+- اولین درخواست با یک کلید، ردیف in_progress را با INSERT روی ایندکس یکتا (user_id, key)
+  «رزرو» و commit می‌کند؛ فقط صاحب رزرو عملیات را اجرا می‌کند
+- پاسخ موفق در همان تراکنش عملیات (complete) ذخیره می‌شود: یا معامله و پاسخ با هم
+  commit شده‌اند یا هیچ‌کدام. خطایی که با تکرار ممکن است تغییر کند (موجودی ناکافی و ...)
+  ذخیره نمی‌شود؛ رزرو آزاد می‌شود (release) و تکرار بعدی دوباره اجرا می‌شود
+- تکرار بعدی پاسخ ذخیره‌شده را بدون اجرای دوباره می‌گیرد؛ تکرار هم‌زمان به‌طور پیش‌فرض
+  فوراً IdempotencyInProgressError می‌گیرد (409). با IDEMPOTENCY_WAIT_SECONDS > 0 تا پایان
+  صاحب رزرو منتظر می‌ماند (در همین process با Event، بین workerها با polling) و در این
+  مدت یک worker از threadpool اشغال است
+- رزرو رهاشده (crash پیش از commit) پس از IDEMPOTENCY_LOCK_SECONDS قابل تصاحب است؛ complete و
+  release شرط locked_at رزرو را دارند، پس صاحب قدیمی که دیر تمام شود IdempotencyClaimLostError
+  می‌گیرد (عملیاتش برگردانده می‌شود) و رزرو صاحب جدید را حذف نمی‌کند
+- کلیدها پس از IDEMPOTENCY_TTL_HOURS منقضی و به‌تدریج پاک می‌شوند
+"""
+import hashlib
+import itertools
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple, Union
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.idempotency_models import IdempotencyKey
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+POLL_INTERVAL_SECONDS = 0.05
+PURGE_EVERY = 500
+PURGE_BATCH = 1000
+
+
+class IdempotencyError(Exception):
+    """خطای کلید Idempotency"""
+
+
+class IdempotencyKeyReusedError(IdempotencyError):
+    """کلید با بدنه یا مسیر متفاوتی قبلاً استفاده شده است"""
+
+
+class IdempotencyInProgressError(IdempotencyError):
+    """درخواست اصلی با همین کلید هنوز در حال اجراست"""
+
+
+class IdempotencyClaimLostError(IdempotencyError):
+    """رزرو این درخواست پس از مهلت قفل توسط تکرار دیگری تصاحب شده است"""
+
+
+@dataclass
+class IdempotencyClaim:
+    """رزرو کلید توسط این درخواست (صاحب اجرای عملیات)"""
+    record_id: int
+    user_id: int
+    key: str
+    locked_at: datetime
+
+
+@dataclass
+class StoredResponse:
+    """پاسخ ذخیره‌شده درخواست قبلی با همین کلید"""
+    status_code: int
+    body: Any
+
+
+# صاحبان رزرو در همین process: تکرارهای هم‌زمان به جای polling روی Event منتظر می‌مانند
+_inflight: Dict[Tuple[int, str], threading.Event] = {}
+_inflight_lock = threading.Lock()
+_claims = itertools.count(1)
+
+
+def request_fingerprint(payload: Any) -> str:
+    """sha256 شکل canonical بدنه درخواست"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _try_insert(db: Session, user_id: int, key: str, endpoint: str, request_hash: str,
+                now: datetime) -> Optional[int]:
+    try:
+        result = db.execute(insert(IdempotencyKey).values(
+            user_id=user_id,
+            key=key,
+            endpoint=endpoint,
+            request_hash=request_hash,
+            status=IN_PROGRESS,
+            locked_at=now,
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+        ))
+        db.commit()
+        return result.inserted_primary_key[0]
+    except IntegrityError:
+        db.rollback()
+        return None
+
+
+def _register(claim: IdempotencyClaim) -> IdempotencyClaim:
+    with _inflight_lock:
+        _inflight[(claim.user_id, claim.key)] = threading.Event()
+    return claim
+
+
+def begin(
+    db: Session,
+    user_id: int,
+    key: str,
+    endpoint: str,
+    request_hash: str,
+    wait_seconds: Optional[float] = None
+) -> Union[IdempotencyClaim, StoredResponse]:
+    """
+    رزرو کلید یا گرفتن پاسخ ذخیره‌شده (تراکنش جاری commit می‌شود)
+
+    IdempotencyClaim: عملیات را اجرا کنید و complete / release را صدا بزنید
+    StoredResponse: پاسخ تکرار؛ عملیات نباید اجرا شود
+    """
+    if wait_seconds is None:
+        wait_seconds = settings.IDEMPOTENCY_WAIT_SECONDS
+    deadline = time.monotonic() + wait_seconds
+
+    if next(_claims) % PURGE_EVERY == 0:
+        purge_expired(db)
+
+    while True:
+        now = datetime.utcnow()
+        record_id = _try_insert(db, user_id, key, endpoint, request_hash, now)
+        if record_id is not None:
+            return _register(IdempotencyClaim(record_id, user_id, key, now))
+
+        row = db.execute(
+            select(
+                IdempotencyKey.id, IdempotencyKey.endpoint, IdempotencyKey.request_hash, IdempotencyKey.status,
+                IdempotencyKey.response_status, IdempotencyKey.response_body, IdempotencyKey.locked_at,
+                IdempotencyKey.expires_at
+            ).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        ).first()
+        db.rollback()  # snapshot خواندن نگه داشته نشود
+        if row is None:
+            continue  # هم‌زمان حذف شد؛ دوباره رزرو
+
+        if row.expires_at <= now:
+            # کلید منقضی مثل کلید جدید است
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == row.id, IdempotencyKey.expires_at <= now))
+            db.commit()
+            continue
+
+        if row.endpoint != endpoint or row.request_hash != request_hash:
+            raise IdempotencyKeyReusedError(key)
+
+        if row.status == COMPLETED:
+            return StoredResponse(row.response_status, json.loads(row.response_body))
+
+        if row.locked_at <= now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS):
+            # صاحب رزرو پیش از commit از کار افتاده: تصاحب شرطی (فقط یک درخواست موفق می‌شود)
+            taken = db.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.id == row.id,
+                    IdempotencyKey.status == IN_PROGRESS,
+                    IdempotencyKey.locked_at == row.locked_at
+                )
+                .values(locked_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            if taken:
+                return _register(IdempotencyClaim(row.id, user_id, key, now))
+            continue
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise IdempotencyInProgressError(key)
+        event = _inflight.get((user_id, key))
+        if event is not None:
+            event.wait(remaining)
+        else:
+            time.sleep(min(POLL_INTERVAL_SECONDS, remaining))
+
+
+def _owned(claim: IdempotencyClaim):
+    """شرط مالکیت رزرو: همان ردیف، هنوز in_progress و تصاحب‌نشده (locked_at همان زمان رزرو)"""
+    return (
+        IdempotencyKey.id == claim.record_id,
+        IdempotencyKey.status == IN_PROGRESS,
+        IdempotencyKey.locked_at == claim.locked_at,
+    )
+
+
+def complete(db: Session, claim: IdempotencyClaim, status_code: int, body: Any) -> None:
+    """
+    ذخیره پاسخ در تراکنش جاری (commit همراه عملیات توسط فراخواننده)
+
+    اگر رزرو تصاحب شده باشد IdempotencyClaimLostError؛ فراخواننده باید عملیات را rollback کند
+    """
+    updated = db.execute(
+        update(IdempotencyKey)
+        .where(*_owned(claim))
+        .values(status=COMPLETED, response_status=status_code, response_body=json.dumps(body))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        raise IdempotencyClaimLostError(claim.key)
+
+
+def release(db: Session, claim: IdempotencyClaim) -> None:
+    """آزادسازی رزرو پس از خطای غیرقطعی تا تکرار بعدی دوباره اجرا شود"""
+    db.rollback()
+    db.execute(
+        delete(IdempotencyKey).where(*_owned(claim))
+    )
+    db.commit()
+
+
+def finish(claim: IdempotencyClaim) -> None:
+    """بیدار کردن تکرارهای هم‌زمان منتظر (پس از commit یا release)"""
+    with _inflight_lock:
+        event = _inflight.pop((claim.user_id, claim.key), None)
+    if event is not None:
+        event.set()
+
+
+def purge_expired(db: Session, batch_size: int = PURGE_BATCH) -> int:
+    """حذف یک دسته از کلیدهای منقضی؛ تعداد حذف‌شده"""
+    expired = (
+        select(IdempotencyKey.id)
+        .where(IdempotencyKey.expires_at <= datetime.utcnow())
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    deleted = db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(expired))).rowcount
+    db.commit()
+    return deleted
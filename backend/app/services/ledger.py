@@ -0,0 +1,254 @@
+# backend/app/services/ledger.py
+"""
+دفتر کل دوطرفه (double-entry) فقط-افزودنی با snapshot موجودی
+
+- هر تغییر موجودی یک journal است: چند posting که جمعشان صفر است
+- snapshot هر حساب (account_balances) با یک UPDATE شرطی و RETURNING در همان تراکنش
+  به‌روز می‌شود و sequence بعدی حساب را هم می‌دهد؛ خواندن موجودی O(1) است
+- حساب طرف مقابل (house) بر اساس user_id به HOUSE_SHARDS بخش تقسیم شده تا همه
+  معاملات روی یک ردیف داغ صف نشوند
+- RegularUserProfile.balance آینه snapshot کیف پول است تا لیست‌ها و ایندکس ریسک درست بمانند
+- تطبیق (reconcile) از آخرین checkpoint هر حساب فقط postingهای جدید را بازپخش می‌کند
+"""
+import uuid
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.ledger_models import AccountBalance, LedgerCheckpoint, LedgerEntry
+from app.models.user_models import RegularUserProfile
+from app.utils.upsert import insert_if_absent
+
+HOUSE_SHARDS = 16
+EQUITY_ACCOUNT = "house:equity"
+WALLET_PREFIX = "user:"
+JOURNALS_CHECKPOINT = "*journals"
+
+
+class LedgerError(Exception):
+    """خطای دفتر کل"""
+
+
+class InsufficientFundsError(LedgerError):
+    """موجودی حساب برای برداشت کافی نیست"""
+
+
+class AccountNotFoundError(LedgerError):
+    """حساب هنوز باز نشده است"""
+
+
+def wallet_account(user_id: int) -> str:
+    return f"{WALLET_PREFIX}{user_id}"
+
+
+def house_account(user_id: int) -> str:
+    return f"house:{user_id % HOUSE_SHARDS}"
+
+
+def hold_account(user_id: int) -> str:
+    """وجه رزروشده سفارش‌های خرید باز"""
+    return f"hold:{user_id}"
+
+
+def _wallet_user_id(account: str) -> Optional[int]:
+    return int(account[len(WALLET_PREFIX):]) if account.startswith(WALLET_PREFIX) else None
+
+
+def open_account(db: Session, account: str) -> bool:
+    """ایجاد ردیف snapshot با موجودی صفر؛ اگر از قبل باشد (یا هم‌زمان باز شود) False"""
+    return insert_if_absent(db, AccountBalance, {"account": account, "balance": 0, "last_sequence": 0})
+
+
+def _apply(db: Session, account: str, amount: int, guarded: bool):
+    statement = update(AccountBalance).where(AccountBalance.account == account)
+    if guarded and amount < 0:
+        statement = statement.where(AccountBalance.balance >= -amount)
+    return db.execute(
+        statement
+        .values(balance=AccountBalance.balance + amount, last_sequence=AccountBalance.last_sequence + 1)
+        .returning(AccountBalance.balance, AccountBalance.last_sequence)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+
+def post_journal(
+    db: Session,
+    postings: Sequence[Tuple[str, int]],
+    entry_type: str,
+    reference_type: Optional[str] = None,
+    reference_id: Optional[int] = None,
+    guarded: Iterable[str] = ()
+) -> Dict[str, int]:
+    """
+    ثبت یک journal در تراکنش جاری (commit با فراخواننده)
+
+    guarded: حساب‌هایی که نباید منفی شوند (برداشت فقط با موجودی کافی)
+    خروجی: موجودی جدید هر حساب
+    """
+    if sum(amount for _, amount in postings) != 0:
+        raise LedgerError("journal is not balanced")
+    if len({account for account, _ in postings}) != len(postings):
+        raise LedgerError("each account may appear once per journal")
+
+    guarded = set(guarded)
+    journal_id = str(uuid.uuid4())
+    balances: Dict[str, int] = {}
+    rows: List[dict] = []
+
+    # ترتیب ثابت حساب‌ها: قفل ردیف‌ها همیشه به یک ترتیب گرفته می‌شود (بدون deadlock)
+    for account, amount in sorted(postings):
+        row = _apply(db, account, amount, account in guarded)
+        if row is None:
+            exists = db.query(AccountBalance.account).filter(AccountBalance.account == account).first()
+            if exists is not None:
+                raise InsufficientFundsError(account)
+            if _wallet_user_id(account) is not None:
+                raise AccountNotFoundError(account)
+            # حساب‌های سیستمی در اولین استفاده باز می‌شوند
+            open_account(db, account)
+            row = _apply(db, account, amount, account in guarded)
+
+        balances[account] = row.balance
+        rows.append({
+            "journal_id": journal_id,
+            "account": account,
+            "sequence": row.last_sequence,
+            "amount": amount,
+            "balance_after": row.balance,
+            "entry_type": entry_type,
+            "reference_type": reference_type,
+            "reference_id": reference_id,
+        })
+
+        user_id = _wallet_user_id(account)
+        if user_id is not None:
+            db.execute(
+                update(RegularUserProfile)
+                .where(RegularUserProfile.user_id == user_id)
+                .values(balance=row.balance)
+                .execution_options(synchronize_session=False)
+            )
+
+    db.execute(insert(LedgerEntry), rows)
+    return balances
+
+
+def ensure_wallet(db: Session, user_id: int) -> None:
+    """
+    باز کردن کیف پول از موجودی فعلی پروفایل (journal افتتاحیه در برابر house:equity)
+
+    کیف پول‌های ایجادشده پیش از دفتر کل در اولین معامله باز می‌شوند
+    """
+    opening_balance = db.query(RegularUserProfile.balance).filter(RegularUserProfile.user_id == user_id).scalar()
+    if opening_balance is None:
+        raise AccountNotFoundError(wallet_account(user_id))
+    account = wallet_account(user_id)
+    if open_account(db, account) and opening_balance:
+        post_journal(db, [(account, opening_balance), (EQUITY_ACCOUNT, -opening_balance)], "opening")
+
+
+def ensure_wallets(db: Session, user_ids: Iterable[int]) -> None:
+    """
+    باز کردن کیف پول‌های باز نشده چند کاربر با یک کوئری بررسی
+
+    به جای یک دور rollback و تکرار تراکنش برای هر کیف پول (run_wallet_transaction)
+    """
+    accounts = {wallet_account(user_id): user_id for user_id in user_ids}
+    opened = {
+        account for (account,) in
+        db.query(AccountBalance.account).filter(AccountBalance.account.in_(list(accounts)))
+    }
+    for account, user_id in sorted(accounts.items()):
+        if account not in opened:
+            ensure_wallet(db, user_id)
+
+
+def get_balance(db: Session, account: str) -> Optional[int]:
+    """موجودی از snapshot (O(1))"""
+    return db.query(AccountBalance.balance).filter(AccountBalance.account == account).scalar()
+
+
+def journal_entry_types(db: Session, reference_type: str, reference_id: int) -> set:
+    """نوع journalهای ثبت‌شده برای یک مرجع (از idx_ledger_reference)"""
+    return {
+        entry_type for (entry_type,) in
+        db.query(LedgerEntry.entry_type).filter(
+            LedgerEntry.reference_type == reference_type, LedgerEntry.reference_id == reference_id
+        ).distinct()
+    }
+
+
+def reconcile(db: Session, accounts: Optional[Iterable[str]] = None, batch_size: int = 1000) -> dict:
+    """
+    تطبیق افزایشی: بازپخش postingهای پس از checkpoint هر حساب و مقایسه با snapshot
+
+    بررسی می‌شود: sequence بدون فاصله، balance_after هر posting، موجودی نهایی snapshot و
+    صفر بودن جمع journalهای جدید. checkpoint فقط برای حساب‌های سالم جلو می‌رود
+    """
+    query = db.query(AccountBalance)
+    if accounts is not None:
+        query = query.filter(AccountBalance.account.in_(list(accounts)))
+    snapshots = query.all()
+    checkpoints = {cp.account: cp for cp in db.query(LedgerCheckpoint).all()}
+
+    mismatches = []
+    replayed = 0
+    for snapshot in snapshots:
+        checkpoint = checkpoints.get(snapshot.account)
+        sequence = checkpoint.sequence if checkpoint else 0
+        balance = checkpoint.balance if checkpoint else 0
+        problem = None
+
+        # فقط تا last_sequence خوانده‌شده: postingها همراه snapshot commit شده‌اند
+        entries = db.execute(
+            select(LedgerEntry.sequence, LedgerEntry.amount, LedgerEntry.balance_after)
+            .where(
+                LedgerEntry.account == snapshot.account,
+                LedgerEntry.sequence > sequence,
+                LedgerEntry.sequence <= snapshot.last_sequence
+            )
+            .order_by(LedgerEntry.sequence)
+            .execution_options(yield_per=batch_size)
+        )
+        for entry in entries:
+            replayed += 1
+            if entry.sequence != sequence + 1:
+                problem = f"sequence gap after {sequence}"
+                break
+            sequence = entry.sequence
+            balance += entry.amount
+            if balance != entry.balance_after:
+                problem = f"balance_after mismatch at sequence {sequence}"
+                break
+
+        if problem is None and (sequence, balance) != (snapshot.last_sequence, snapshot.balance):
+            problem = f"snapshot {snapshot.balance}@{snapshot.last_sequence} != ledger {balance}@{sequence}"
+
+        if problem:
+            mismatches.append({"account": snapshot.account, "problem": problem})
+        elif checkpoint is None:
+            db.add(LedgerCheckpoint(account=snapshot.account, sequence=sequence, balance=balance))
+        elif checkpoint.sequence != sequence:
+            checkpoint.sequence, checkpoint.balance = sequence, balance
+
+    # journalهای جدید باید جمع صفر داشته باشند
+    journals_checkpoint = checkpoints.get(JOURNALS_CHECKPOINT)
+    last_entry_id = journals_checkpoint.sequence if journals_checkpoint else 0
+    max_entry_id = db.query(func.max(LedgerEntry.id)).scalar() or 0
+    unbalanced = db.execute(
+        select(LedgerEntry.journal_id, func.sum(LedgerEntry.amount))
+        .where(LedgerEntry.id > last_entry_id, LedgerEntry.id <= max_entry_id)
+        .group_by(LedgerEntry.journal_id)
+        .having(func.sum(LedgerEntry.amount) != 0)
+    ).all()
+    for journal_id, total in unbalanced:
+        mismatches.append({"journal_id": journal_id, "problem": f"journal sums to {total}"})
+    if not unbalanced:
+        if journals_checkpoint is None:
+            db.add(LedgerCheckpoint(account=JOURNALS_CHECKPOINT, sequence=max_entry_id, balance=0))
+        else:
+            journals_checkpoint.sequence = max_entry_id
+
+    db.commit()
+    return {"accounts": len(snapshots), "entries_replayed": replayed, "mismatches": mismatches}
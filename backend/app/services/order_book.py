@@ -0,0 +1,474 @@
+# backend/app/services/order_book.py
+"""
+دفتر سفارش (order book) درون‌حافظه‌ای و موتور تطبیق با اولویت قیمت-زمان
+
+- هر طرف دفتر: سطح‌های قیمت در dict + heap (با حذف تنبل)؛ هر سطح یک OrderedDict
+  از سفارش‌ها به ترتیب ورود است
+  ثبت سفارش O(log n) (فقط برای سطح جدید)، لغو O(1)، بهترین خرید/فروش O(1) سرشکن
+- تطبیق در همان ثبت سفارش انجام می‌شود و fillها به قیمت سفارش منتظر (maker) ساخته می‌شوند
+- journal (write-ahead): هر فرمان (ثبت/لغو) پیش از تسویه در دیتابیس به صورت intent در فایل
+  JSONL نوشته می‌شود و پس از آن نشانه commit یا abort می‌گیرد؛ اگر تسویه شکست بخورد تطبیق
+  برگردانده می‌شود. پس از راه‌اندازی مجدد، بازپخش قطعی فرمان‌ها همان دفتر را می‌سازد، intent
+  بدون نتیجه (crash وسط تسویه) با resolver از روی دیتابیس روشن می‌شود و سپس journal فشرده می‌شود
+- سفارشی که با سفارش منتظر همان کاربر تطبیق بخورد (self-match) کامل رد می‌شود
+- مقدار سفارش‌ها عدد صحیح به واحد 1/QUANTITY_SCALE است (مثلاً میلی‌گرم) تا تطبیق دقیق بماند
+"""
+import heapq
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+
+INSTRUMENTS = ("gold", "silver", "brent")
+QUANTITY_SCALE = 1000
+BUY = "buy"
+SELL = "sell"
+
+T = TypeVar("T")
+
+
+class SelfMatchError(Exception):
+    """سفارش با سفارش منتظر همان کاربر تطبیق می‌خورد"""
+
+
+class OrderJournalError(Exception):
+    """journal دفتر سفارش بدون resolver قابل بازیابی نیست"""
+
+
+@dataclass(slots=True)
+class Order:
+    order_id: int
+    user_id: int
+    side: str
+    price: int
+    quantity: int
+    remaining: int
+    created_at: float
+
+    @property
+    def filled(self) -> int:
+        return self.quantity - self.remaining
+
+
+@dataclass(slots=True)
+class Fill:
+    instrument: str
+    price: int
+    quantity: int
+    taker_side: str
+    buy_order_id: int
+    sell_order_id: int
+    buyer_id: int
+    seller_id: int
+    buy_limit: int        # قیمت حد سفارش خرید (برای آزادسازی وجه رزروشده)
+    buy_filled: int       # مقدار پرشده سفارش خرید پس از این fill
+
+
+# روشن‌کردن intent بدون نتیجه: (ابزار، "place" یا "cancel"، سفارش، fillها) -> آیا تسویه commit شده
+IntentResolver = Callable[[str, str, Order, List[Fill]], bool]
+
+
+def notional(price: int, quantity: int) -> int:
+    """ارزش ریالی مقدار (به واحد 1/QUANTITY_SCALE) با قیمت واحد"""
+    return round(price * quantity / QUANTITY_SCALE)
+
+
+class PriceLevel:
+    __slots__ = ("price", "orders", "total")
+
+    def __init__(self, price: int):
+        self.price = price
+        self.orders: "OrderedDict[int, Order]" = OrderedDict()
+        self.total = 0
+
+
+class BookSide:
+    """یک طرف دفتر؛ heap کلید قیمت (منفی برای خرید) با حذف تنبل سطح‌های خالی"""
+
+    def __init__(self, is_bid: bool):
+        self.sign = -1 if is_bid else 1
+        self.levels: Dict[int, PriceLevel] = {}
+        self._heap: List[int] = []
+        self._in_heap = set()
+
+    def best(self) -> Optional[PriceLevel]:
+        heap = self._heap
+        while heap:
+            price = heap[0] * self.sign
+            level = self.levels.get(price)
+            if level is not None:
+                return level
+            heapq.heappop(heap)
+            self._in_heap.discard(price)
+        return None
+
+    def add(self, order: Order) -> None:
+        level = self.levels.get(order.price)
+        if level is None:
+            level = self.levels[order.price] = PriceLevel(order.price)
+            if order.price not in self._in_heap:
+                heapq.heappush(self._heap, order.price * self.sign)
+                self._in_heap.add(order.price)
+        level.orders[order.order_id] = order
+        level.total += order.remaining
+
+    def reinstate(self, order: Order) -> None:
+        """بازگرداندن سفارش حذف‌شده به ابتدای سطح خود (اولویت زمانی قبلی)"""
+        self.add(order)
+        self.levels[order.price].orders.move_to_end(order.order_id, last=False)
+
+    def remove(self, order: Order) -> None:
+        level = self.levels[order.price]
+        del level.orders[order.order_id]
+        level.total -= order.remaining
+        if not level.orders:
+            del self.levels[order.price]  # ورودی heap بعداً در best() حذف می‌شود
+
+    def depth(self, count: int) -> List[Tuple[int, int]]:
+        prices = sorted(self.levels, reverse=self.sign < 0)[:count]
+        return [(price, self.levels[price].total) for price in prices]
+
+
+class OrderJournal:
+    """write-ahead journal خطی (JSONL) فرمان‌های یک دفتر"""
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def append(self, record: dict) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def replay(self) -> Iterator[dict]:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # خط ناقص آخر (crash وسط نوشتن): فرمان اعمال نشده بود
+                    break
+
+    def rewrite(self, records: List[dict]) -> None:
+        """فشرده‌سازی: جایگزینی اتمیک journal با فرمان‌های لازم برای ساخت وضعیت فعلی"""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class OrderBook:
+    """دفتر سفارش یک ابزار؛ همه فرمان‌ها زیر یک قفل (ترتیب قطعی برای journal)"""
+
+    def __init__(self, instrument: str, journal: Optional[OrderJournal] = None):
+        self.instrument = instrument
+        self.journal = journal
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.orders: Dict[int, Order] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    # --- خواندن ---
+
+    def best_bid(self) -> Optional[int]:
+        level = self.bids.best()
+        return level.price if level else None
+
+    def best_ask(self) -> Optional[int]:
+        level = self.asks.best()
+        return level.price if level else None
+
+    def depth(self, levels: int = 10) -> dict:
+        with self._lock:
+            return {
+                "instrument": self.instrument,
+                "best_bid": self.best_bid(),
+                "best_ask": self.best_ask(),
+                "bids": self.bids.depth(levels),
+                "asks": self.asks.depth(levels),
+            }
+
+    # --- فرمان‌ها ---
+
+    def place(self, user_id: int, side: str, price: int, quantity: int) -> Tuple[Order, List[Fill]]:
+        order, fills, _ = self.place_and_settle(user_id, side, price, quantity)
+        return order, fills
+
+    def place_and_settle(self, user_id: int, side: str, price: int, quantity: int,
+                         settle: Optional[Callable[[List[Fill]], T]] = None,
+                         abort: Optional[Callable[[Order], object]] = None) -> Tuple[Order, List[Fill], Optional[T]]:
+        """
+        ثبت سفارش و تسویه fillهای آن زیر قفل دفتر
+
+        intent ثبت پیش از settle (مثلاً commit تسویه در دیتابیس) در journal نوشته می‌شود؛ اگر settle
+        خطا بدهد تطبیق برگردانده می‌شود (سفارش‌های منتظر با همان اولویت سر جایشان)، abort (مثلاً
+        آزادسازی رزرو) اجرا و intent با abort بسته می‌شود. self-match پیش از journal با
+        SelfMatchError رد می‌شود و abort برای آن اجرا نمی‌شود
+        """
+        if side not in (BUY, SELL):
+            raise ValueError(f"side نامعتبر: {side}")
+        if price <= 0 or quantity <= 0:
+            raise ValueError("price و quantity باید مثبت باشند")
+        with self._lock:
+            order = Order(self._next_id, user_id, side, price, quantity, quantity, time.time())
+            matched: List[Tuple[Order, int]] = []
+            try:
+                fills = self._apply_place(order, matched)
+            except SelfMatchError:
+                # فرمان journal نشده است: شناسه دوباره استفاده می‌شود
+                self._undo_place(order, matched)
+                self._next_id = order.order_id
+                raise
+
+            def undo() -> None:
+                self._undo_place(order, matched)
+                if abort is not None:
+                    abort(order)
+
+            settled = self._write_ahead(
+                {"op": "place", "id": order.order_id, "user": user_id, "side": side,
+                 "price": price, "qty": quantity, "ts": order.created_at, "pending": True},
+                lambda: settle(fills) if settle is not None else None,
+                undo
+            )
+            return order, fills, settled
+
+    def cancel(self, order_id: int, release: Optional[Callable[[Order], object]] = None) -> Optional[Order]:
+        """
+        لغو سفارش منتظر؛ release (مثلاً آزادسازی وجه رزروشده) بین intent و commit لغو اجرا می‌شود
+
+        اگر release خطا بدهد سفارش دست‌نخورده در دفتر می‌ماند
+        """
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return None
+
+            def apply() -> None:
+                if release is not None:
+                    release(order)
+                self._apply_cancel(order)
+
+            self._write_ahead({"op": "cancel", "id": order_id, "pending": True}, apply, lambda: None)
+            return order
+
+    def _write_ahead(self, record: dict, action: Callable[[], T], undo: Callable[[], None]) -> T:
+        """
+        اجرای action بین intent و نشانه نتیجه آن در journal (زیر قفل دفتر)
+
+        اگر undo خودش خطا بدهد abort نوشته نمی‌شود و intent در بازیابی با resolver روشن می‌شود
+        """
+        journaled = False
+        try:
+            if self.journal:
+                self.journal.append(record)
+                journaled = True
+            result = action()
+        except BaseException:
+            undo()
+            if journaled:
+                self._append_outcome("abort", record["id"])
+            raise
+        if journaled:
+            self._append_outcome("commit", record["id"])
+        return result
+
+    def _append_outcome(self, op: str, order_id: int) -> None:
+        # نتیجه در دیتابیس قطعی شده است؛ اگر نوشتن آن شکست بخورد intent در بازیابی روشن می‌شود
+        try:
+            self.journal.append({"op": op, "id": order_id})
+        except Exception as e:
+            print(f"⚠️ خطا در نوشتن {op} سفارش {order_id} در journal {self.instrument}: {e}")
+
+    # --- اعمال (مشترک بین اجرای زنده و بازپخش journal) ---
+
+    def _apply_place(self, order: Order, matched: Optional[List[Tuple[Order, int]]] = None) -> List[Fill]:
+        self._next_id = max(self._next_id, order.order_id + 1)
+        fills = self._match(order, matched)
+        if order.remaining:
+            (self.bids if order.side == BUY else self.asks).add(order)
+            self.orders[order.order_id] = order
+        return fills
+
+    def _apply_cancel(self, order: Order) -> None:
+        (self.bids if order.side == BUY else self.asks).remove(order)
+        del self.orders[order.order_id]
+
+    def _undo_place(self, order: Order, matched: List[Tuple[Order, int]]) -> None:
+        """برگرداندن _apply_place: حذف سفارش از دفتر و بازگرداندن مقدار سفارش‌های منتظر"""
+        if order.order_id in self.orders:
+            self._apply_cancel(order)
+        book = self.asks if order.side == BUY else self.bids
+        # به ترتیب معکوس تا سفارش‌های حذف‌شده یک سطح با ترتیب قبلی به ابتدای آن برگردند
+        for maker, quantity in reversed(matched):
+            if maker.order_id in self.orders:
+                maker.remaining += quantity
+                book.levels[maker.price].total += quantity
+            else:
+                maker.remaining += quantity
+                book.reinstate(maker)
+                self.orders[maker.order_id] = maker
+        order.remaining = order.quantity
+
+    def _match(self, taker: Order, matched: Optional[List[Tuple[Order, int]]] = None) -> List[Fill]:
+        fills: List[Fill] = []
+        book = self.asks if taker.side == BUY else self.bids
+        while taker.remaining:
+            level = book.best()
+            if level is None:
+                break
+            if (taker.side == BUY and level.price > taker.price) or (taker.side == SELL and level.price < taker.price):
+                break
+            while taker.remaining and level.orders:
+                maker = next(iter(level.orders.values()))
+                if maker.user_id == taker.user_id:
+                    raise SelfMatchError(maker.order_id)
+                quantity = min(taker.remaining, maker.remaining)
+                taker.remaining -= quantity
+                maker.remaining -= quantity
+                level.total -= quantity
+                if matched is not None:
+                    matched.append((maker, quantity))
+                buy, sell = (taker, maker) if taker.side == BUY else (maker, taker)
+                fills.append(Fill(
+                    self.instrument, level.price, quantity, taker.side,
+                    buy.order_id, sell.order_id, buy.user_id, sell.user_id, buy.price, buy.filled
+                ))
+                if not maker.remaining:
+                    level.orders.popitem(last=False)
+                    del self.orders[maker.order_id]
+            if not level.orders:
+                del book.levels[level.price]
+        return fills
+
+    # --- بازیابی ---
+
+    def recover(self, resolver: Optional[IntentResolver] = None) -> int:
+        """
+        بازپخش journal و فشرده‌سازی آن به سفارش‌های باز؛ تعداد فرمان‌های بازپخش‌شده
+
+        intent با commit اعمال و با abort برگردانده می‌شود؛ intent بدون نتیجه به resolver سپرده می‌شود
+        """
+        if not self.journal:
+            return 0
+        replayed = 0
+        with self._lock:
+            pending: Optional[Tuple[str, Order, List[Tuple[Order, int]], List[Fill]]] = None
+            for record in self.journal.replay():
+                replayed += 1
+                op = record["op"]
+                if op in ("commit", "abort"):
+                    if pending is not None and pending[1].order_id == record["id"]:
+                        self._finish_intent(pending, op == "commit")
+                        pending = None
+                    continue
+                if pending is not None:
+                    self._finish_intent(pending, self._resolve_intent(pending, resolver))
+                    pending = None
+
+                if op == "place":
+                    order = Order(
+                        record["id"], record["user"], record["side"], record["price"],
+                        record["qty"], record.get("rem", record["qty"]), record["ts"]
+                    )
+                    matched: List[Tuple[Order, int]] = []
+                    fills = self._apply_place(order, matched)
+                    if record.get("pending"):
+                        pending = ("place", order, matched, fills)
+                elif op == "cancel":
+                    order = self.orders.get(record["id"])
+                    if order is not None:
+                        if record.get("pending"):
+                            pending = ("cancel", order, [], [])
+                        else:
+                            self._apply_cancel(order)
+                elif op == "seq":
+                    self._next_id = max(self._next_id, record["next_id"])
+            if pending is not None:
+                self._finish_intent(pending, self._resolve_intent(pending, resolver))
+
+            # فشرده‌سازی: سفارش‌های باز به ترتیب زمان (اولویت حفظ می‌شود) با مقدار کل و باقی‌مانده
+            # شمارنده شناسه هم با یک رکورد حفظ می‌شود تا شناسه‌ها تکراری نشوند
+            resting = sorted(self.orders.values(), key=lambda o: o.order_id)
+            records = [{"op": "seq", "next_id": self._next_id}]
+            records.extend(
+                {"op": "place", "id": o.order_id, "user": o.user_id, "side": o.side,
+                 "price": o.price, "qty": o.quantity, "rem": o.remaining, "ts": o.created_at}
+                for o in resting
+            )
+            self.journal.rewrite(records)
+        return replayed
+
+    def _resolve_intent(self, pending: tuple, resolver: Optional[IntentResolver]) -> bool:
+        op, order, _, fills = pending
+        if resolver is None:
+            raise OrderJournalError(f"intent بدون نتیجه برای سفارش {order.order_id} ({self.instrument}) و resolver تعریف نشده")
+        committed = resolver(self.instrument, op, order, fills)
+        print(f"📒 intent {op} سفارش {order.order_id} ({self.instrument}) از دیتابیس روشن شد: "
+              f"{'commit' if committed else 'abort'}")
+        return committed
+
+    def _finish_intent(self, pending: tuple, committed: bool) -> None:
+        op, order, matched, _ = pending
+        if op == "place" and not committed:
+            self._undo_place(order, matched)
+        elif op == "cancel" and committed:
+            self._apply_cancel(order)
+
+
+class OrderBookRegistry:
+    """دفترهای سفارش همه ابزارها (یکی برای هر پروسه)"""
+
+    def __init__(self, journal_dir: Optional[str] = None, fsync: bool = False,
+                 resolver: Optional[IntentResolver] = None):
+        self.journal_dir = journal_dir
+        self.fsync = fsync
+        self.resolver = resolver
+        self.books: Dict[str, OrderBook] = {}
+        self._lock = threading.Lock()
+
+    def get(self, instrument: str) -> OrderBook:
+        if instrument not in INSTRUMENTS:
+            raise KeyError(instrument)
+        book = self.books.get(instrument)
+        if book is None:
+            with self._lock:
+                book = self.books.get(instrument)
+                if book is None:
+                    journal = None
+                    if self.journal_dir:
+                        journal = OrderJournal(os.path.join(self.journal_dir, f"{instrument}.jsonl"), self.fsync)
+                    book = OrderBook(instrument, journal)
+                    book.recover(self.resolver)
+                    self.books[instrument] = book
+        return book
+
+    def load_all(self, resolver: Optional[IntentResolver] = None) -> Dict[str, int]:
+        """بازیابی همه دفترها هنگام راه‌اندازی؛ تعداد سفارش‌های باز هر ابزار"""
+        if resolver is not None:
+            self.resolver = resolver
+        return {instrument: len(self.get(instrument).orders) for instrument in INSTRUMENTS}
+
+
+order_books = OrderBookRegistry(settings.ORDER_JOURNAL_DIR or None, settings.ORDER_JOURNAL_FSYNC)
@@ -0,0 +1,160 @@
+# backend/app/services/positions.py
+"""
+موقعیت‌های پورتفوی کاربر (positions) با به‌روزرسانی افزایشی
+
+- هر معامله در همان تراکنش خودش ردیف (user, instrument) را قفل و به‌روز می‌کند:
+  مقدار، بهای تمام‌شده (روش میانگین موزون) و سود/زیان تحقق‌یافته
+- فروش از موقعیت خرید (یا خرید از موقعیت فروش) به نسبت میانگین قیمت بسته می‌شود؛
+  اگر از مقدار باز بیشتر باشد موقعیت برعکس می‌شود
+- سود/زیان تحقق‌نیافته هنگام خواندن از قیمت لحظه‌ای محاسبه می‌شود؛ پورتفو با
+  O(تعداد ابزارها) ساخته می‌شود نه O(تعداد معاملات)
+"""
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.n_plus_one import allow_repeated_queries
+from app.models.trade_models import Position, Trade
+from app.utils.upsert import insert_if_absent
+
+QUANTITY_DIGITS = 6
+EPSILON = 10 ** -QUANTITY_DIGITS / 2
+
+# (instrument, trade_type, amount, unit_price)
+TradeFill = Tuple[str, str, float, int]
+
+
+def apply_fill(position: Position, trade_type: str, amount: float, price: int) -> None:
+    """اعمال یک معامله روی موقعیت (در حافظه؛ ذخیره با flush/commit فراخواننده)"""
+    signed = amount if trade_type == "buy" else -amount
+    quantity, cost_basis = position.quantity or 0.0, position.cost_basis or 0
+
+    if abs(quantity) < EPSILON or (quantity > 0) == (signed > 0):
+        quantity += signed
+        cost_basis += round(signed * price)
+    else:
+        direction = 1 if quantity > 0 else -1
+        closed = min(abs(signed), abs(quantity))
+        released = round(cost_basis * closed / abs(quantity))  # بهای بخش بسته‌شده
+        position.realized_pnl = (position.realized_pnl or 0) + round(direction * closed * price) - released
+        cost_basis -= released
+        quantity += signed
+        remaining = abs(signed) - closed
+        if remaining > EPSILON:
+            # موقعیت برعکس شد: مقدار اضافه موقعیت جدید با قیمت همین معامله است
+            quantity = remaining if signed > 0 else -remaining
+            cost_basis = round(quantity * price)
+
+    quantity = round(quantity, QUANTITY_DIGITS)
+    if abs(quantity) < EPSILON:
+        quantity, cost_basis = 0.0, 0
+    position.quantity, position.cost_basis = quantity, cost_basis
+    position.trade_count = (position.trade_count or 0) + 1
+
+
+def lock_positions(db: Session, user_id: int, instruments: Iterable[str]) -> Dict[str, Position]:
+    """موقعیت‌های کاربر با قفل ردیف (FOR UPDATE)؛ موقعیت‌های نبوده با مقدار صفر باز می‌شوند"""
+    instruments = sorted(set(instruments))
+
+    def load():
+        return {
+            position.instrument: position
+            for position in db.query(Position)
+            .filter(Position.user_id == user_id, Position.instrument.in_(instruments))
+            .with_for_update()
+            .populate_existing()
+        }
+
+    positions = load()
+    missing = [instrument for instrument in instruments if instrument not in positions]
+    if missing:
+        for instrument in missing:
+            insert_if_absent(db, Position, {
+                "user_id": user_id, "instrument": instrument, "quantity": 0.0,
+                "cost_basis": 0, "realized_pnl": 0, "trade_count": 0,
+            })
+        positions = load()
+    return positions
+
+
+def apply_trades(db: Session, user_id: int, fills: Sequence[TradeFill]) -> Dict[str, Position]:
+    """به‌روزرسانی موقعیت‌ها با معاملات کاربر به همان ترتیب (در تراکنش جاری)"""
+    positions = lock_positions(db, user_id, (fill[0] for fill in fills))
+    for instrument, trade_type, amount, price in fills:
+        apply_fill(positions[instrument], trade_type, amount, price)
+    return positions
+
+
+def value_positions(positions: Iterable[Position], prices: Mapping[str, int]) -> dict:
+    """ارزش روز و سود/زیان تحقق‌نیافته موقعیت‌ها با قیمت‌های لحظه‌ای"""
+    items: List[dict] = []
+    totals = {"market_value": 0, "cost_basis": 0, "unrealized_pnl": 0, "realized_pnl": 0}
+    for position in positions:
+        price: Optional[int] = prices.get(position.instrument)
+        market_value = round(position.quantity * price) if price is not None else None
+        unrealized = market_value - position.cost_basis if market_value is not None else None
+        items.append({
+            "instrument": position.instrument,
+            "quantity": position.quantity,
+            "avg_cost": round(position.cost_basis / position.quantity) if position.quantity else None,
+            "cost_basis": position.cost_basis,
+            "market_price": price,
+            "market_value": market_value,
+            "unrealized_pnl": unrealized,
+            "realized_pnl": position.realized_pnl,
+            "trade_count": position.trade_count,
+        })
+        totals["cost_basis"] += position.cost_basis
+        totals["realized_pnl"] += position.realized_pnl
+        if market_value is not None:
+            totals["market_value"] += market_value
+            totals["unrealized_pnl"] += unrealized
+    return {"positions": items, **totals}
+
+
+def rebuild_positions(db: Session, user_id: Optional[int] = None, batch_size: int = 1000) -> dict:
+    """
+    ساخت دوباره موقعیت‌ها از تاریخچه معاملات (برای معاملات پیش از جدول positions یا بررسی)
+
+    هر کاربر در تراکنش جدا و زیر همان قفل ردیف موقعیت‌ها که مسیر معامله می‌گیرد (lock_positions)
+    بازسازی می‌شود: معامله هم‌زمان یا پیش از بازسازی commit شده و در بازپخش دیده می‌شود یا
+    منتظر قفل می‌ماند و پس از آن روی موقعیت‌های بازسازی‌شده اعمال می‌شود.
+    معاملات هر کاربر به ترتیب (created_at, id) بازپخش می‌شوند
+    """
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = sorted(
+            {uid for (uid,) in db.query(Trade.user_id).distinct()}
+            | {uid for (uid,) in db.query(Position.user_id).distinct()}
+        )
+
+    rebuilt = trades = 0
+    # چند دستور برای هر کاربر: تکرار عمدی است، N+1 نیست
+    with allow_repeated_queries():
+        for uid in user_ids:
+            instruments = {i for (i,) in db.query(Trade.gold_type).filter(Trade.user_id == uid).distinct()}
+            instruments |= {i for (i,) in db.query(Position.instrument).filter(Position.user_id == uid)}
+            positions = lock_positions(db, uid, instruments)
+            for position in positions.values():
+                position.quantity, position.cost_basis, position.realized_pnl, position.trade_count = 0.0, 0, 0, 0
+
+            query = (
+                db.query(Trade.gold_type, Trade.trade_type, Trade.amount, Trade.price)
+                .filter(Trade.user_id == uid)
+                .order_by(Trade.created_at, Trade.id)
+            )
+            for row in query.yield_per(batch_size):
+                if row.gold_type not in positions:
+                    # ابزار جدید از معامله‌ای که پس از خواندن فهرست ابزارها commit شد
+                    positions.update(lock_positions(db, uid, [row.gold_type]))
+                apply_fill(positions[row.gold_type], row.trade_type, row.amount, row.price)
+                trades += 1
+
+            for position in positions.values():
+                if position.trade_count:
+                    rebuilt += 1
+                else:
+                    db.delete(position)
+            db.commit()
+    return {"positions": rebuilt, "trades_replayed": trades}
@@ -0,0 +1,256 @@
+# backend/app/services/price_table.py
+"""
+جدول قیمت درون‌حافظه‌ای (process-local) با اعلان تغییر از دیتابیس
+
+- همه قیمت‌ها هنگام راه‌اندازی بارگذاری می‌شوند؛ خواندن قیمت (get/all) هرگز به دیتابیس نمی‌رود
+- نسخه جاری یک dict تغییرناپذیر است که هنگام به‌روزرسانی کامل جایگزین می‌شود (خواندن بدون قفل)
+- تغییرات از هر process/worker با تریگر دیتابیس اعلان می‌شوند:
+  - PostgreSQL: تریگر pg_notify روی gold_prices و thread با LISTEN (بلافاصله)
+  - SQLite: تریگرها هر تغییر را در gold_price_changes ثبت می‌کنند و thread پس‌زمینه هر
+    PRICE_POLL_INTERVAL_SECONDS ردیف‌های جدید آن را می‌خواند (تأخیر حداکثر یک دوره)
+  فقط ردیف‌های تغییرکرده دوباره خوانده می‌شوند؛ هر PRICE_FULL_RELOAD_SECONDS (و پس از قطع
+  اتصال یا از دست رفتن اعلان‌ها) کل جدول بارگذاری مجدد می‌شود
+"""
+import atexit
+import select
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+CHANGES_TABLE = "gold_price_changes"
+NOTIFY_CHANNEL = "gold_price_changes"
+CHANGES_RETENTION = "-1 hour"
+
+_SQLITE_DDL = [
+    f"""CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        gold_type VARCHAR(50) NOT NULL,
+        changed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS gold_prices_change_ai AFTER INSERT ON gold_prices BEGIN
+        INSERT INTO {CHANGES_TABLE}(gold_type) VALUES (new.gold_type);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS gold_prices_change_au AFTER UPDATE ON gold_prices BEGIN
+        INSERT INTO {CHANGES_TABLE}(gold_type) VALUES (old.gold_type), (new.gold_type);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS gold_prices_change_ad AFTER DELETE ON gold_prices BEGIN
+        INSERT INTO {CHANGES_TABLE}(gold_type) VALUES (old.gold_type);
+    END""",
+]
+
+_POSTGRES_DDL = [
+    f"""CREATE OR REPLACE FUNCTION notify_gold_price_change() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM pg_notify('{NOTIFY_CHANNEL}', OLD.gold_type);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM pg_notify('{NOTIFY_CHANNEL}', NEW.gold_type);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS gold_prices_notify ON gold_prices",
+    """CREATE TRIGGER gold_prices_notify AFTER INSERT OR UPDATE OR DELETE ON gold_prices
+        FOR EACH ROW EXECUTE FUNCTION notify_gold_price_change()""",
+]
+
+_SELECT_PRICES = "SELECT id, gold_type, price, updated_at FROM gold_prices"
+
+
+@dataclass(frozen=True)
+class PriceSnapshot:
+    id: int
+    gold_type: str
+    price: int
+    updated_at: Optional[datetime]
+
+
+class PriceTable:
+    """قیمت‌های gold_prices در حافظه همین process"""
+
+    def __init__(self):
+        self._prices: Dict[str, PriceSnapshot] = {}
+        self._engine: Optional[Engine] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_change_id = 0
+        self._last_full_reload = 0.0
+        self.version = 0
+
+    # --- خواندن (بدون دیتابیس) ---
+
+    def get(self, gold_type: str) -> Optional[PriceSnapshot]:
+        self._ensure_loaded()
+        return self._prices.get(gold_type)
+
+    def price(self, gold_type: str) -> Optional[int]:
+        snapshot = self.get(gold_type)
+        return snapshot.price if snapshot else None
+
+    def prices(self, gold_types: Iterable[str]) -> Dict[str, int]:
+        self._ensure_loaded()
+        current = self._prices
+        return {gold_type: current[gold_type].price for gold_type in gold_types if gold_type in current}
+
+    def all(self) -> List[PriceSnapshot]:
+        self._ensure_loaded()
+        return sorted(self._prices.values(), key=lambda snapshot: snapshot.id)
+
+    # --- بارگذاری ---
+
+    def start(self, engine: Engine) -> int:
+        """نصب تریگرهای اعلان، بارگذاری کامل و شروع thread گوش‌دادن به تغییرات؛ تعداد قیمت‌ها"""
+        self._engine = engine
+        install_change_triggers(engine)
+        if engine.dialect.name == "sqlite":
+            with engine.connect() as conn:
+                self._last_change_id = conn.execute(text(f"SELECT coalesce(max(id), 0) FROM {CHANGES_TABLE}")).scalar()
+        self.reload()
+
+        if self._thread is None and engine.dialect.name in ("sqlite", "postgresql"):
+            target = self._poll_sqlite if engine.dialect.name == "sqlite" else self._listen_postgres
+            self._thread = threading.Thread(target=target, name="price-table", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return len(self._prices)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def reload(self, gold_types: Optional[Iterable[str]] = None) -> None:
+        """بارگذاری مجدد کل جدول یا فقط ابزارهای داده‌شده"""
+        engine = self._engine or self._default_engine()
+        with engine.connect() as conn:
+            if gold_types is None:
+                rows = conn.execute(text(_SELECT_PRICES)).all()
+            else:
+                gold_types = set(gold_types)
+                rows = conn.execute(
+                    text(f"{_SELECT_PRICES} WHERE gold_type IN :types").bindparams(bindparam("types", expanding=True)),
+                    {"types": sorted(gold_types)}
+                ).all() if gold_types else []
+
+        with self._lock:
+            if gold_types is None:
+                prices = {}
+                self._last_full_reload = time.monotonic()
+            else:
+                prices = {k: v for k, v in self._prices.items() if k not in gold_types}
+            for row in rows:
+                prices[row.gold_type] = PriceSnapshot(row.id, row.gold_type, row.price, _as_datetime(row.updated_at))
+            self._prices = prices
+            self._loaded = True
+            self.version += 1
+
+    def _ensure_loaded(self) -> None:
+        # بدون start (اسکریپت‌ها و بنچمارک‌ها): یک بار بارگذاری از engine اصلی، بدون اعلان تغییر
+        if not self._loaded:
+            self.reload()
+
+    @staticmethod
+    def _default_engine() -> Engine:
+        from app.database import engine
+        return engine
+
+    def _full_reload_due(self) -> bool:
+        return time.monotonic() - self._last_full_reload >= settings.PRICE_FULL_RELOAD_SECONDS
+
+    # --- اعلان تغییرات ---
+
+    def _poll_sqlite(self) -> None:
+        interval = settings.PRICE_POLL_INTERVAL_SECONDS
+        while not self._stop.wait(interval):
+            try:
+                self._poll_sqlite_once()
+            except Exception as e:
+                print(f"⚠️ خطا در به‌روزرسانی جدول قیمت: {e}")
+
+    def _poll_sqlite_once(self) -> None:
+        with self._engine.connect() as conn:
+            rows = conn.execute(
+                text(f"SELECT id, gold_type FROM {CHANGES_TABLE} WHERE id > :last ORDER BY id"),
+                {"last": self._last_change_id}
+            ).all()
+            oldest = conn.execute(text(f"SELECT min(id) FROM {CHANGES_TABLE}")).scalar() if rows else None
+
+        due = self._full_reload_due()
+        if rows:
+            # شکاف در شناسه‌ها یعنی تغییرات پیش از خوانده‌شدن پاک شده‌اند: بارگذاری کامل
+            missed = self._last_change_id and oldest > self._last_change_id + 1
+            self._last_change_id = rows[-1].id
+            if missed and not due:
+                self.reload()
+            elif not due:
+                self.reload({row.gold_type for row in rows})
+        if due:
+            self.reload()
+            self._purge_changes()
+
+    def _purge_changes(self) -> None:
+        """حذف اعلان‌های قدیمی (همه workerها تا این زمان آن‌ها را خوانده‌اند)"""
+        with self._engine.begin() as conn:
+            conn.execute(
+                text(f"DELETE FROM {CHANGES_TABLE} WHERE changed_at < datetime('now', :age)"),
+                {"age": CHANGES_RETENTION}
+            )
+
+    def _listen_postgres(self) -> None:
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self._engine.raw_connection()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                # اعلان‌های بین قطع و LISTEN دوباره از دست رفته‌اند
+                self.reload()
+
+                while not self._stop.is_set():
+                    ready, _, _ = select.select([dbapi_connection], [], [], settings.PRICE_POLL_INTERVAL_SECONDS)
+                    if ready:
+                        dbapi_connection.poll()
+                        changed = set()
+                        while dbapi_connection.notifies:
+                            changed.add(dbapi_connection.notifies.pop(0).payload)
+                        if changed:
+                            self.reload(changed)
+                    if self._full_reload_due():
+                        self.reload()
+            except Exception as e:
+                print(f"⚠️ اتصال LISTEN جدول قیمت قطع شد: {e}")
+                self._stop.wait(1.0)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.invalidate()  # اتصال در حالت autocommit/LISTEN به pool برنمی‌گردد
+                    except Exception:
+                        pass
+
+
+def install_change_triggers(engine: Engine) -> None:
+    """نصب تریگرهای اعلان تغییر gold_prices (idempotent)"""
+    statements = {"sqlite": _SQLITE_DDL, "postgresql": _POSTGRES_DDL}.get(engine.dialect.name, [])
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    # SQLite در text() رشته برمی‌گرداند
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+price_table = PriceTable()
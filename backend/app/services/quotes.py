@@ -0,0 +1,66 @@
+# backend/app/services/quotes.py
+"""
+توکن quote: قیمت امضاشده و کوتاه‌عمر برای اجرای معامله با همان قیمتی که کاربر دیده است
+
+توکن یک JWT (HS256) با ادعاهای ابزار، قیمت، کاربر و انقضا است و بدون وضعیت سمت سرور
+(و بدون خواندن قیمت از دیتابیس) بررسی می‌شود. aud=quote مانع استفاده از توکن دسترسی
+به جای quote (و برعکس) است. در طول عمر کوتاه توکن، چند معامله می‌توانند از یک quote استفاده کنند
+"""
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from jose import ExpiredSignatureError, JWTError, jwt
+
+from app.core.config import settings
+
+QUOTE_AUDIENCE = "quote"
+ALGORITHM = "HS256"
+
+
+class QuoteError(Exception):
+    """توکن quote نامعتبر، منقضی یا متعلق به ابزار/کاربر دیگر است"""
+
+
+@dataclass
+class Quote:
+    quote_token: str
+    gold_type: str
+    price: int
+    expires_at: datetime
+
+
+def issue_quote(user_id: int, gold_type: str, price: int, ttl_seconds: float = None) -> Quote:
+    """صدور quote امضاشده برای کاربر"""
+    if ttl_seconds is None:
+        ttl_seconds = settings.QUOTE_TTL_SECONDS
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    token = jwt.encode(
+        {
+            "aud": QUOTE_AUDIENCE,
+            "sub": str(user_id),
+            "ins": gold_type,
+            "px": price,
+            "iat": now,
+            "exp": expires_at,
+            "jti": uuid.uuid4().hex,
+        },
+        settings.QUOTE_SECRET_KEY,
+        algorithm=ALGORITHM,
+    )
+    return Quote(token, gold_type, price, expires_at)
+
+
+def verify_quote(token: str, user_id: int, gold_type: str) -> int:
+    """بررسی امضا، انقضا، کاربر و ابزار quote؛ خروجی: قیمت واحد"""
+    try:
+        claims = jwt.decode(token, settings.QUOTE_SECRET_KEY, algorithms=[ALGORITHM], audience=QUOTE_AUDIENCE)
+    except ExpiredSignatureError:
+        raise QuoteError("Quote expired")
+    except JWTError:
+        raise QuoteError("Invalid quote")
+
+    if claims.get("sub") != str(user_id) or claims.get("ins") != gold_type or not isinstance(claims.get("px"), int):
+        raise QuoteError("Invalid quote")
+    return claims["px"]
@@ -0,0 +1,335 @@
+# backend/app/services/trade_execution.py
+"""
+اجرای معامله با به‌روزرسانی اتمیک موجودی
+
+موجودی هرگز در پایتون خوانده، مقایسه و بازنویسی نمی‌شود؛ journal معامله در دفتر کل
+(app.services.ledger) با یک UPDATE شرطی روی snapshot کیف پول
+(balance = balance + :x WHERE balance >= -:x RETURNING ...) بررسی و کسر را
+در دیتابیس و بدون قفل سراسری انجام می‌دهد. خطاهای گذرای قفل / serialization
+با تعداد محدود تلاش مجدد و backoff تصادفی تکرار می‌شوند
+
+موقعیت‌های پورتفو (app.services.positions) و حجم غلتان / سطح ریسک
+(app.services.trading_volume) در همان تراکنش به‌روز می‌شوند
+"""
+import random
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.n_plus_one import allow_repeated_queries
+from app.models.trade_models import Trade
+from app.services.ledger import (
+    AccountNotFoundError, InsufficientFundsError, ensure_wallet, ensure_wallets, get_balance, hold_account,
+    house_account, journal_entry_types, post_journal, wallet_account
+)
+from app.services.order_book import BUY, Fill, Order, QUANTITY_SCALE, notional
+from app.services.positions import TradeFill, apply_trades
+from app.services.trading_volume import TradingLimitExceededError, record_volume
+
+MAX_TRADE_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 0.01
+
+T = TypeVar("T")
+
+
+class TradeError(Exception):
+    """خطای قابل نمایش به کاربر در اجرای معامله"""
+
+
+class InsufficientBalanceError(TradeError):
+    """موجودی برای خرید کافی نیست"""
+
+
+class WalletNotFoundError(TradeError):
+    """کاربر پروفایل کاربر عادی (کیف پول) ندارد"""
+
+
+class TradingLimitError(TradeError):
+    """حجم 24 ساعت کاربر از سقف سطح ریسک یا سقف سفارشی‌اش بیشتر می‌شود"""
+
+
+def _is_transient(error: OperationalError) -> bool:
+    message = str(error.orig).lower()
+    return (
+        "database is locked" in message        # SQLite: busy_timeout تمام شد
+        or "deadlock detected" in message      # Postgres
+        or "could not serialize" in message    # Postgres: SERIALIZABLE / REPEATABLE READ
+    )
+
+
+def _post_trade(db: Session, trade: Trade) -> int:
+    """journal دوطرفه معامله: کیف پول کاربر در برابر حساب house؛ موجودی جدید کیف پول"""
+    wallet = wallet_account(trade.user_id)
+    signed = -trade.total_amount if trade.trade_type == "buy" else trade.total_amount
+    postings = [(wallet, signed), (house_account(trade.user_id), -signed)]
+    balances = post_journal(db, postings, f"trade_{trade.trade_type}", "trade", trade.id, guarded=(wallet,))
+    return balances[wallet]
+
+
+def _open_wallet(db: Session, user_id: int) -> None:
+    """افتتاح کیف پول قدیمی (پیش از دفتر کل) از موجودی پروفایل در تراکنش جدا"""
+    try:
+        ensure_wallet(db, user_id)
+        db.commit()
+    except AccountNotFoundError:
+        db.rollback()
+        raise WalletNotFoundError("Wallet not found")
+
+
+def run_wallet_transaction(db: Session, user_ids: Iterable[int], work: Callable[[], T],
+                           max_attempts: int = MAX_TRADE_ATTEMPTS) -> T:
+    """
+    اجرای work و commit در یک تراکنش با مدیریت خطاهای مشترک کیف پول
+
+    - موجودی ناکافی بلافاصله InsufficientBalanceError می‌شود
+    - کیف پول باز نشده: کل تراکنش برگردانده، کیف پول افتتاح و work تکرار می‌شود
+    - فقط خطاهای گذرای قفل با backoff تکرار می‌شوند
+    """
+    attempt = 0
+    opened = set()
+
+    while True:
+        try:
+            result = work()
+            db.commit()
+            return result
+        except InsufficientFundsError:
+            db.rollback()
+            raise InsufficientBalanceError("Insufficient balance")
+        except TradingLimitExceededError:
+            db.rollback()
+            raise TradingLimitError("Trading limit exceeded")
+        except AccountNotFoundError as e:
+            # کل تراکنش (شامل postingهای اعمال‌شده) برگردانده و پس از افتتاح کیف پول تکرار می‌شود
+            db.rollback()
+            user_id = int(str(e.args[0]).split(":", 1)[1])
+            if user_id in opened or user_id not in user_ids:
+                raise WalletNotFoundError("Wallet not found")
+            _open_wallet(db, user_id)
+            opened.add(user_id)
+        except OperationalError as e:
+            db.rollback()
+            attempt += 1
+            if not _is_transient(e) or attempt >= max_attempts:
+                raise
+            # backoff نمایی با jitter تا تلاش‌های هم‌زمان دوباره با هم برخورد نکنند
+            time.sleep(RETRY_BACKOFF_SECONDS * (2 ** attempt) * random.random())
+
+
+def execute_trade(
+    db: Session,
+    user_id: int,
+    gold_type: str,
+    amount: float,
+    trade_type: str,
+    unit_price: int,
+    max_attempts: int = MAX_TRADE_ATTEMPTS,
+    on_executed: Optional[Callable[[Trade], None]] = None
+) -> Trade:
+    """
+    ثبت معامله و تغییر موجودی در یک تراکنش
+
+    خطای موجودی ناکافی بلافاصله برمی‌گردد؛ فقط خطاهای گذرای قفل تکرار می‌شوند
+    on_executed پیش از commit و در همان تراکنش صدا زده می‌شود (مثلاً ذخیره پاسخ idempotency)
+    """
+    total_amount = round(amount * unit_price)
+
+    def work():
+        trade = Trade(
+            user_id=user_id,
+            gold_type=gold_type,
+            amount=amount,
+            price=unit_price,
+            total_amount=total_amount,
+            trade_type=trade_type,
+            status="completed"
+        )
+        db.add(trade)
+        db.flush()  # شناسه معامله برای ارجاع postingها
+        trade.balance_after = _post_trade(db, trade)
+        apply_trades(db, user_id, [(gold_type, trade_type, amount, unit_price)])
+        record_volume(db, user_id, total_amount)
+        if on_executed is not None:
+            on_executed(trade)
+        return trade
+
+    return run_wallet_transaction(db, (user_id,), work, max_attempts)
+
+
+def execute_trade_batch(
+    db: Session,
+    user_id: int,
+    legs: Sequence[Tuple[str, float, str, int]],
+    max_attempts: int = MAX_TRADE_ATTEMPTS
+) -> Tuple[List[Trade], Optional[int]]:
+    """
+    ثبت چند معامله (gold_type, amount, trade_type, unit_price) در یک تراکنش
+
+    همه Tradeها با یک INSERT چندردیفی ثبت می‌شوند و اثر خالص آن‌ها روی کیف پول
+    (فروش‌ها - خریدها) با یک journal و یک بررسی موجودی اعمال می‌شود؛ اگر موجودی
+    برای خالص برداشت کافی نباشد هیچ معامله‌ای ثبت نمی‌شود
+    خروجی: Tradeها به ترتیب legs و موجودی نهایی کیف پول
+    """
+    rows = [
+        {
+            "user_id": user_id,
+            "gold_type": gold_type,
+            "amount": amount,
+            "price": unit_price,
+            "total_amount": round(amount * unit_price),
+            "trade_type": trade_type,
+            "status": "completed",
+        }
+        for gold_type, amount, trade_type, unit_price in legs
+    ]
+    net = sum(row["total_amount"] if row["trade_type"] == "sell" else -row["total_amount"] for row in rows)
+    wallet = wallet_account(user_id)
+
+    def work():
+        # یک INSERT چندردیفی؛ شناسه‌ها در یک دستور به ترتیب VALUES تخصیص می‌یابند، پس ردیف‌های
+        # RETURNING مرتب‌شده بر اساس id با legs متناظرند (sort_by_parameter_order در SQLite
+        # به یک دستور برای هر ردیف تبدیل می‌شود)
+        returned = sorted(db.execute(insert(Trade).returning(Trade.id, Trade.created_at), rows).all())
+        # اشیاء Trade موقت (خارج از session): پس از commit نیازی به بارگذاری مجدد تک‌تک ردیف‌ها نیست
+        trades = [Trade(id=r.id, created_at=r.created_at, **row) for r, row in zip(returned, rows)]
+        if net:
+            # یک journal خالص برای کل دسته؛ ارجاع به اولین معامله دسته
+            balance = post_journal(db, [(wallet, net), (house_account(user_id), -net)], "trade_batch",
+                                   "trade_batch", trades[0].id, guarded=(wallet,))[wallet]
+        else:
+            balance = get_balance(db, wallet)
+            if balance is None:
+                # مانند post_journal: کیف پول باز نشده با یک دور تکرار تراکنش افتتاح می‌شود
+                raise AccountNotFoundError(wallet)
+        apply_trades(db, user_id, [
+            (gold_type, trade_type, amount, price) for gold_type, amount, trade_type, price in legs
+        ])
+        record_volume(db, user_id, sum(row["total_amount"] for row in rows))
+        for trade in trades:
+            trade.balance_after = balance
+        return trades, balance
+
+    return run_wallet_transaction(db, (user_id,), work, max_attempts)
+
+
+# --- سفارش‌های محدود (order book) ---
+
+def reserve_order_funds(db: Session, user_id: int, amount: int) -> int:
+    """رزرو وجه سفارش خرید: انتقال از کیف پول به حساب hold کاربر؛ موجودی جدید کیف پول"""
+    wallet = wallet_account(user_id)
+
+    def work():
+        return post_journal(db, [(wallet, -amount), (hold_account(user_id), amount)],
+                            "order_hold", guarded=(wallet,))[wallet]
+
+    return run_wallet_transaction(db, (user_id,), work)
+
+
+def order_reference(instrument: str) -> str:
+    """reference_type سندهای دفتر کل یک سفارش (reference_id شناسه سفارش در دفتر آن ابزار است)"""
+    return f"order:{instrument}"
+
+
+def release_order_funds(db: Session, user_id: int, amount: int,
+                        reference_type: Optional[str] = None, reference_id: Optional[int] = None) -> None:
+    """بازگرداندن وجه رزروشده باقی‌مانده (لغو یا قیمت بهتر) به کیف پول"""
+    if amount <= 0:
+        return
+
+    def work():
+        post_journal(db, [(hold_account(user_id), -amount), (wallet_account(user_id), amount)], "order_release",
+                     reference_type, reference_id)
+
+    run_wallet_transaction(db, (user_id,), work)
+
+
+def settle_fills(db: Session, fills: List[Fill]) -> List[Trade]:
+    """
+    تسویه fillها در یک تراکنش: دو Trade (خریدار و فروشنده) برای هر fill
+
+    خریدار از hold و به قیمت fill پرداخت می‌کند و اختلاف با قیمت حد به کیف پولش برمی‌گردد.
+    همه Tradeها با یک INSERT چندردیفی ثبت می‌شوند و اثر همه fillها با یک journal خالص
+    (هر حساب یک posting) اعمال می‌شود؛ تعداد دستورات به تعداد حساب‌ها/کاربران است نه fillها
+    """
+    if not fills:
+        return []
+
+    # همه fillها از یک سفارش taker هستند؛ journal با شناسه آن ثبت می‌شود (بازیابی intent دفتر سفارش)
+    taker = fills[0]
+    taker_order_id = taker.buy_order_id if taker.taker_side == BUY else taker.sell_order_id
+    rows = []
+    postings: Dict[str, int] = {}
+    for fill in fills:
+        cost = notional(fill.price, fill.quantity)
+        amount = fill.quantity / QUANTITY_SCALE
+        for user_id, trade_type in ((fill.buyer_id, "buy"), (fill.seller_id, "sell")):
+            rows.append({
+                "user_id": user_id,
+                "gold_type": fill.instrument,
+                "amount": amount,
+                "price": fill.price,
+                "total_amount": cost,
+                "trade_type": trade_type,
+                "status": "completed",
+            })
+
+        # سهم این fill از وجه رزروشده (تفاضل تجمعی: جمع سهم‌ها دقیقاً برابر رزرو است)
+        held = notional(fill.buy_limit, fill.buy_filled) - notional(fill.buy_limit, fill.buy_filled - fill.quantity)
+        for account, amount_delta in (
+            (hold_account(fill.buyer_id), -held),
+            (wallet_account(fill.buyer_id), held - cost),
+            (house_account(fill.buyer_id), cost),
+            (house_account(fill.seller_id), -cost),
+            (wallet_account(fill.seller_id), cost),
+        ):
+            postings[account] = postings.get(account, 0) + amount_delta
+
+    # موقعیت‌های هر کاربر با fillهایش به همان ترتیب
+    by_user: Dict[int, List[TradeFill]] = {}
+    volumes: Dict[int, int] = {}
+    for row in rows:
+        by_user.setdefault(row["user_id"], []).append(
+            (row["gold_type"], row["trade_type"], row["amount"], row["price"])
+        )
+        volumes[row["user_id"]] = volumes.get(row["user_id"], 0) + row["total_amount"]
+
+    def work():
+        # شناسه‌ها به ترتیب VALUES (مانند execute_trade_batch)
+        returned = sorted(db.execute(insert(Trade).returning(Trade.id, Trade.created_at), rows).all())
+        trades = [Trade(id=r.id, created_at=r.created_at, **row) for r, row in zip(returned, rows)]
+
+        # یک دستور برای هر حساب/کاربر درگیر (نه هر fill): تکرار عمدی است، N+1 نیست
+        with allow_repeated_queries():
+            # فروشنده‌های بدون کیف پول همین‌جا باز می‌شوند، نه با یک دور تکرار تراکنش برای هر کدام
+            ensure_wallets(db, by_user)
+            post_journal(db, [(account, amount) for account, amount in postings.items() if amount],
+                         "order_fills", order_reference(taker.instrument), taker_order_id)
+            for user_id in sorted(by_user):
+                apply_trades(db, user_id, by_user[user_id])
+                # fillها در دفتر سفارش تطبیق خورده‌اند: حجم ثبت می‌شود ولی سقف اینجا اعمال نمی‌شود
+                record_volume(db, user_id, volumes[user_id], enforce_limit=False)
+        return trades
+
+    return run_wallet_transaction(db, set(by_user), work)
+
+
+def resolve_order_intent(db: Session, instrument: str, op: str, order: Order, fills: List[Fill]) -> bool:
+    """
+    روشن‌کردن intent بدون نتیجه در journal دفتر سفارش از روی دفتر کل (crash وسط تسویه)
+
+    ثبت: با journal order_fills این سفارش commit شده است؛ وگرنه رزرو خرید اگر هنوز آزاد نشده
+    برمی‌گردد. ثبت بدون fill چیزی برای تسویه ندارد. لغو خرید با order_release سفارش commit شده است
+    """
+    entry_types = journal_entry_types(db, order_reference(instrument), order.order_id)
+    if op == "place":
+        if not fills or "order_fills" in entry_types:
+            return True
+        if order.side == BUY and "order_release" not in entry_types:
+            release_order_funds(db, order.user_id, notional(order.price, order.quantity),
+                                order_reference(instrument), order.order_id)
+        return False
+    return order.side != BUY or "order_release" in entry_types
+
@@ -0,0 +1,225 @@
+# backend/app/services/trading_volume.py
+"""
+حجم معاملات غلتان 24 ساعت / 7 روز / 30 روز و سطح ریسک کاربر
+
+- هر کاربر یک ردیف trading_volume_stats با دو ring buffer ثابت دارد: 24 سطل ساعتی و
+  30 سطل روزانه؛ هر معامله سطل‌های منقضی را صفر و مبلغ را به سطل جاری اضافه می‌کند
+  (هزینه ثابت، مستقل از تعداد معاملات)
+- پنجره‌ها هم‌مرز سطل‌اند: 24 ساعت = ساعت جاری + 23 ساعت قبل، 7/30 روز = روز جاری (UTC) + روزهای قبل
+- سطح ریسک از حجم‌ها مشتق و همراه trading_volume (حجم 30 روز) در RegularUserProfile
+  آینه می‌شود تا لیست‌ها و ایندکس idx_regular_risk_balance معتبر بمانند
+- بررسی سقف حجم 24 ساعت برای هر معامله O(1) است: سقف سفارشی کاربر
+  (trading_limits["daily_volume"]) یا سقف سطح ریسک (RISK_DAILY_VOLUME_LIMITS)
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.trade_models import Trade, TradingVolumeStats
+from app.models.user_models import RegularUserProfile
+from app.utils.pagination import apply_time_range
+from app.utils.upsert import insert_if_absent
+
+HOURLY_BUCKETS = 24
+DAILY_BUCKETS = 30
+WEEK_DAYS = 7
+RISK_LEVELS = ("low", "medium", "high")
+
+
+class TradingLimitExceededError(Exception):
+    """معامله از سقف حجم 24 ساعت کاربر بیشتر است"""
+
+
+@dataclass
+class Volumes:
+    volume_24h: int
+    volume_7d: int
+    volume_30d: int
+
+
+def _parse_levels(value: str) -> Dict[str, int]:
+    """'medium:100,high:500' → {'medium': 100, 'high': 500}"""
+    result = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        level, amount = item.split(":", 1)
+        result[level.strip()] = int(amount)
+    return result
+
+
+def _parse_thresholds(value: str) -> Tuple[int, int, int]:
+    """'24h,7d,30d' آستانه‌های یک سطح ریسک"""
+    day, week, month = (int(part) for part in value.split(","))
+    return day, week, month
+
+
+RISK_THRESHOLDS = {
+    "medium": _parse_thresholds(settings.RISK_MEDIUM_VOLUME),
+    "high": _parse_thresholds(settings.RISK_HIGH_VOLUME),
+}
+DAILY_VOLUME_LIMITS = _parse_levels(settings.RISK_DAILY_VOLUME_LIMITS)
+
+
+def _slots(now: Optional[float] = None) -> Tuple[int, int]:
+    now = time.time() if now is None else now
+    return int(now // 3600), int(now // 86400)
+
+
+def _advance(buckets: list, last: int, current: int) -> list:
+    """صفر کردن سطل‌های منقضی‌شده بین آخرین به‌روزرسانی و اکنون (حداکثر یک دور)"""
+    elapsed = current - last
+    if elapsed <= 0:
+        return list(buckets)
+    buckets = list(buckets)
+    size = len(buckets)
+    for offset in range(1, min(elapsed, size) + 1):
+        buckets[(last + offset) % size] = 0
+    return buckets
+
+
+def current_volumes(stats: TradingVolumeStats, now: Optional[float] = None) -> Volumes:
+    """حجم پنجره‌ها در لحظه now (بدون تغییر ردیف؛ برای خواندن)"""
+    hour, day = _slots(now)
+    hourly = _advance(stats.hourly, stats.last_hour, hour)
+    daily = _advance(stats.daily, stats.last_day, day)
+    return Volumes(
+        sum(hourly),
+        sum(daily[(day - offset) % DAILY_BUCKETS] for offset in range(WEEK_DAYS)),
+        sum(daily),
+    )
+
+
+def risk_level_for(volumes: Volumes) -> str:
+    """بالاترین سطحی که حداقل یکی از آستانه‌های پنجره‌ای آن رد شده باشد"""
+    for level in ("high", "medium"):
+        day, week, month = RISK_THRESHOLDS[level]
+        if volumes.volume_24h >= day or volumes.volume_7d >= week or volumes.volume_30d >= month:
+            return level
+    return "low"
+
+
+def daily_limit(risk_level: str, trading_limits: Optional[dict]) -> Optional[int]:
+    """سقف حجم 24 ساعت: سقف سفارشی کاربر یا سقف سطح ریسک (None = بدون سقف)"""
+    custom = (trading_limits or {}).get("daily_volume")
+    if custom:
+        return int(custom)
+    return DAILY_VOLUME_LIMITS.get(risk_level) or None
+
+
+def _lock_stats(db: Session, user_id: int, hour: int, day: int) -> TradingVolumeStats:
+    stats = db.query(TradingVolumeStats).filter(TradingVolumeStats.user_id == user_id).with_for_update().first()
+    if stats is None:
+        insert_if_absent(db, TradingVolumeStats, {
+            "user_id": user_id, "hourly": [0] * HOURLY_BUCKETS, "daily": [0] * DAILY_BUCKETS,
+            "last_hour": hour, "last_day": day, "volume_24h": 0, "volume_7d": 0, "volume_30d": 0,
+        })
+        stats = (
+            db.query(TradingVolumeStats).filter(TradingVolumeStats.user_id == user_id)
+            .with_for_update().populate_existing().one()
+        )
+    return stats
+
+
+def record_volume(db: Session, user_id: int, amount: int, enforce_limit: bool = True,
+                  now: Optional[float] = None) -> Volumes:
+    """
+    ثبت حجم معامله(ها) در تراکنش جاری و به‌روزرسانی سطح ریسک پروفایل
+
+    با enforce_limit اگر حجم 24 ساعت پس از این معامله از سقف بیشتر شود
+    TradingLimitExceededError (فراخواننده تراکنش را برمی‌گرداند)
+    """
+    hour, day = _slots(now)
+    stats = _lock_stats(db, user_id, hour, day)
+    hourly = _advance(stats.hourly, stats.last_hour, hour)
+    daily = _advance(stats.daily, stats.last_day, day)
+
+    if enforce_limit:
+        profile = db.query(RegularUserProfile.risk_level, RegularUserProfile.trading_limits).filter(
+            RegularUserProfile.user_id == user_id
+        ).first()
+        if profile is not None:
+            limit = daily_limit(profile.risk_level, profile.trading_limits)
+            if limit is not None and sum(hourly) + amount > limit:
+                raise TradingLimitExceededError(f"24h trading volume limit {limit} exceeded")
+
+    hourly[hour % HOURLY_BUCKETS] += amount
+    daily[day % DAILY_BUCKETS] += amount
+    # لیست جدید (نه تغییر درجا) تا ستون JSON تغییرکرده شناخته شود
+    stats.hourly, stats.daily = hourly, daily
+    stats.last_hour, stats.last_day = max(stats.last_hour, hour), max(stats.last_day, day)
+    volumes = current_volumes(stats, now)
+    stats.volume_24h, stats.volume_7d, stats.volume_30d = volumes.volume_24h, volumes.volume_7d, volumes.volume_30d
+
+    db.execute(
+        update(RegularUserProfile)
+        .where(RegularUserProfile.user_id == user_id)
+        .values(trading_volume=volumes.volume_30d, risk_level=risk_level_for(volumes))
+        .execution_options(synchronize_session=False)
+    )
+    return volumes
+
+
+def rebuild_trading_stats(db: Session, user_id: Optional[int] = None, now: Optional[float] = None) -> dict:
+    """
+    ساخت دوباره شمارنده‌ها از معاملات 30 روز اخیر و به‌روزرسانی سطح ریسک
+
+    برای معاملات پیش از این جدول و تازه کردن حجم/ریسک کاربرانی که مدتی معامله نکرده‌اند
+    """
+    now = time.time() if now is None else now
+    hour, day = _slots(now)
+    since = datetime.utcfromtimestamp((day - DAILY_BUCKETS + 1) * 86400)
+
+    profiles = db.query(RegularUserProfile.user_id)
+    stats_query = db.query(TradingVolumeStats)
+    trades = apply_time_range(
+        db.query(Trade.user_id, Trade.total_amount, Trade.created_at).filter(Trade.status == "completed"),
+        Trade.created_at, since
+    )
+    if user_id is not None:
+        profiles = profiles.filter(RegularUserProfile.user_id == user_id)
+        stats_query = stats_query.filter(TradingVolumeStats.user_id == user_id)
+        trades = trades.filter(Trade.user_id == user_id)
+
+    buckets: Dict[int, Tuple[list, list]] = {}
+    for row in trades.yield_per(1000):
+        if row.created_at is None:
+            continue
+        stamp = (row.created_at - datetime(1970, 1, 1)) / timedelta(seconds=1)
+        trade_hour, trade_day = _slots(stamp)
+        hourly, daily = buckets.setdefault(row.user_id, ([0] * HOURLY_BUCKETS, [0] * DAILY_BUCKETS))
+        if hour - trade_hour < HOURLY_BUCKETS:
+            hourly[trade_hour % HOURLY_BUCKETS] += row.total_amount
+        if day - trade_day < DAILY_BUCKETS:
+            daily[trade_day % DAILY_BUCKETS] += row.total_amount
+
+    existing = {stats.user_id: stats for stats in stats_query}
+    levels = {level: 0 for level in RISK_LEVELS}
+    user_ids = [row.user_id for row in profiles]
+    profile_updates = []
+    for profile_user_id in user_ids:
+        hourly, daily = buckets.get(profile_user_id, ([0] * HOURLY_BUCKETS, [0] * DAILY_BUCKETS))
+        stats = existing.get(profile_user_id)
+        if stats is None:
+            stats = TradingVolumeStats(user_id=profile_user_id)
+            db.add(stats)
+        stats.hourly, stats.daily, stats.last_hour, stats.last_day = hourly, daily, hour, day
+        volumes = current_volumes(stats, now)
+        stats.volume_24h, stats.volume_7d, stats.volume_30d = volumes.volume_24h, volumes.volume_7d, volumes.volume_30d
+        level = risk_level_for(volumes)
+        levels[level] += 1
+        profile_updates.append({"b_user_id": profile_user_id, "b_volume": volumes.volume_30d, "b_level": level})
+
+    if profile_updates:
+        profiles_table = RegularUserProfile.__table__
+        db.execute(
+            update(profiles_table)
+            .where(profiles_table.c.user_id == bindparam("b_user_id"))
+            .values(trading_volume=bindparam("b_volume"), risk_level=bindparam("b_level")),
+            profile_updates
+        )
+    db.commit()
+    return {"users": len(user_ids), "risk_levels": levels}
@@ -0,0 +1,335 @@
+# backend/app/services/user_import.py
+import codecs
+import csv
+import json
+import atexit
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.auth import pwd_context
+from app.core.config import settings
+from app.core.audit_logger import log_audit_batch
+from app.core.n_plus_one import allow_repeated_queries
+from app.models.user_models import User, RegularUserProfile, UserStatus, phone_digits_expression
+from app.services.trading_volume import RISK_LEVELS
+from app.utils.text_normalization import build_search_text, fold_digits, normalize_phone, phone_stored_forms
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 500
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+# ستون‌های قابل قبول در فایل ورودی
+USER_FIELDS = ("email", "phone", "password", "first_name", "last_name", "national_id", "country", "city")
+PROFILE_FIELDS = ("balance", "risk_level")
+
+
+def _hash_password(password: str) -> str:
+    """هش رمز عبور در process جداگانه (باید در سطح ماژول باشد تا pickle شود)"""
+    return pwd_context.hash(password)
+
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_pool_lock = threading.Lock()
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """
+    process pool مشترک همه importها با IMPORT_HASH_WORKERS worker
+
+    یک بار و با spawn ساخته می‌شود (fork از سرور چند-thread امن نیست)؛ importهای هم‌زمان
+    در صف همین workerها می‌مانند و تعداد processها ثابت است
+    """
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=settings.IMPORT_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            atexit.register(_hash_pool.shutdown, wait=False, cancel_futures=True)
+        return _hash_pool
+
+
+def detect_format(filename: Optional[str], explicit: Optional[str] = None) -> str:
+    """تشخیص قالب فایل از پارامتر یا پسوند"""
+    if explicit:
+        fmt = explicit.lower()
+    elif filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        fmt = "ndjson"
+    else:
+        fmt = "csv"
+
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"قالب پشتیبانی نمی‌شود: {fmt}")
+    return fmt
+
+
+def iter_records(stream, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    خواندن جریانی رکوردها از فایل باینری - هر بار یک خط
+
+    خروجی: (شماره خط، دیکشنری یا پیام خطای parse)
+    """
+    reader = codecs.getreader("utf-8-sig")(stream)
+
+    if fmt == "csv":
+        rows = csv.DictReader(reader)
+        for row in rows:
+            yield rows.line_num, row
+        return
+
+    for line_no, line in enumerate(reader, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, f"JSON نامعتبر: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, "هر خط باید یک شیء JSON باشد"
+            continue
+        yield line_no, record
+
+
+def _clean_record(record: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """نرمال‌سازی و اعتبارسنجی یک رکورد"""
+    errors = []
+    data = {}
+    for field in USER_FIELDS + PROFILE_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        data[field] = value if value not in ("", None) else None
+
+    if data["email"]:
+        data["email"] = data["email"].lower()
+        if "@" not in data["email"]:
+            errors.append("ایمیل نامعتبر است")
+    else:
+        errors.append("ایمیل الزامی است")
+
+    if not data["password"]:
+        errors.append("رمز عبور الزامی است")
+
+    if data["phone"]:
+        data["phone"] = normalize_phone(data["phone"]) or None
+
+    if data["national_id"]:
+        # ارقام فارسی/عربی: تشخیص تکراری روی شکل لاتین انجام می‌شود
+        data["national_id"] = fold_digits(str(data["national_id"]))
+
+    try:
+        data["balance"] = int(data["balance"] or 0)
+    except (TypeError, ValueError):
+        errors.append("موجودی باید عدد صحیح باشد")
+
+    data["risk_level"] = str(data["risk_level"] or "low").lower()
+    if data["risk_level"] not in RISK_LEVELS:
+        errors.append(f"سطح ریسک باید یکی از {', '.join(RISK_LEVELS)} باشد")
+    return data, errors
+
+
+class UserImportService:
+    """
+    ورود گروهی کاربران عادی از CSV/NDJSON
+
+    - فایل به صورت جریانی و دسته‌ای خوانده می‌شود
+    - تکراری‌ها با یک کوئری برای هر دسته (email/phone/national_id) تشخیص داده می‌شوند
+    - هش رمزها در process pool مشترک (get_hash_pool) انجام می‌شود
+    - کاربران و پروفایل‌ها با INSERT چندردیفی ثبت می‌شوند
+    """
+
+    def __init__(self, db: Session, chunk_size: int = IMPORT_CHUNK_SIZE,
+                 default_status: UserStatus = UserStatus.ACTIVE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.default_status = default_status
+
+    def _existing_keys(self, rows: List[Dict[str, Any]]) -> Dict[str, set]:
+        """
+        یک کوئری برای یافتن email/phone/national_id موجود در دیتابیس
+
+        ردیف‌های قدیمی ممکن است نرمال‌نشده ذخیره شده باشند (ایمیل با حروف بزرگ، +98 و
+        جداکننده در شماره)؛ هر دو طرف مقایسه نرمال می‌شوند و کوئری از ایندکس‌های عبارتی
+        idx_user_email_lower و idx_user_phone_digits استفاده می‌کند
+        """
+        emails = {row["email"] for row in rows if row["email"]}
+        phones = {row["phone"] for row in rows if row["phone"]}
+        national_ids = {row["national_id"] for row in rows if row["national_id"]}
+
+        conditions = []
+        if emails:
+            conditions.append(func.lower(User.email).in_(emails))
+        if phones:
+            stored_forms = {form for phone in phones for form in phone_stored_forms(phone)}
+            conditions.append(phone_digits_expression(User.phone).in_(stored_forms))
+        if national_ids:
+            conditions.append(User.national_id.in_(national_ids))
+
+        existing = {"email": set(), "phone": set(), "national_id": set()}
+        if not conditions:
+            return existing
+
+        for email, phone, national_id in self.db.query(User.email, User.phone, User.national_id).filter(or_(*conditions)):
+            existing["email"].add(email.lower())
+            existing["phone"].add(normalize_phone(phone))
+            existing["national_id"].add(national_id)
+        return existing
+
+    def _deduplicate(self, chunk: List[Tuple[int, Dict[str, Any]]]):
+        """حذف رکوردهای تکراری نسبت به دیتابیس و داخل همین دسته"""
+        existing = self._existing_keys([row for _, row in chunk])
+        seen = {"email": set(), "phone": set(), "national_id": set()}
+        accepted, errors = [], []
+
+        for line_no, row in chunk:
+            row_errors = []
+            for key, label in (("email", "ایمیل"), ("phone", "شماره تلفن"), ("national_id", "کد ملی")):
+                value = row[key]
+                if not value:
+                    continue
+                if value in existing[key]:
+                    row_errors.append(f"{label} از قبل وجود دارد")
+                elif value in seen[key]:
+                    row_errors.append(f"{label} در فایل تکراری است")
+            if row_errors:
+                errors.append({"line": line_no, "errors": row_errors})
+                continue
+            for key in seen:
+                if row[key]:
+                    seen[key].add(row[key])
+            accepted.append((line_no, row))
+
+        return accepted, errors
+
+    def _user_values(self, row: Dict[str, Any], password_hash: str) -> Dict[str, Any]:
+        """مقادیر ستون‌های users (INSERT هسته‌ای از eventهای ORM عبور نمی‌کند)"""
+        full_name = f"{row['first_name']} {row['last_name']}" if row["first_name"] and row["last_name"] else None
+        return {
+            "email": row["email"],
+            "phone": row["phone"],
+            "password_hash": password_hash,
+            "first_name": row["first_name"] or "",
+            "last_name": row["last_name"] or "",
+            "full_name": full_name,
+            "national_id": row["national_id"],
+            "country": row["country"],
+            "city": row["city"],
+            "user_type": "regular",
+            "status": self.default_status,
+            "search_text": build_search_text(
+                [row["email"], full_name, row["first_name"], row["last_name"]], phone=row["phone"]
+            ),
+        }
+
+    def _insert_rows(self, rows: List[Tuple[int, Dict[str, Any]]], hashes: List[str]) -> int:
+        """INSERT چندردیفی کاربران (با RETURNING برای id) و سپس پروفایل‌ها"""
+        user_values = [self._user_values(row, password_hash) for (_, row), password_hash in zip(rows, hashes)]
+        inserted = self.db.execute(insert(User).returning(User.id, User.email), user_values).all()
+
+        ids_by_email = {email: user_id for user_id, email in inserted}
+        self.db.execute(insert(RegularUserProfile), [
+            {
+                "user_id": ids_by_email[row["email"]],
+                "balance": row["balance"],
+                "risk_level": row["risk_level"],
+            }
+            for _, row in rows
+        ])
+        return len(inserted)
+
+    def _insert_chunk(self, rows, hashes) -> Tuple[int, List[Dict[str, Any]]]:
+        """ثبت یک دسته؛ در صورت تداخل هم‌زمان، ثبت ردیف‌به‌ردیف با savepoint"""
+        try:
+            created = self._insert_rows(rows, hashes)
+            self.db.commit()
+            return created, []
+        except IntegrityError:
+            self.db.rollback()
+
+        created, errors = 0, []
+        for row, password_hash in zip(rows, hashes):
+            try:
+                with self.db.begin_nested():
+                    created += self._insert_rows([row], [password_hash])
+            except IntegrityError as e:
+                errors.append({"line": row[0], "errors": [f"تداخل با رکورد موجود: {e.orig}"]})
+        self.db.commit()
+        return created, errors
+
+    def _chunks(self, records: Iterable[Tuple[int, Any]]):
+        iterator = iter(records)
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def run(self, stream, fmt: str, admin_user_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        اجرای import و تولید رویدادهای پیشرفت
+
+        رویدادها: error (خطای هر ردیف)، progress (پس از هر دسته)، summary (پایان)
+        """
+        totals = {"processed": 0, "created": 0, "failed": 0}
+
+        # هر دسته همان دستورات را تکرار می‌کند (N+1 نیست)
+        pool = get_hash_pool()
+        with allow_repeated_queries():
+            for chunk in self._chunks(iter_records(stream, fmt)):
+                valid = []
+                for line_no, record in chunk:
+                    if isinstance(record, str):
+                        errors = [record]
+                    else:
+                        record, errors = _clean_record(record)
+                    if errors:
+                        totals["failed"] += 1
+                        yield {"type": "error", "line": line_no, "errors": errors}
+                    else:
+                        valid.append((line_no, record))
+
+                accepted, duplicate_errors = self._deduplicate(valid)
+                for error in duplicate_errors:
+                    totals["failed"] += 1
+                    yield {"type": "error", **error}
+
+                if accepted:
+                    passwords = [row["password"] for _, row in accepted]
+                    hashes = list(pool.map(_hash_password, passwords,
+                                           chunksize=max(1, len(passwords) // settings.IMPORT_HASH_WORKERS)))
+                    created, insert_errors = self._insert_chunk(accepted, hashes)
+                    totals["created"] += created
+                    for error in insert_errors:
+                        totals["failed"] += 1
+                        yield {"type": "error", **error}
+
+                totals["processed"] += len(chunk)
+                yield {"type": "progress", **totals}
+
+        if totals["created"]:
+            log_audit_batch(self.db, [{
+                "action": "create",
+                "resource_type": "user",
+                "admin_user_id": admin_user_id,
+                "description": f"Bulk import: {totals['created']} users created, {totals['failed']} failed",
+                "new_values": dict(totals),
+            }])
+            self.db.commit()
+
+        # آمار کاربران با INSERT هسته‌ای تغییر کرده است
+        from app.services.user_stats import user_stats_service
+        user_stats_service.invalidate()
+
+        yield {"type": "summary", **totals}
@@ -0,0 +1,144 @@
+# backend/app/services/user_stats.py
+import threading
+import time
+import logging
+from typing import Dict, Any, Optional
+
+from sqlalchemy import String, cast, event, func, inspect, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import registry, CACHE_REQUESTS
+from app.models.user_models import User, UserStatus
+from app.models.admin_models import AdminUser, AdminRole, AdminStatus
+
+logger = logging.getLogger(__name__)
+
+
+def _enum_value(enum_class, stored: Optional[str]) -> str:
+    """
+    مقدار Enum از روی نام ذخیره‌شده
+
+    ردیف‌های قدیمی (seed_data) گاهی به جای نام، خود مقدار را ذخیره کرده‌اند
+    """
+    if not stored:
+        return "unknown"
+    if stored in enum_class.__members__:
+        return enum_class[stored].value
+    return stored.lower()
+
+
+class UserStatsService:
+    """
+    آمار کاربران و ادمین‌ها با یک کوئری GROUP BY و کش کوتاه‌مدت
+
+    کش با هر ایجاد/تغییر وضعیت کاربر از طریق eventهای ORM باطل می‌شود؛
+    TTL تغییرات سایر workerها و به‌روزرسانی‌های گروهی را پوشش می‌دهد
+    """
+
+    def __init__(self, cache_timeout: int = 15):
+        self.cache_timeout = cache_timeout
+        self.cache: Optional[Dict[str, Any]] = None
+        self.cached_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _grouped_counts_query():
+        """یک کوئری: شمارش کاربران (user_type, status) و ادمین‌ها (role, status)"""
+        users_counts = select(
+            literal("user").label("source"),
+            cast(User.user_type, String).label("kind"),
+            cast(User.status, String).label("status"),
+            func.count().label("total")
+        ).group_by(User.user_type, User.status)
+
+        admin_counts = select(
+            literal("admin").label("source"),
+            cast(AdminUser.role, String).label("kind"),
+            cast(AdminUser.status, String).label("status"),
+            func.count().label("total")
+        ).group_by(AdminUser.role, AdminUser.status)
+
+        return union_all(users_counts, admin_counts)
+
+    def _compute(self, db: Session) -> Dict[str, Any]:
+        """اجرای کوئری و تبدیل به ساختار {نوع: {وضعیت: تعداد}}"""
+        users: Dict[str, Dict[str, int]] = {}
+        admins: Dict[str, Dict[str, int]] = {}
+
+        for source, kind, status, total in db.execute(self._grouped_counts_query()):
+            # Enum در دیتابیس با نام عضو ذخیره می‌شود (ACTIVE)؛ به مقدار (active) تبدیل می‌کنیم
+            if source == "user":
+                status_value = _enum_value(UserStatus, status)
+                bucket = users.setdefault(kind or "regular", {})
+            else:
+                status_value = _enum_value(AdminStatus, status)
+                bucket = admins.setdefault(_enum_value(AdminRole, kind), {})
+            bucket[status_value] = bucket.get(status_value, 0) + total
+
+        return {"users": users, "admins": admins}
+
+    def get_stats(self, db: Session) -> Dict[str, Any]:
+        """دریافت آمار از کش یا محاسبه مجدد در صورت انقضا"""
+        now = time.monotonic()
+        cached = self.cache
+        if cached is not None and now - self.cached_at < self.cache_timeout:
+            registry.inc(CACHE_REQUESTS, {"cache": "user_stats", "result": "hit"})
+            return cached
+
+        with self._lock:
+            if self.cache is not None and time.monotonic() - self.cached_at < self.cache_timeout:
+                registry.inc(CACHE_REQUESTS, {"cache": "user_stats", "result": "hit"})
+                return self.cache
+            registry.inc(CACHE_REQUESTS, {"cache": "user_stats", "result": "miss"})
+            self.cache = self._compute(db)
+            self.cached_at = time.monotonic()
+            return self.cache
+
+    def invalidate(self) -> None:
+        """باطل کردن کش آمار"""
+        self.cache = None
+
+    @staticmethod
+    def count_users(stats: Dict[str, Any], status: str = None, user_type: str = None) -> int:
+        """جمع تعداد کاربران با فیلتر اختیاری وضعیت و نوع"""
+        total = 0
+        for kind, by_status in stats["users"].items():
+            if user_type and kind != user_type:
+                continue
+            for status_value, count in by_status.items():
+                if status is None or status_value == status:
+                    total += count
+        return total
+
+    @staticmethod
+    def count_admins(stats: Dict[str, Any], roles=None, status: str = None) -> int:
+        """جمع تعداد ادمین‌ها با فیلتر اختیاری نقش و وضعیت"""
+        total = 0
+        for role, by_status in stats["admins"].items():
+            if roles and role not in roles:
+                continue
+            for status_value, count in by_status.items():
+                if status is None or status_value == status:
+                    total += count
+        return total
+
+
+user_stats_service = UserStatsService(cache_timeout=settings.USER_STATS_CACHE_SECONDS)
+
+
+def _invalidate_on_change(mapper, connection, target):
+    user_stats_service.invalidate()
+
+
+def _invalidate_on_status_change(mapper, connection, target):
+    state = inspect(target)
+    watched = [name for name in ("status", "user_type", "role") if name in state.mapper.attrs]
+    if any(state.attrs[name].history.has_changes() for name in watched):
+        user_stats_service.invalidate()
+
+
+for _model in (User, AdminUser):
+    event.listen(_model, "after_insert", _invalidate_on_change)
+    event.listen(_model, "after_delete", _invalidate_on_change)
+    event.listen(_model, "after_update", _invalidate_on_status_change)
@@ -0,0 +1,74 @@
+# backend/app/utils/pagination.py
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import String, and_, literal, or_, tuple_
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: int) -> str:
+    """ساخت cursor مات از (created_at, id) آخرین ردیف صفحه؛ created_at خالی با رشته خالی"""
+    stamp = created_at.isoformat() if created_at is not None else ""
+    raw = f"{stamp}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """بازکردن cursor - در صورت نامعتبر بودن ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        stamp, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        return (datetime.fromisoformat(stamp) if stamp else None), int(row_id)
+    except Exception as e:
+        raise ValueError(f"cursor نامعتبر: {cursor}") from e
+
+
+def _bind_timestamp(query, value: datetime):
+    """
+    روی SQLite ستون‌های func.now() به شکل 'YYYY-MM-DD HH:MM:SS' ذخیره می‌شوند
+    و مقایسه رشته‌ای با '...SS.000000' اشتباه می‌شود؛ پس با همان قالب bind می‌کنیم
+    """
+    if query.session.get_bind().dialect.name == "sqlite":
+        timespec = "microseconds" if value.microsecond else "seconds"
+        return literal(value.isoformat(sep=" ", timespec=timespec), String)
+    return value
+
+
+def apply_keyset(query, created_column, id_column, cursor: Optional[str] = None):
+    """
+    صفحه‌بندی keyset روی (created_at, id) به ترتیب نزولی
+
+    به جای OFFSET که ردیف‌های قبلی را اسکن می‌کند، از آخرین کلید صفحه قبل ادامه می‌دهد.
+    ردیف‌های بدون created_at اول می‌آیند (NULLS FIRST، ترتیب طبیعی DESC در PostgreSQL) و بین
+    خودشان با id مرتب می‌شوند؛ پس cursor ردیف دارای زمان همان شرط بازه‌ای ایندکس‌پذیر را دارد
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if created_at is None:
+            query = query.filter(or_(
+                and_(created_column.is_(None), id_column < row_id),
+                created_column.is_not(None)
+            ))
+        else:
+            query = query.filter(
+                tuple_(created_column, id_column) < tuple_(_bind_timestamp(query, created_at), row_id)
+            )
+
+    return query.order_by(created_column.desc().nulls_first(), id_column.desc())
+
+
+def apply_time_range(query, column, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """فیلتر بازه زمانی [since, until) با همان قالب bind ستون‌های زمان در SQLite"""
+    if since is not None:
+        query = query.filter(column >= _bind_timestamp(query, since))
+    if until is not None:
+        query = query.filter(column < _bind_timestamp(query, until))
+    return query
+
+
+def next_cursor(rows, limit: int, created_attr: str = "created_at", id_attr: str = "id") -> Optional[str]:
+    """cursor صفحه بعد - اگر صفحه کامل نباشد None"""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, created_attr), getattr(last, id_attr))
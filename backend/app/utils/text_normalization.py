@@ -0,0 +1,88 @@
+# backend/app/utils/text_normalization.py
+import re
+from typing import Iterable, Optional
+
+# ارقام فارسی و عربی → ارقام لاتین
+_DIGIT_TABLE = {ord(c): str(i) for i, c in enumerate("۰۱۲۳۴۵۶۷۸۹")}
+_DIGIT_TABLE.update({ord(c): str(i) for i, c in enumerate("٠١٢٣٤٥٦٧٨٩")})
+
+# یکسان‌سازی حروف عربی با معادل فارسی
+_CHAR_TABLE = {
+    ord("ي"): "ی",
+    ord("ى"): "ی",
+    ord("ك"): "ک",
+    ord("ة"): "ه",
+    ord("\u200c"): " ",  # نیم‌فاصله
+    ord("\u0640"): None,  # کشیده
+}
+
+# اعراب عربی (فتحه، کسره، تنوین و ...)
+_DIACRITICS_RE = re.compile(r"[\u064b-\u065f\u0670]")
+_WHITESPACE_RE = re.compile(r"\s+")
+_PHONE_CHARS_RE = re.compile(r"^[\d\s\-\+\(\)]+$")
+
+
+def fold_digits(value: str) -> str:
+    """تبدیل ارقام فارسی/عربی به لاتین"""
+    return value.translate(_DIGIT_TABLE)
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """نرمال‌سازی متن فارسی برای ایندکس و جستجو"""
+    if not value:
+        return ""
+
+    value = fold_digits(value).translate(_CHAR_TABLE)
+    value = _DIACRITICS_RE.sub("", value)
+    return _WHITESPACE_RE.sub(" ", value).strip().lower()
+
+
+def normalize_phone(value: Optional[str]) -> str:
+    """نرمال‌سازی شماره تلفن: حذف جداکننده‌ها و تبدیل +98/0098 به 0"""
+    if not value:
+        return ""
+
+    digits = "".join(ch for ch in fold_digits(value) if ch.isdigit())
+    if digits.startswith("0098"):
+        digits = "0" + digits[4:]
+    elif digits.startswith("98") and len(digits) == 12:
+        digits = "0" + digits[2:]
+    return digits
+
+
+# جداکننده‌هایی که phone_digits_expression در SQL حذف می‌کند
+PHONE_SEPARATORS = " -().+"
+
+
+def phone_stored_forms(normalized: str) -> Iterable[str]:
+    """
+    شکل‌های ممکن شماره ذخیره‌شده (پس از حذف جداکننده‌ها) که normalize_phone آن‌ها را به normalized می‌رساند
+    ('09121234567' ← 09121234567 / 00989121234567 / +989121234567)
+    """
+    forms = [normalized]
+    if normalized.startswith("0") and len(normalized) == 11:
+        forms += ["0098" + normalized[1:], "98" + normalized[1:]]
+    return forms
+
+
+def looks_like_phone(value: str) -> bool:
+    """آیا عبارت جستجو شبیه شماره تلفن است"""
+    folded = fold_digits(value.strip())
+    return bool(folded) and bool(_PHONE_CHARS_RE.match(folded)) and any(ch.isdigit() for ch in folded)
+
+
+def build_search_text(parts: Iterable[Optional[str]], phone: Optional[str] = None) -> str:
+    """ساخت متن یکپارچه قابل جستجو از فیلدهای کاربر"""
+    tokens = [normalize_text(part) for part in parts]
+    if phone:
+        tokens.append(normalize_phone(phone))
+    return " ".join(token for token in tokens if token)
+
+
+def normalize_search_term(term: Optional[str]) -> str:
+    """نرمال‌سازی عبارت جستجوی ورودی با همان قواعد ایندکس"""
+    if not term:
+        return ""
+    if looks_like_phone(term):
+        return normalize_phone(term)
+    return normalize_text(term)
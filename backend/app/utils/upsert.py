@@ -0,0 +1,28 @@
+# backend/app/utils/upsert.py
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+
+def insert_if_absent(db: Session, model, values: dict) -> bool:
+    """
+    INSERT ردیف اگر کلید یکتا از قبل نباشد (یا هم‌زمان درج نشود)؛ True اگر درج شد
+
+    روی SQLite/PostgreSQL با ON CONFLICT DO NOTHING (بدون savepoint که در pysqlite
+    خارج از تراکنش صریح خراب است)؛ بقیه با savepoint و IntegrityError
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        result = db.execute(dialect_insert(model).values(**values).on_conflict_do_nothing())
+        return result.rowcount == 1
+
+    try:
+        with db.begin_nested():
+            db.execute(insert(model).values(**values))
+        return True
+    except IntegrityError:
+        return False
@@ -0,0 +1,72 @@
+# backend/benchmarks/bench_regular_users_listing.py
+"""
+بنچمارک لیست کاربران عادی: مسیر قدیم (ORM + lazy load پروفایل) در برابر کوئری projection
+
+اجرا: python benchmarks/bench_regular_users_listing.py
+"""
+import time
+
+from common import make_session_factory, seed_regular_users, QueryCounter
+
+from app.core.user_management import CentralUserManager
+
+ROWS = 500
+ROUNDS = 20
+
+
+def legacy_listing(manager):
+    """مسیر قبلی: هر ردیف سه بار به user.regular_profile دسترسی دارد"""
+    users = manager.get_users_by_type(user_type="regular", limit=ROWS)
+    return [
+        {
+            "id": user.id,
+            "balance": user.regular_profile.balance if user.regular_profile else 0,
+            "risk_level": user.regular_profile.risk_level if user.regular_profile else "low",
+            "credit_score": user.regular_profile.credit_score if user.regular_profile else 0,
+        }
+        for user in users
+    ]
+
+
+def projected_listing(manager):
+    """مسیر جدید: یک کوئری با join و فقط ستون‌های لازم"""
+    rows = manager.get_regular_user_rows(limit=ROWS)
+    return [
+        {
+            "id": row.id,
+            "balance": row.balance,
+            "risk_level": row.risk_level,
+            "credit_score": row.credit_score,
+        }
+        for row in rows
+    ]
+
+
+def run(label, engine, SessionLocal, listing):
+    queries = 0
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        db = SessionLocal()
+        try:
+            with QueryCounter(engine) as counter:
+                result = listing(CentralUserManager(db))
+            queries = counter.count
+        finally:
+            db.close()
+    elapsed = (time.perf_counter() - start) * 1000 / ROUNDS
+    print(f"{label:<12} rows={len(result):<4} queries={queries:<4} latency={elapsed:.2f} ms")
+
+
+def main():
+    engine, SessionLocal = make_session_factory()
+    db = SessionLocal()
+    seed_regular_users(db, ROWS)
+    db.close()
+
+    print(f"📊 لیست {ROWS} کاربر عادی (میانگین {ROUNDS} اجرا)")
+    run("legacy", engine, SessionLocal, legacy_listing)
+    run("projected", engine, SessionLocal, projected_listing)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# backend/benchmarks/bench_security_middleware.py
+"""
+بنچمارک SecurityMiddleware: نسخه قبلی (BaseHTTPMiddleware) در برابر ASGI خام
+
+اجرا: python benchmarks/bench_security_middleware.py
+"""
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+import common  # noqa: F401 - تنظیم sys.path
+
+from app.security.middleware import SecurityMiddleware, SECURITY_HEADERS
+from app.security.rate_limit import SlidingWindowRateLimiter
+
+REQUESTS = 5000
+CONCURRENCY = 50
+# سقف بالا تا محدودیت نرخ در اندازه‌گیری دخالت نکند
+NO_LIMIT = {"default": 10 ** 9, "auth": 10 ** 9, "admin": 10 ** 9}
+
+
+class LegacySecurityMiddleware(BaseHTTPMiddleware):
+    """همان منطق قبلی روی BaseHTTPMiddleware"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.inner = SecurityMiddleware(app, rate_limiter=SlidingWindowRateLimiter(limits=NO_LIMIT))
+
+    async def dispatch(self, request, call_next):
+        if request.client.host in self.inner.blocked_ips:
+            return None
+        self.inner.check_rate_limit(request.client.host, "default")
+        response = await call_next(request)
+        for name, value in SECURITY_HEADERS.items():
+            response.headers[name] = value
+        return response
+
+
+def build_app(middleware):
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(100):
+                yield f"{i}\n".encode()
+        return StreamingResponse(chunks())
+
+    if middleware == "legacy":
+        app.add_middleware(LegacySecurityMiddleware)
+    elif middleware == "asgi":
+        app.add_middleware(SecurityMiddleware, rate_limiter=SlidingWindowRateLimiter(limits=NO_LIMIT))
+    return app
+
+
+async def measure(label, app, path):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def one():
+            async with semaphore:
+                response = await client.get(path)
+                assert response.status_code == 200
+
+        await asyncio.gather(*(one() for _ in range(200)))  # گرم کردن
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+    print(f"{label:<10} {path:<8} {REQUESTS / elapsed:>8.0f} req/s")
+
+
+async def main():
+    print(f"📊 {REQUESTS} درخواست با هم‌زمانی {CONCURRENCY}")
+    for path in ("/ping", "/stream"):
+        for label in ("none", "legacy", "asgi"):
+            await measure(label, build_app(label), path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+# backend/benchmarks/bench_sqlite_profile.py
+"""
+بنچمارک پروفایل SQLite: تنظیمات قبلی (legacy) در برابر tuned (WAL + pragmaها + pool)
+
+بار کاری: چند thread هم‌زمان مسیر لاگین را شبیه‌سازی می‌کنند
+(خواندن کاربر با تلفن، به‌روزرسانی last_login، ثبت audit log و commit).
+هش bcrypt عمداً حذف شده تا فقط هزینه دیتابیس اندازه‌گیری شود.
+
+اجرا: python benchmarks/bench_sqlite_profile.py [threads] [logins_per_thread]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import common  # noqa: F401 - تنظیم sys.path
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import func
+
+from app.database import Base, create_sqlite_engine
+from app.models import User
+from app.models.audit_models import AuditLog, AuditAction
+from common import seed_regular_users
+
+USERS = 500
+
+
+def login_and_audit(Session, phone: str) -> bool:
+    db = Session()
+    try:
+        user = db.query(User).filter(User.phone == phone).first()
+        user.last_login = func.now()
+        db.add(AuditLog(
+            action=AuditAction.LOGIN,
+            resource_type="user",
+            resource_id=user.id,
+            user_id=user.id,
+            description="bench login",
+            status_code=200
+        ))
+        db.commit()
+        return True
+    except OperationalError:
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+def run(profile: str, threads: int, per_thread: int):
+    directory = tempfile.mkdtemp(prefix=f"bench_sqlite_{profile}_")
+    url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    engine = create_sqlite_engine(url, profile, pool_size=threads, max_overflow=0)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    seed_regular_users(db, USERS)
+    db.close()
+
+    def worker(index: int):
+        ok = failed = 0
+        for i in range(per_thread):
+            phone = f"0910{(index * per_thread + i) % USERS:07d}"
+            if login_and_audit(Session, phone):
+                ok += 1
+            else:
+                failed += 1
+        return ok, failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - started
+
+    ok = sum(r[0] for r in results)
+    failed = sum(r[1] for r in results)
+    with engine.connect() as conn:
+        journal = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+    engine.dispose()
+    return {
+        "profile": profile,
+        "journal": journal,
+        "synchronous": synchronous,
+        "ok": ok,
+        "failed": failed,
+        "seconds": elapsed,
+        "per_second": ok / elapsed,
+    }
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"🔬 {threads} thread × {per_thread} لاگین+audit روی دیتابیس فایلی")
+    for profile in ("legacy", "tuned"):
+        result = run(profile, threads, per_thread)
+        print(
+            f"{result['profile']:>7}: journal={result['journal']:<6} synchronous={result['synchronous']} "
+            f"موفق={result['ok']:>5} ناموفق(locked)={result['failed']:>4} "
+            f"زمان={result['seconds']:.2f}s  توان={result['per_second']:.0f} ops/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
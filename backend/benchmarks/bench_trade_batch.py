@@ -0,0 +1,67 @@
+# backend/benchmarks/bench_trade_batch.py
+"""
+بنچمارک ثبت دسته‌ای معاملات: N بار execute_trade (یک تراکنش و commit برای هر معامله)
+در برابر یک execute_trade_batch (INSERT چندردیفی، یک journal خالص، یک commit)
+
+روی فایل SQLite (پروفایل tuned) اجرا می‌شود تا هزینه commit واقعی باشد
+
+اجرا: python benchmarks/bench_trade_batch.py [legs]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import common  # noqa: F401 - تنظیم sys.path
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_sqlite_engine
+from app.models import User, Trade
+from app.services.ledger import reconcile
+from app.services.trade_execution import execute_trade, execute_trade_batch
+from common import QueryCounter, seed_regular_users
+
+UNIT_PRICE = 3_000_000
+
+
+def make_legs(count: int):
+    return [("gold18", 0.01, "buy" if i % 3 else "sell", UNIT_PRICE) for i in range(count)]
+
+
+def setup(name: str):
+    directory = tempfile.mkdtemp(prefix=f"bench_batch_{name}_")
+    engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", "tuned")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    seed_regular_users(db, 1, balance=10 ** 12)
+    user_id = db.query(User.id).scalar()
+    return engine, db, user_id
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    legs = make_legs(count)
+    print(f"🔬 {count} معامله برای یک کاربر")
+
+    for name in ("single", "batch"):
+        engine, db, user_id = setup(name)
+        with QueryCounter(engine) as counter:
+            started = time.perf_counter()
+            if name == "single":
+                for gold_type, amount, trade_type, price in legs:
+                    execute_trade(db, user_id, gold_type, amount, trade_type, price)
+            else:
+                execute_trade_batch(db, user_id, legs)
+            elapsed = time.perf_counter() - started
+        trades = db.query(Trade).count()
+        mismatches = len(reconcile(db)["mismatches"])
+        db.close()
+        engine.dispose()
+        print(f"{name:>6}: {elapsed * 1000:>8.1f} ms  کوئری={counter.count:>5}  "
+              f"معامله={trades}  مغایرت دفتر کل={mismatches}  توان={count / elapsed:.0f} trades/s")
+
+
+if __name__ == "__main__":
+    main()
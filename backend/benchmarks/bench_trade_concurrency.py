@@ -0,0 +1,134 @@
+# backend/benchmarks/bench_trade_concurrency.py
+"""
+بنچمارک هم‌زمانی معاملات: خواندن-بررسی-نوشتن موجودی در پایتون (مسیر قبلی create_trade)
+در برابر UPDATE شرطی اتمیک (execute_trade)
+
+چند thread روی تعداد کمی کاربر (رقابت بالا) خرید ثبت می‌کنند؛ تعداد تلاش‌ها بیشتر از
+موجودی است تا بررسی موجودی هم زیر فشار باشد. در پایان برای هر کاربر بررسی می‌شود:
+موجودی اولیه - مجموع معاملات ثبت‌شده == موجودی نهایی (بدون lost update) و موجودی منفی نشده باشد.
+
+اجرا: python benchmarks/bench_trade_concurrency.py [threads] [trades_per_thread]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import common  # noqa: F401 - تنظیم sys.path
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_sqlite_engine
+from app.models import User, RegularUserProfile, Trade
+from app.services.ledger import reconcile
+from app.services.trade_execution import execute_trade, InsufficientBalanceError
+from common import seed_regular_users
+
+USERS = 4
+UNIT_PRICE = 1_000
+INITIAL_BALANCE = 400 * UNIT_PRICE
+
+
+def naive_buy(Session, user_id: int) -> str:
+    """مسیر قبلی: موجودی در پایتون بررسی و کم می‌شود"""
+    db = Session()
+    try:
+        profile = db.query(RegularUserProfile).filter(RegularUserProfile.user_id == user_id).first()
+        if profile.balance < UNIT_PRICE:
+            return "rejected"
+        profile.balance -= UNIT_PRICE
+        db.add(Trade(user_id=user_id, gold_type="gold18", amount=1, price=UNIT_PRICE,
+                     total_amount=UNIT_PRICE, trade_type="buy", status="completed"))
+        db.commit()
+        return "ok"
+    except OperationalError:
+        db.rollback()
+        return "failed"
+    finally:
+        db.close()
+
+
+def atomic_buy(Session, user_id: int) -> str:
+    db = Session()
+    try:
+        execute_trade(db, user_id, "gold18", 1, "buy", UNIT_PRICE)
+        return "ok"
+    except InsufficientBalanceError:
+        return "rejected"
+    except OperationalError:
+        return "failed"
+    finally:
+        db.close()
+
+
+def run(name: str, buy, threads: int, per_thread: int):
+    directory = tempfile.mkdtemp(prefix=f"bench_trade_{name}_")
+    url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    engine = create_sqlite_engine(url, "tuned", pool_size=threads, max_overflow=0)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    seed_regular_users(db, USERS, balance=INITIAL_BALANCE)
+    user_ids = [row[0] for row in db.query(User.id).order_by(User.id)]
+    db.close()
+
+    def worker(index: int):
+        results = {"ok": 0, "rejected": 0, "failed": 0}
+        for i in range(per_thread):
+            results[buy(Session, user_ids[(index + i) % USERS])] += 1
+        return results
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - started
+
+    totals = {key: sum(r[key] for r in results) for key in ("ok", "rejected", "failed")}
+
+    db = Session()
+    lost_updates = 0
+    overdrafts = 0
+    for user_id in user_ids:
+        balance = db.query(RegularUserProfile.balance).filter(RegularUserProfile.user_id == user_id).scalar()
+        spent = db.query(func.coalesce(func.sum(Trade.total_amount), 0)).filter(Trade.user_id == user_id).scalar()
+        # هر واحد اختلاف = یک معامله ثبت‌شده که از موجودی کسر نشده
+        lost_updates += (balance - (INITIAL_BALANCE - spent)) // UNIT_PRICE
+        overdrafts += spent > INITIAL_BALANCE
+    ledger = reconcile(db)
+    db.close()
+    engine.dispose()
+
+    return {
+        "name": name,
+        **totals,
+        "lost_updates": lost_updates,
+        "overdrawn_users": overdrafts,
+        "ledger_accounts": ledger["accounts"],
+        "ledger_mismatches": len(ledger["mismatches"]),
+        "seconds": elapsed,
+        "per_second": totals["ok"] / elapsed,
+    }
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    print(f"🔬 {threads} thread × {per_thread} خرید روی {USERS} کاربر "
+          f"(ظرفیت هر کاربر {INITIAL_BALANCE // UNIT_PRICE} خرید)")
+    for name, buy in (("naive", naive_buy), ("atomic", atomic_buy)):
+        result = run(name, buy, threads, per_thread)
+        print(
+            f"{result['name']:>6}: موفق={result['ok']:>5} رد(موجودی)={result['rejected']:>5} "
+            f"ناموفق(locked)={result['failed']:>4} lost_update={result['lost_updates']:>5} "
+            f"کاربر منفی={result['overdrawn_users']} "
+            f"دفتر کل(حساب/مغایرت)={result['ledger_accounts']}/{result['ledger_mismatches']}  "
+            f"توان={result['per_second']:.0f} trades/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# backend/benchmarks/common.py
+"""
+ابزارهای مشترک بنچمارک‌ها: دیتابیس SQLite در حافظه، داده نمونه و شمارنده کوئری
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import User, RegularUserProfile, UserStatus
+
+
+def make_session_factory(url: str = "sqlite://"):
+    """ساخت engine جدا برای بنچمارک و ایجاد جداول"""
+    if url == "sqlite://":
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+    else:
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def seed_regular_users(db, count: int, balance: int = 0) -> None:
+    """ایجاد کاربران عادی نمونه با پروفایل"""
+    for i in range(count):
+        user = User(
+            email=f"bench{i}@parsagold.com",
+            phone=f"0910{i:07d}",
+            password_hash="x",
+            first_name="کاربر",
+            last_name=f"تست{i}",
+            user_type="regular",
+            status=UserStatus.ACTIVE
+        )
+        user.regular_profile = RegularUserProfile(balance=balance, risk_level="low", credit_score=50)
+        db.add(user)
+    db.commit()
+
+
+class QueryCounter:
+    """شمارش کوئری‌های اجراشده روی یک engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def timer(label: str):
+    """اندازه‌گیری زمان اجرا و چاپ نتیجه"""
+    start = time.perf_counter()
+    yield
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"⏱️ {label}: {elapsed:.2f} ms")
@@ -0,0 +1,29 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, engine
+from app.core.user_search import ensure_search_column, ensure_search_index, backfill_search_text
+
+def rebuild_search_index():
+    """پر کردن search_text کاربران قدیمی و ساخت ایندکس جستجو"""
+    db = SessionLocal()
+    
+    try:
+        if ensure_search_column(engine):
+            print("✅ ستون search_text به جدول users اضافه شد")
+        
+        updated = backfill_search_text(db)
+        print(f"✅ search_text برای {updated} کاربر محاسبه شد")
+        
+        ensure_search_index(engine)
+        print("✅ ایندکس جستجو آماده است")
+        
+    except Exception as e:
+        print(f"❌ خطا: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_search_index()
@@ -0,0 +1,85 @@
+# backend/tests/conftest.py
+"""
+تنظیمات مشترک تست‌ها
+
+متغیرهای محیطی پیش از import شدن app تنظیم می‌شوند: دیتابیس SQLite موقت، دفتر سفارش
+بدون journal و تشخیص N+1 در حالت raise (هر N+1 در تست‌ها خطا است)
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+_TEST_DIR = tempfile.mkdtemp(prefix="parsagold-tests-")
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}")
+os.environ.setdefault("ORDER_JOURNAL_DIR", "")
+os.environ.setdefault("N_PLUS_ONE_MODE", "raise")
+os.environ.setdefault("SLOW_QUERY_THRESHOLD_MS", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app():
+    """برنامه FastAPI؛ import آن جدول‌ها، ایندکس‌ها و داده‌های اولیه را در دیتابیس تست می‌سازد"""
+    from app.main import app as fastapi_app
+    return fastapi_app
+
+
+ADMIN_USERNAME = "test-admin"
+ADMIN_PASSWORD = "Test-admin-pass"
+
+
+@pytest.fixture(scope="session")
+def admin_token(app):
+    """توکن یک ادمین تستی (ادمین seed شده نقش 'super_admin' دارد که با Enum نمی‌خواند)"""
+    from fastapi.testclient import TestClient
+
+    from app.database import SessionLocal
+    from app.models.admin_models import AdminRole, AdminUser
+    from app.security.auth import get_password_hash
+
+    db = SessionLocal()
+    try:
+        if not db.query(AdminUser).filter(AdminUser.username == ADMIN_USERNAME).first():
+            db.add(AdminUser(username=ADMIN_USERNAME, email=f"{ADMIN_USERNAME}@example.com",
+                             password_hash=get_password_hash(ADMIN_PASSWORD), role=AdminRole.SUPER_ADMIN))
+            db.commit()
+    finally:
+        db.close()
+
+    response = TestClient(app).post("/api/auth/admin/login",
+                                    data={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+    assert response.status_code == 200, response.text
+    return response.json()["access_token"]
+
+
+@pytest.fixture
+def make_trader(app):
+    """
+    سازنده کاربر عادی فعال با پروفایل (کیف پول هنگام اولین معامله باز می‌شود)؛
+    خروجی: (user_id, هدر Authorization)
+    """
+    import uuid
+
+    from app.core.auth import create_access_token
+    from app.database import SessionLocal
+    from app.models.user_models import RegularUserProfile, User, UserStatus
+
+    def make(balance: int = 0):
+        db = SessionLocal()
+        try:
+            user = User(email=f"trader-{uuid.uuid4().hex[:12]}@example.com", password_hash="x",
+                        user_type="regular", status=UserStatus.ACTIVE)
+            user.regular_profile = RegularUserProfile(balance=balance)
+            db.add(user)
+            db.commit()
+            user_id = user.id
+        finally:
+            db.close()
+        token = create_access_token({"user_id": user_id, "type": "user"})
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return make
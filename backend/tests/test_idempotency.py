@@ -0,0 +1,118 @@
+# backend/tests/test_idempotency.py
+"""
+Idempotency-Key ثبت معامله: فقط پاسخ موفق ذخیره می‌شود، تکرار هم‌زمان فوراً 409 می‌گیرد و
+صاحب قدیمی رزرو تصاحب‌شده نمی‌تواند معامله یا پاسخش را commit کند
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.idempotency_models import IdempotencyKey
+from app.models.trade_models import Trade
+from app.schemas.trade_schemas import TradeCreate
+from app.services import idempotency
+from app.services.idempotency import IdempotencyClaim, IdempotencyClaimLostError, request_fingerprint
+from app.services.ledger import EQUITY_ACCOUNT, get_balance, post_journal, wallet_account
+from app.services.quotes import issue_quote
+from app.services.trade_execution import execute_trade
+
+PRICE = 1000
+
+
+@pytest.fixture
+def client(app):
+    return TestClient(app)
+
+
+def _trade(user_id: int) -> dict:
+    quote = issue_quote(user_id, "gold", PRICE)
+    return {"gold_type": "gold", "amount": 1, "trade_type": "buy", "quote_token": quote.quote_token}
+
+
+def test_failed_trade_is_not_replayed(client, make_trader):
+    user_id, headers = make_trader(0)
+    headers = {**headers, "Idempotency-Key": "retry-after-deposit"}
+    body = _trade(user_id)
+
+    response = client.post("/api/trades/", json=body, headers=headers)
+    assert response.status_code == 400, response.text
+
+    db = SessionLocal()
+    try:
+        post_journal(db, [(wallet_account(user_id), PRICE), (EQUITY_ACCOUNT, -PRICE)], "deposit")
+        db.commit()
+    finally:
+        db.close()
+
+    # تکرار پس از واریز دوباره اجرا می‌شود، نه پاسخ 400 قبلی
+    response = client.post("/api/trades/", json=body, headers=headers)
+    assert response.status_code == 200, response.text
+    assert "Idempotent-Replayed" not in response.headers
+    assert response.json()["balance_after"] == 0
+
+    replay = client.post("/api/trades/", json=body, headers=headers)
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["id"] == response.json()["id"]
+
+
+def test_concurrent_duplicate_gets_409_immediately(client, make_trader):
+    user_id, headers = make_trader(10 ** 6)
+    key = "in-flight"
+    body = _trade(user_id)
+
+    # درخواست اصلی همین کلید هنوز در حال اجراست
+    db = SessionLocal()
+    try:
+        fingerprint = request_fingerprint(TradeCreate(**body).model_dump())
+        claim = idempotency.begin(db, user_id, key, "POST /api/trades/", fingerprint)
+        assert isinstance(claim, IdempotencyClaim)
+
+        started = time.monotonic()
+        response = client.post("/api/trades/", json=body, headers={**headers, "Idempotency-Key": key})
+        assert response.status_code == 409
+        assert response.headers["Retry-After"] == "1"
+        assert time.monotonic() - started < 1
+
+        idempotency.release(db, claim)
+        idempotency.finish(claim)
+    finally:
+        db.close()
+
+
+def test_stale_owner_cannot_complete_after_takeover(make_trader, monkeypatch):
+    user_id, _ = make_trader(10 ** 6)
+    key, endpoint, fingerprint = "taken-over", "POST /api/trades/", "fingerprint"
+    # هر رزرو بلافاصله رهاشده حساب می‌شود
+    monkeypatch.setattr(settings, "IDEMPOTENCY_LOCK_SECONDS", 0)
+
+    stale_db, owner_db = SessionLocal(), SessionLocal()
+    try:
+        stale = idempotency.begin(stale_db, user_id, key, endpoint, fingerprint)
+        time.sleep(0.001)
+        owner = idempotency.begin(owner_db, user_id, key, endpoint, fingerprint)
+        assert isinstance(owner, IdempotencyClaim) and owner.record_id == stale.record_id
+        assert owner.locked_at > stale.locked_at
+
+        def buy(db, claim):
+            return execute_trade(db, user_id, "gold", 1, "buy", PRICE,
+                                 on_executed=lambda trade: idempotency.complete(db, claim, 200, {"id": trade.id}))
+
+        # صاحب قدیمی دیر تمام می‌شود: پاسخ ذخیره نمی‌شود و معامله‌اش برگردانده می‌شود
+        with pytest.raises(IdempotencyClaimLostError):
+            buy(stale_db, stale)
+        idempotency.release(stale_db, stale)
+        assert stale_db.query(Trade).filter(Trade.user_id == user_id).count() == 0
+        assert get_balance(stale_db, wallet_account(user_id)) == 10 ** 6
+
+        # release صاحب قدیمی رزرو صاحب جدید را حذف نکرده است
+        trade = buy(owner_db, owner)
+        row = owner_db.query(IdempotencyKey).filter(IdempotencyKey.id == owner.record_id).one()
+        assert row.status == idempotency.COMPLETED and row.response_body == f'{{"id": {trade.id}}}'
+        assert get_balance(owner_db, wallet_account(user_id)) == 10 ** 6 - PRICE
+        idempotency.finish(owner)
+    finally:
+        stale_db.close()
+        owner_db.close()
@@ -0,0 +1,96 @@
+# backend/tests/test_ledger.py
+"""
+تطبیق افزایشی دفتر کل: فقط postingهای پس از checkpoint بازپخش می‌شوند و checkpoint فقط
+برای حساب سالم جلو می‌رود
+"""
+from sqlalchemy import delete, insert, update
+
+from app.database import SessionLocal
+from app.models.ledger_models import AccountBalance, LedgerCheckpoint, LedgerEntry
+from app.services.ledger import EQUITY_ACCOUNT, ensure_wallet, post_journal, reconcile, wallet_account
+
+
+def _deposit(db, user_id: int, amount: int) -> None:
+    post_journal(db, [(wallet_account(user_id), amount), (EQUITY_ACCOUNT, -amount)], "deposit")
+    db.commit()
+
+
+def _checkpoint(db, account: str):
+    db.expire_all()
+    checkpoint = db.get(LedgerCheckpoint, account)
+    return (checkpoint.sequence, checkpoint.balance) if checkpoint else None
+
+
+def test_reconcile_replays_only_entries_after_checkpoint(make_trader):
+    user_id, _ = make_trader(100)
+    wallet = wallet_account(user_id)
+    db = SessionLocal()
+    try:
+        ensure_wallet(db, user_id)
+        db.commit()
+        _deposit(db, user_id, 50)
+
+        # افتتاح + واریز از ابتدا بازپخش می‌شوند
+        result = reconcile(db, accounts=[wallet])
+        assert result["mismatches"] == [] and result["entries_replayed"] == 2
+        assert _checkpoint(db, wallet) == (2, 150)
+
+        # بدون posting جدید چیزی بازپخش نمی‌شود؛ پس از واریز بعدی فقط همان یک posting
+        assert reconcile(db, accounts=[wallet])["entries_replayed"] == 0
+        _deposit(db, user_id, 25)
+        result = reconcile(db, accounts=[wallet])
+        assert result["mismatches"] == [] and result["entries_replayed"] == 1
+        assert _checkpoint(db, wallet) == (3, 175)
+    finally:
+        db.close()
+
+
+def test_reconcile_reports_tampered_snapshot_without_advancing_checkpoint(make_trader):
+    user_id, _ = make_trader(100)
+    wallet = wallet_account(user_id)
+    db = SessionLocal()
+    try:
+        ensure_wallet(db, user_id)
+        db.commit()
+        assert reconcile(db, accounts=[wallet])["mismatches"] == []
+        _deposit(db, user_id, 40)
+
+        db.execute(update(AccountBalance).where(AccountBalance.account == wallet).values(balance=1_000_000))
+        db.commit()
+        mismatches = reconcile(db, accounts=[wallet])["mismatches"]
+        assert mismatches == [{"account": wallet, "problem": "snapshot 1000000@2 != ledger 140@2"}]
+        assert _checkpoint(db, wallet) == (1, 100)
+
+        # پس از اصلاح snapshot همان postingها دوباره بازپخش و checkpoint جلو می‌رود
+        db.execute(update(AccountBalance).where(AccountBalance.account == wallet).values(balance=140))
+        db.commit()
+        result = reconcile(db, accounts=[wallet])
+        assert result["mismatches"] == [] and result["entries_replayed"] == 1
+        assert _checkpoint(db, wallet) == (2, 140)
+    finally:
+        db.close()
+
+
+def test_reconcile_reports_unbalanced_journal(make_trader):
+    user_id, _ = make_trader()
+    db = SessionLocal()
+    try:
+        ensure_wallet(db, user_id)
+        db.commit()
+        reconcile(db, accounts=[])
+
+        # posting یک‌طرفه (دور زدن post_journal)
+        db.execute(insert(LedgerEntry).values(
+            journal_id="unbalanced-journal", account=EQUITY_ACCOUNT, sequence=10 ** 9, amount=7,
+            balance_after=7, entry_type="manual"
+        ))
+        db.commit()
+        try:
+            mismatches = reconcile(db, accounts=[])["mismatches"]
+            assert mismatches == [{"journal_id": "unbalanced-journal", "problem": "journal sums to 7"}]
+        finally:
+            db.execute(delete(LedgerEntry).where(LedgerEntry.journal_id == "unbalanced-journal"))
+            db.commit()
+        assert reconcile(db, accounts=[])["mismatches"] == []
+    finally:
+        db.close()
@@ -0,0 +1,87 @@
+# backend/tests/test_metrics.py
+import json
+import os
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.metrics import MetricsRegistry, MultiProcessCollector, require_metrics_access
+
+DEAD_PID = 2 ** 22 + 12345  # بزرگ‌تر از pid_max پیش‌فرض لینوکس
+
+
+@pytest.fixture(scope="module")
+def client(app):
+    return TestClient(app)
+
+
+def test_metrics_requires_token_or_allowed_ip(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secret-token")
+    monkeypatch.setattr(settings, "METRICS_ALLOWED_IPS", "127.0.0.1")
+
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret-token"})
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
+
+
+def _request(client_ip: str, forwarded: str = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (client_ip, 5000), "headers": headers})
+
+
+def test_metrics_allowlist_and_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+    monkeypatch.setattr(settings, "METRICS_ALLOWED_IPS", "127.0.0.1,10.0.0.0/8")
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", "172.16.0.0/12")
+
+    require_metrics_access(_request("127.0.0.1"))
+    require_metrics_access(_request("172.18.0.1", "10.1.2.3"))
+    for request in (_request("8.8.8.8"), _request("172.18.0.1", "8.8.8.8"), _request("8.8.8.8", "127.0.0.1")):
+        with pytest.raises(HTTPException) as error:
+            require_metrics_access(request)
+        assert error.value.status_code == 403
+
+
+def _registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "requests")
+    registry.gauge("in_flight", "in flight")
+    return registry
+
+
+def test_dead_worker_files_are_archived_once(tmp_path):
+    registry = _registry()
+    collector = MultiProcessCollector(registry, str(tmp_path))
+    dead_file = tmp_path / f"metrics_{DEAD_PID}.json"
+    dead_file.write_text(json.dumps([["requests_total", [], 5], ["in_flight", [], 2]]))
+    registry.inc("requests_total", amount=1)
+
+    first = registry.render(collector.collect())
+    assert not dead_file.exists()
+    assert "requests_total 6" in first
+    assert "in_flight 0" not in first and "in_flight 2" not in first
+
+    # فایل بایگانی‌شده دوباره شمرده نمی‌شود
+    assert "requests_total 6" in registry.render(collector.collect())
+    assert sorted(os.listdir(tmp_path)) == ["archive.json", "archive.lock", f"metrics_{os.getpid()}.json"]
+
+
+def test_flush_thread_writes_snapshot(tmp_path):
+    registry = _registry()
+    collector = MultiProcessCollector(registry, str(tmp_path), flush_interval=0.01)
+    registry.inc("requests_total", amount=3)
+    collector.start()
+    try:
+        path = tmp_path / f"metrics_{os.getpid()}.json"
+        for _ in range(200):
+            if path.exists():
+                break
+            collector._stop.wait(0.01)
+        assert json.loads(path.read_text()) == [["requests_total", [], 3]]
+    finally:
+        collector.stop()
@@ -0,0 +1,88 @@
+# backend/tests/test_n_plus_one.py
+"""
+تست‌های رگرسیون N+1: مسیرهای لیست با N_PLUS_ONE_MODE=raise اجرا می‌شوند
+(conftest) و هر دستوری که در یک درخواست بیش از آستانه تکرار شود خطا است
+"""
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.n_plus_one import NPlusOneError, n_plus_one_guard
+from app.database import SessionLocal
+from app.models.user_models import AdminUserProfile, StaffUserProfile, User, UserStatus
+
+USERS_PER_TYPE = settings.N_PLUS_ONE_THRESHOLD * 2
+LISTINGS = (
+    "/api/api/central/admin-users/",
+    "/api/api/central/staff-users/",
+    "/api/api/central/regular-users/",
+)
+
+
+@pytest.fixture(scope="module")
+def admin_client(app, admin_token):
+    assert settings.N_PLUS_ONE_MODE == "raise"
+
+    db = SessionLocal()
+    try:
+        if db.query(User).filter(User.email.like("n1-%")).count() == 0:
+            for index in range(USERS_PER_TYPE):
+                admin = User(email=f"n1-admin-{index}@example.com", password_hash="x", user_type="admin",
+                             first_name="Admin", last_name=str(index), status=UserStatus.ACTIVE)
+                admin.admin_profile = AdminUserProfile(role="admin", department="ops")
+                staff = User(email=f"n1-staff-{index}@example.com", password_hash="x", user_type="staff",
+                             first_name="Staff", last_name=str(index), status=UserStatus.ACTIVE)
+                staff.staff_profile = StaffUserProfile(employee_id=f"N1-{index}", position="clerk",
+                                                       department="ops", hire_date=datetime(2024, 1, 1))
+                db.add_all([admin, staff])
+            db.commit()
+    finally:
+        db.close()
+
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {admin_token}"
+    return client
+
+
+@pytest.mark.parametrize("path", LISTINGS)
+def test_listing_routes_have_no_n_plus_one(admin_client, path):
+    response = admin_client.get(path, params={"limit": 100})
+    assert response.status_code == 200, response.text
+    assert len(response.json()) >= USERS_PER_TYPE or path.endswith("regular-users/")
+
+
+@pytest.mark.parametrize("path", LISTINGS[:2])
+def test_listing_routes_with_search(admin_client, path):
+    response = admin_client.get(path, params={"search": "n1-", "limit": 100})
+    assert response.status_code == 200, response.text
+
+
+def test_lazy_load_in_loop_is_detected():
+    db = SessionLocal()
+    try:
+        with pytest.raises(NPlusOneError):
+            with n_plus_one_guard("lazy-profile-loop"):
+                for user in db.query(User).filter(User.user_type == "staff").all():
+                    user.staff_profile  # lazy load برای هر ردیف
+    finally:
+        db.close()
+
+
+def test_detection_fails_the_request(app, admin_client):
+    path = "/api/__tests__/n-plus-one"
+
+    def lazy_listing():
+        db = SessionLocal()
+        try:
+            return [user.admin_profile.role for user in db.query(User).filter(User.user_type == "admin")]
+        finally:
+            db.close()
+
+    app.add_api_route(path, lazy_listing)
+    try:
+        with pytest.raises(NPlusOneError):
+            admin_client.get(path)
+    finally:
+        app.router.routes = [route for route in app.router.routes if getattr(route, "path", None) != path]
@@ -0,0 +1,270 @@
+# backend/tests/test_orders.py
+"""
+دفتر سفارش: journal write-ahead (intent پیش از تسویه، commit/abort پس از آن) و برگرداندن
+تطبیق در صورت شکست تسویه؛ بازیابی intent بدون نتیجه از دفتر کل؛ رد self-match؛
+تسویه گروهی fillها بدون N+1
+"""
+import itertools
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.core.n_plus_one import n_plus_one_guard
+from app.database import SessionLocal
+from app.models.user_models import RegularUserProfile
+from app.services.ledger import get_balance, hold_account, wallet_account
+from app.services.order_book import (
+    BUY, SELL, OrderBook, OrderJournal, OrderJournalError, QUANTITY_SCALE, SelfMatchError, notional
+)
+from app.services.trade_execution import (
+    order_reference, release_order_funds, reserve_order_funds, resolve_order_intent, settle_fills
+)
+
+PRICE = 1000
+_ID_BASES = itertools.count(10 ** 6, 10 ** 6)
+
+
+class SettlementFailed(Exception):
+    pass
+
+
+def _fail(*args):
+    raise SettlementFailed()
+
+
+def _journal_ops(path):
+    with open(path, encoding="utf-8") as f:
+        return [(record["op"], record["id"]) for record in map(json.loads, f) if "id" in record]
+
+
+def test_failed_settlement_restores_book_and_journals_abort(tmp_path):
+    journal_path = str(tmp_path / "gold.jsonl")
+    book = OrderBook("gold", OrderJournal(journal_path))
+    first, _ = book.place(1, SELL, PRICE, 1000)
+    second, _ = book.place(2, SELL, PRICE, 1000)
+    third, _ = book.place(3, SELL, PRICE + 10, 500)
+
+    with pytest.raises(SettlementFailed):
+        book.place_and_settle(9, BUY, PRICE + 10, 2200, settle=_fail)
+
+    # سفارش‌های منتظر با مقدار و اولویت قبلی سر جایشان هستند
+    assert [o.remaining for o in (first, second, third)] == [1000, 1000, 500]
+    assert list(book.asks.levels[PRICE].orders) == [first.order_id, second.order_id]
+    assert book.asks.levels[PRICE].total == 2000
+    assert book.best_ask() == PRICE and book.best_bid() is None
+    assert set(book.orders) == {first.order_id, second.order_id, third.order_id}
+
+    # intent پیش از تسویه نوشته و با abort بسته شده است؛ شناسه آن دوباره استفاده نمی‌شود
+    assert _journal_ops(journal_path) == [
+        ("place", 1), ("commit", 1), ("place", 2), ("commit", 2), ("place", 3), ("commit", 3),
+        ("place", 4), ("abort", 4),
+    ]
+    placed, fills = book.place(9, BUY, PRICE, 1500)
+    assert placed.order_id == 5
+    assert [(fill.sell_order_id, fill.quantity) for fill in fills] == [(1, 1000), (2, 500)]
+
+    # بازپخش journal همان دفتر را می‌سازد
+    recovered = OrderBook("gold", OrderJournal(journal_path))
+    recovered.recover()
+    assert {i: o.remaining for i, o in recovered.orders.items()} == {i: o.remaining for i, o in book.orders.items()}
+
+
+def test_settlement_of_many_fills_is_bulk(make_trader):
+    makers = settings.N_PLUS_ONE_THRESHOLD + 5
+    sellers = [make_trader()[0] for _ in range(makers)]
+    buyer, _ = make_trader(10 ** 9)
+    db = SessionLocal()
+    try:
+        book = OrderBook("gold")
+        for seller in sellers:
+            book.place(seller, SELL, PRICE, QUANTITY_SCALE)
+
+        limit = PRICE + 5
+        quantity = makers * QUANTITY_SCALE
+        reserve_order_funds(db, buyer, notional(limit, quantity))
+
+        # در حالت raise هر دستور تکراری بیش از آستانه NPlusOneError می‌دهد
+        with n_plus_one_guard("order-settlement"):
+            placed, fills, trades = book.place_and_settle(
+                buyer, BUY, limit, quantity, settle=lambda fills: settle_fills(db, fills)
+            )
+
+        assert placed.remaining == 0 and len(fills) == makers and len(trades) == 2 * makers
+        cost = notional(PRICE, QUANTITY_SCALE)
+        assert get_balance(db, hold_account(buyer)) == 0
+        assert get_balance(db, wallet_account(buyer)) == 10 ** 9 - makers * cost
+        assert all(get_balance(db, wallet_account(seller)) == cost for seller in sellers)
+        assert db.query(RegularUserProfile.balance).filter(RegularUserProfile.user_id == sellers[0]).scalar() == cost
+    finally:
+        db.close()
+
+
+def test_failed_settlement_via_route_releases_hold(app, make_trader, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import app.routes.orders as orders_route
+
+    (seller, seller_headers), (buyer, buyer_headers) = make_trader(), make_trader(10 ** 7)
+    client = TestClient(app, raise_server_exceptions=False)
+
+    order = {"instrument": "silver", "side": "sell", "price": PRICE, "amount": 1}
+    assert client.post("/api/orders/", json=order, headers=seller_headers).status_code == 200
+    asks_before = client.get("/api/orders/book/silver").json()["asks"]
+
+    monkeypatch.setattr(orders_route, "settle_fills", _fail)
+    response = client.post("/api/orders/", json={**order, "side": "buy"}, headers=buyer_headers)
+    assert response.status_code == 500
+
+    # سفارش فروش در دفتر مانده و وجه رزروشده خریدار به کیف پولش برگشته است
+    assert client.get("/api/orders/book/silver").json()["asks"] == asks_before
+    db = SessionLocal()
+    try:
+        assert get_balance(db, hold_account(buyer)) == 0
+        assert get_balance(db, wallet_account(buyer)) == 10 ** 7
+    finally:
+        db.close()
+
+
+def _settled_buy(make_trader, tmp_path, drop_outcome):
+    """خرید 1 واحد از یک فروشنده؛ drop_outcome: نوشتن commit/abort (crash پس از commit تسویه) شکست می‌خورد"""
+    (seller, _), (buyer, _) = make_trader(), make_trader(10 ** 7)
+    journal_path, book = _fresh_book(tmp_path)
+    journal = book.journal
+    book.place(seller, SELL, PRICE, QUANTITY_SCALE)
+
+    append = journal.append
+
+    def crashing_append(record):
+        if drop_outcome and record["op"] in ("commit", "abort"):
+            raise OSError("disk full")
+        append(record)
+
+    journal.append = crashing_append
+    db = SessionLocal()
+    try:
+        cost = notional(PRICE, QUANTITY_SCALE)
+        reserve_order_funds(db, buyer, cost)
+        placed, fills, _ = book.place_and_settle(
+            buyer, BUY, PRICE, QUANTITY_SCALE, settle=lambda fills: settle_fills(db, fills)
+        )
+    finally:
+        db.close()
+    journal.close()
+    return journal_path, seller, buyer, placed
+
+
+def _fresh_book(tmp_path, instrument="gold"):
+    """دفتر با journal و شناسه‌های جدا از دفترهای تست‌های دیگر (مرجع سندهای دفتر کل مشترک است)"""
+    journal_path = str(tmp_path / f"{instrument}.jsonl")
+    OrderJournal(journal_path).append({"op": "seq", "next_id": next(_ID_BASES)})
+    book = OrderBook(instrument, OrderJournal(journal_path))
+    book.recover()
+    return journal_path, book
+
+
+def _recover(journal_path):
+    def resolver(instrument, op, order, fills):
+        db = SessionLocal()
+        try:
+            return resolve_order_intent(db, instrument, op, order, fills)
+        finally:
+            db.close()
+
+    book = OrderBook("gold", OrderJournal(journal_path))
+    book.recover(resolver)
+    return book
+
+
+def test_crash_between_settlement_commit_and_journal_outcome(make_trader, tmp_path):
+    journal_path, seller, buyer, placed = _settled_buy(make_trader, tmp_path, drop_outcome=True)
+    assert _journal_ops(journal_path)[-1] == ("place", placed.order_id)
+
+    # بدون resolver intent بدون نتیجه قابل بازیابی نیست
+    with pytest.raises(OrderJournalError):
+        OrderBook("gold", OrderJournal(journal_path)).recover()
+
+    # تسویه در دفتر کل commit شده است: سفارش فروش مصرف‌شده دوباره در دفتر ظاهر نمی‌شود
+    recovered = _recover(journal_path)
+    assert recovered.orders == {} and recovered.best_ask() is None
+    db = SessionLocal()
+    try:
+        assert get_balance(db, wallet_account(seller)) == notional(PRICE, QUANTITY_SCALE)
+        assert get_balance(db, hold_account(buyer)) == 0
+    finally:
+        db.close()
+
+    # journal فشرده شده و intent دیگر بازپخش نمی‌شود
+    assert _journal_ops(journal_path) == []
+    assert OrderBook("gold", OrderJournal(journal_path)).recover() == 1
+
+
+def test_crash_before_settlement_commit_aborts_intent_and_releases_hold(make_trader, tmp_path):
+    (seller, _), (buyer, _) = make_trader(), make_trader(10 ** 7)
+    journal_path, book = _fresh_book(tmp_path)
+    maker, _ = book.place(seller, SELL, PRICE, QUANTITY_SCALE)
+    db = SessionLocal()
+    try:
+        reserve_order_funds(db, buyer, notional(PRICE, QUANTITY_SCALE))
+    finally:
+        db.close()
+
+    # crash پس از نوشتن intent و پیش از commit تسویه: فقط intent در journal است
+    intent_id = maker.order_id + 1
+    book.journal.append({"op": "place", "id": intent_id, "user": buyer, "side": BUY, "price": PRICE,
+                         "qty": QUANTITY_SCALE, "ts": 0.0, "pending": True})
+    book.journal.close()
+
+    recovered = _recover(journal_path)
+    assert {i: o.remaining for i, o in recovered.orders.items()} == {maker.order_id: QUANTITY_SCALE}
+    db = SessionLocal()
+    try:
+        assert get_balance(db, hold_account(buyer)) == 0
+        assert get_balance(db, wallet_account(buyer)) == 10 ** 7
+    finally:
+        db.close()
+    assert recovered.place(buyer, BUY, PRICE - 1, 1)[0].order_id == intent_id + 1
+
+
+def test_self_match_is_rejected_without_touching_book(tmp_path):
+    journal_path = str(tmp_path / "gold.jsonl")
+    book = OrderBook("gold", OrderJournal(journal_path))
+    other, _ = book.place(2, SELL, PRICE, 500)
+    own, _ = book.place(1, SELL, PRICE, 500)
+
+    with pytest.raises(SelfMatchError):
+        book.place(1, BUY, PRICE, 1000)
+
+    assert [o.remaining for o in (other, own)] == [500, 500]
+    assert list(book.asks.levels[PRICE].orders) == [other.order_id, own.order_id]
+    assert book.asks.levels[PRICE].total == 1000
+    assert _journal_ops(journal_path) == [("place", 1), ("commit", 1), ("place", 2), ("commit", 2)]
+    assert book.place(1, SELL, PRICE + 1, 1)[0].order_id == 3
+
+
+def test_failed_cancel_release_keeps_order(app, make_trader, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import app.routes.orders as orders_route
+
+    buyer, headers = make_trader(10 ** 7)
+    client = TestClient(app, raise_server_exceptions=False)
+    order = {"instrument": "brent", "side": "buy", "price": PRICE, "amount": 1}
+    order_id = client.post("/api/orders/", json=order, headers=headers).json()["order_id"]
+    book = client.get("/api/orders/book/brent").json()
+    assert book["best_bid"] == PRICE and book["best_ask"] is None
+
+    monkeypatch.setattr(orders_route, "release_order_funds", _fail)
+    assert client.delete(f"/api/orders/brent/{order_id}", headers=headers).status_code == 500
+    assert client.get("/api/orders/book/brent").json()["bids"] == book["bids"]
+
+    monkeypatch.setattr(orders_route, "release_order_funds", release_order_funds)
+    response = client.delete(f"/api/orders/brent/{order_id}", headers=headers)
+    assert response.status_code == 200 and response.json()["status"] == "cancelled"
+    assert client.get("/api/orders/book/brent").json()["bids"] == []
+    db = SessionLocal()
+    try:
+        assert get_balance(db, hold_account(buyer)) == 0
+        assert get_balance(db, wallet_account(buyer)) == 10 ** 7
+    finally:
+        db.close()
@@ -0,0 +1,89 @@
+# backend/tests/test_pool_saturation.py
+"""
+اشباع pool: TimeoutError checkout نباید در except Exception مسیرها به 500 تبدیل شود؛
+handler سراسری 503 با Retry-After برمی‌گرداند
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+import app.database as database
+from app.core.config import settings
+from app.database import get_db
+from app.db_routing import get_read_db
+
+
+@pytest.fixture
+def saturated_client(app, admin_token, monkeypatch):
+    # pool تک‌اتصالی با timeout کوتاه که اتصال آن در اختیار تست است
+    monkeypatch.setattr(database, "POOL_TIMEOUT", 0.1)
+    engine = database.create_sqlite_engine(settings.DATABASE_URL, pool_size=1, max_overflow=0,
+                                           pool_name="saturation-test")
+    saturated_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override():
+        db = saturated_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    held = engine.connect()
+    app.dependency_overrides[get_db] = override
+    app.dependency_overrides[get_read_db] = override
+    try:
+        client = TestClient(app)
+        client.headers["Authorization"] = f"Bearer {admin_token}"
+        yield client
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_read_db, None)
+        held.close()
+        engine.dispose()
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ("get", "/api/api/central/regular-users/", None),
+    ("get", "/api/api/central/staff-users/", None),
+    ("post", "/api/api/central/regular-users/bulk/verify-email", {"ids": [1]}),
+])
+def test_saturated_pool_returns_503(saturated_client, method, path, body):
+    response = saturated_client.request(method, path, json=body)
+    assert response.status_code == 503, response.text
+    assert response.headers["Retry-After"] == str(settings.DB_POOL_RETRY_AFTER)
+
+
+def test_auth_releases_async_connection_before_sync_route(app, admin_token):
+    from fastapi import Depends
+    from sqlalchemy import event
+
+    from app.core.auth import get_current_admin
+
+    path = "/api/__tests__/sync-with-auth"
+    async_engine = database.get_async_engine().sync_engine
+    async_checked_out = []
+
+    # روی SQLite engine async از NullPool استفاده می‌کند؛ checkout/checkin شمرده می‌شود
+    def on_checkout(*args):
+        async_checked_out.append(1)
+
+    def on_checkin(*args):
+        async_checked_out.pop()
+
+    def sync_route(db=Depends(get_db), current_admin=Depends(get_current_admin)):
+        db.connection()
+        # اتصال احراز هویت (async) پیش از اجرای مسیر sync آزاد شده است
+        return {"async_checked_out": len(async_checked_out), "admin": current_admin.username}
+
+    event.listen(async_engine, "checkout", on_checkout)
+    event.listen(async_engine, "checkin", on_checkin)
+    app.add_api_route(path, sync_route)
+    try:
+        response = TestClient(app).get(path, headers={"Authorization": f"Bearer {admin_token}"})
+    finally:
+        app.router.routes = [route for route in app.router.routes if getattr(route, "path", None) != path]
+        event.remove(async_engine, "checkout", on_checkout)
+        event.remove(async_engine, "checkin", on_checkin)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["async_checked_out"] == 0
@@ -0,0 +1,52 @@
+# backend/tests/test_portfolio.py
+"""
+پورتفو: وجه رزروشده سفارش‌های باز جزو دارایی کل است؛ بازسازی موقعیت‌ها همان نتیجه
+به‌روزرسانی افزایشی را می‌دهد
+"""
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.models.trade_models import Position
+from app.services.positions import rebuild_positions
+from app.services.trade_execution import execute_trade
+
+PRICE = 1000
+
+
+def test_total_equity_includes_held_funds(app, make_trader):
+    user_id, headers = make_trader(10 ** 7)
+    client = TestClient(app)
+    order = {"instrument": "brent", "side": "buy", "price": PRICE, "amount": 2}
+    assert client.post("/api/orders/", json=order, headers=headers).status_code == 200
+
+    portfolio = client.get("/api/portfolio/", headers=headers).json()
+    assert portfolio["cash_balance"] == 10 ** 7 - 2 * PRICE
+    assert portfolio["held_balance"] == 2 * PRICE
+    assert portfolio["total_equity"] == 10 ** 7
+
+
+def test_rebuild_positions_matches_incremental_updates(make_trader):
+    user_id, _ = make_trader(10 ** 7)
+    db = SessionLocal()
+    try:
+        for trade_type, amount, price in (("buy", 2, PRICE), ("buy", 1, PRICE + 300), ("sell", 1.5, PRICE + 600)):
+            execute_trade(db, user_id, "silver", amount, trade_type, price)
+
+        def snapshot():
+            db.expire_all()
+            return [
+                (p.instrument, p.quantity, p.cost_basis, p.realized_pnl, p.trade_count)
+                for p in db.query(Position).filter(Position.user_id == user_id).order_by(Position.instrument)
+            ]
+
+        incremental = snapshot()
+        db.query(Position).filter(Position.user_id == user_id).update({"quantity": 99, "realized_pnl": 0})
+        db.add(Position(user_id=user_id, instrument="gold", quantity=1, cost_basis=PRICE, realized_pnl=0,
+                        trade_count=1))
+        db.commit()
+
+        # موقعیت بدون معامله حذف و بقیه از تاریخچه ساخته می‌شوند
+        assert rebuild_positions(db, user_id=user_id) == {"positions": 1, "trades_replayed": 3}
+        assert snapshot() == incremental
+    finally:
+        db.close()
@@ -0,0 +1,172 @@
+# backend/tests/test_rate_limit.py
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.request_context import parse_networks, resolve_client_ip
+from app.security.middleware import SecurityMiddleware
+from app.security.rate_limit import IPBlockList, SharedSlidingWindowRateLimiter
+from app.security.shared_state import LocalRedisStandIn, MemoryStore, RedisStore, SQLiteStore, SharedStateStore
+
+WINDOW = 60
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis-local"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    if request.param == "sqlite":
+        return SQLiteStore(str(tmp_path / "shared_state.db"))
+    return RedisStore(LocalRedisStandIn())
+
+
+def test_shared_limiter_enforces_limit_per_client_and_route(store):
+    limiter = SharedSlidingWindowRateLimiter(store, window_seconds=WINDOW, limits={"default": 3, "auth": 1})
+    now = 1000 * WINDOW  # ابتدای پنجره
+
+    assert [limiter.hit("1.1.1.1", now=now) for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit("2.2.2.2", now=now)
+    assert limiter.hit("1.1.1.1", "auth", now=now)
+    assert not limiter.hit("1.1.1.1", "auth", now=now)
+
+
+def test_shared_limiter_rejected_requests_do_not_consume_quota(store):
+    limiter = SharedSlidingWindowRateLimiter(store, window_seconds=WINDOW, limits={"default": 2})
+    now = 1000 * WINDOW
+    for _ in range(10):
+        limiter.hit("1.1.1.1", now=now)
+
+    # پنجره بعد، نیمه راه: سهم پنجره قبل 2 * 0.5 = 1 (نه 10)
+    assert limiter.hit("1.1.1.1", now=now + WINDOW * 1.5)
+    assert not limiter.hit("1.1.1.1", now=now + WINDOW * 1.5)
+
+
+def test_shared_limiter_sliding_window_weights_previous_window(store):
+    limiter = SharedSlidingWindowRateLimiter(store, window_seconds=WINDOW, limits={"default": 4})
+    now = 1000 * WINDOW
+    for _ in range(4):
+        assert limiter.hit("1.1.1.1", now=now)
+
+    # ابتدای پنجره بعد، پنجره قبل کامل حساب می‌شود
+    assert not limiter.hit("1.1.1.1", now=now + WINDOW)
+    # دو پنجره بعد، پنجره قبلی خالی است
+    assert limiter.hit("1.1.1.1", now=now + 2 * WINDOW)
+
+
+def test_shared_limiter_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "shared_state.db")
+    workers = [SharedSlidingWindowRateLimiter(SQLiteStore(path), limits={"default": 5}) for _ in range(2)]
+    now = 1000 * WINDOW
+
+    results = [workers[i % 2].hit("1.1.1.1", now=now) for i in range(6)]
+    assert results == [True] * 5 + [False]
+
+
+def test_sqlite_store_concurrent_increments_from_two_connections(tmp_path):
+    path = str(tmp_path / "shared_state.db")
+    stores = [SQLiteStore(path), SQLiteStore(path)]
+    threads_per_store, increments = 4, 200
+
+    def worker(store):
+        for _ in range(increments):
+            store.incr("counter", ttl=WINDOW)
+
+    threads = [threading.Thread(target=worker, args=(store,)) for store in stores for _ in range(threads_per_store)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # هیچ افزایشی بین دو اتصال جداگانه گم نشده است
+    expected = len(stores) * threads_per_store * increments
+    assert [store.get("counter") for store in stores] == [expected, expected]
+
+
+def test_shared_state_store_is_abstract():
+    with pytest.raises(TypeError):
+        SharedStateStore()
+
+
+def test_ip_block_list_block_unblock_and_expiry(store):
+    blocked = IPBlockList(store)
+    assert "1.1.1.1" not in blocked
+
+    blocked.add("1.1.1.1")
+    assert "1.1.1.1" in blocked
+    assert "2.2.2.2" not in blocked
+
+    blocked.discard("1.1.1.1")
+    assert "1.1.1.1" not in blocked
+
+    blocked.block("3.3.3.3", ttl=-1)  # منقضی
+    assert "3.3.3.3" not in blocked
+
+
+class _ThreadRecordingStore(SQLiteStore):
+    """backend SQLite که thread هر فراخوانی را ثبت می‌کند"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.threads = set()
+
+    def incr(self, key, amount=1, ttl=60):
+        self.threads.add(threading.get_ident())
+        return super().incr(key, amount, ttl)
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+
+def _client_with_store(store) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"thread": threading.get_ident()}
+
+    app.add_middleware(SecurityMiddleware, store=store)
+    return TestClient(app)
+
+
+def test_middleware_runs_shared_store_calls_off_the_event_loop(tmp_path):
+    store = _ThreadRecordingStore(str(tmp_path / "shared_state.db"))
+    client = _client_with_store(store)
+
+    response = client.get("/ping")
+    assert response.status_code == 200
+    loop_thread = response.json()["thread"]
+    assert store.threads and loop_thread not in store.threads
+
+
+def test_middleware_blocked_ip_and_rate_limit(tmp_path):
+    store = SQLiteStore(str(tmp_path / "shared_state.db"))
+    client = _client_with_store(store)
+    IPBlockList(store).add("testclient")
+
+    assert client.get("/ping").status_code == 403
+
+    IPBlockList(store).discard("testclient")
+    statuses = [client.get("/ping").status_code for _ in range(101)]
+    assert statuses[:100] == [200] * 100
+    assert statuses[100] == 429
+
+
+def _scope(client_ip: str, forwarded: str = None) -> dict:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return {"type": "http", "client": (client_ip, 1234), "headers": headers}
+
+
+def test_client_ip_ignores_forwarded_header_from_untrusted_peer():
+    trusted = parse_networks("172.16.0.0/12")
+    assert resolve_client_ip(_scope("8.8.8.8", "1.2.3.4"), trusted) == "8.8.8.8"
+    assert resolve_client_ip(_scope("172.18.0.1", "1.2.3.4"), []) == "172.18.0.1"
+
+
+def test_client_ip_from_trusted_proxy_uses_rightmost_untrusted_hop():
+    trusted = parse_networks("127.0.0.1, 172.16.0.0/12")
+    # کلاینت 9.9.9.9 مقدار جعلی 1.2.3.4 را فرستاده، nginx آدرس واقعی را اضافه کرده
+    assert resolve_client_ip(_scope("172.18.0.1", "1.2.3.4, 9.9.9.9, 172.18.0.5"), trusted) == "9.9.9.9"
+    assert resolve_client_ip(_scope("127.0.0.1"), trusted) == "127.0.0.1"
@@ -0,0 +1,70 @@
+# backend/tests/test_slow_queries.py
+import math
+import random
+from types import SimpleNamespace
+
+from app.core.query_profiler import SLOW_QUERY_MODULE
+from app.database import SessionLocal
+from app.models.admin_models import AdminRole
+from app.models.audit_models import SystemLog
+from app.routes.admin.diagnostics import get_slow_queries
+
+ADMIN = SimpleNamespace(role=AdminRole.SUPER_ADMIN)
+
+
+def _reference(rows, route=None):
+    """تجمیع درون‌پایتونی (مرجع مقایسه)، p95 به روش nearest-rank"""
+    groups = {}
+    for details in rows:
+        if route and details["route"] != route:
+            continue
+        group = groups.setdefault(details["fingerprint"], {"durations": [], "routes": {}})
+        group["durations"].append(details["duration_ms"])
+        group["routes"][details["route"]] = group["routes"].get(details["route"], 0) + 1
+    result = {}
+    for fingerprint, group in groups.items():
+        durations = sorted(group["durations"])
+        result[fingerprint] = {
+            "count": len(durations),
+            "total_ms": round(sum(durations), 2),
+            "max_ms": durations[-1],
+            "p95_ms": durations[math.ceil(len(durations) * 95 / 100) - 1],
+            "routes": group["routes"],
+        }
+    return result
+
+
+def test_slow_queries_grouped_in_sql_match_reference(app):
+    randomizer = random.Random(7)
+    rows = [
+        {
+            "fingerprint": f"fp{randomizer.randint(1, 6)}",
+            "sql": "SELECT ?",
+            "params_shape": ["int"],
+            "route": randomizer.choice(["GET /a", "GET /b"]),
+            "duration_ms": randomizer.randint(200, 2000),
+        }
+        for _ in range(300)
+    ]
+    db = SessionLocal()
+    try:
+        db.query(SystemLog).filter(SystemLog.module == SLOW_QUERY_MODULE).delete()
+        db.add_all(SystemLog(level="WARNING", module=SLOW_QUERY_MODULE, message="slow", details=details)
+                   for details in rows)
+        db.commit()
+
+        for route in (None, "GET /a"):
+            report = get_slow_queries(hours=24, route=route, limit=50, db=db, current_admin=ADMIN)
+            expected = _reference(rows, route)
+            assert report["fingerprints"] == len(expected)
+            assert report["scanned"] == sum(group["count"] for group in expected.values())
+            totals = [item["total_ms"] for item in report["slow_queries"]]
+            assert totals == sorted(totals, reverse=True)
+            for item in report["slow_queries"]:
+                reference = expected[item["fingerprint"]]
+                assert {key: item[key] for key in reference} == reference
+                assert item["sql"] == "SELECT ?" and item["params_shape"] == ["int"]
+
+        assert len(get_slow_queries(hours=24, route=None, limit=2, db=db, current_admin=ADMIN)["slow_queries"]) == 2
+    finally:
+        db.close()
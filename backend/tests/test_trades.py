@@ -0,0 +1,114 @@
+# backend/tests/test_trades.py
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.ledger_models import LedgerEntry
+from app.models.trade_models import Trade
+from app.services.ledger import ensure_wallet, get_balance, wallet_account
+from app.services.quotes import issue_quote
+from app.services.trade_execution import InsufficientBalanceError, execute_trade
+
+PRICE = 1000
+
+
+def _leg(user_id: int, trade_type: str) -> dict:
+    quote = issue_quote(user_id, "gold", PRICE)
+    return {"gold_type": "gold", "amount": 1, "trade_type": trade_type, "quote_token": quote.quote_token}
+
+
+def test_net_zero_batch_opens_wallet_and_returns_balance(app, make_trader):
+    # کیف پول هنوز باز نشده (کاربر قدیمی با موجودی پروفایل) و legها خالص صفر دارند
+    user_id, headers = make_trader(5000)
+    response = TestClient(app).post("/api/trades/batch", headers=headers, json={
+        "trades": [_leg(user_id, "buy"), _leg(user_id, "sell")]
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["balance_after"] == 5000
+    assert [leg["trade"]["balance_after"] for leg in body["results"]] == [5000, 5000]
+
+
+def test_batch_records_valid_legs_in_one_journal_and_rejects_the_rest(app, make_trader):
+    # بیش از آستانه N+1: در حالت raise هر دستور تکراری به ازای leg خطا می‌داد
+    user_id, headers = make_trader(10 ** 6)
+    buys = settings.N_PLUS_ONE_THRESHOLD + 5
+    legs = [_leg(user_id, "buy") for _ in range(buys)] + [_leg(user_id, "sell")]
+    legs.insert(1, {"gold_type": "silver", "amount": 1, "trade_type": "buy"})
+    legs.insert(3, {**_leg(user_id, "buy"), "quote_token": "forged"})
+
+    response = TestClient(app).post("/api/trades/batch", headers=headers, json={"trades": legs})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["completed"], body["rejected"]) == (buys + 1, 2)
+    assert (body["total_debit"], body["total_credit"]) == (buys * PRICE, PRICE)
+    assert body["balance_after"] == 10 ** 6 - (buys - 1) * PRICE
+    assert [result["status"] for result in body["results"][:4]] == ["completed", "rejected", "completed", "rejected"]
+    assert body["results"][1]["error"] == "Gold type not found"
+
+    # شناسه‌ها به ترتیب legها و اثر خالص دسته با یک journal روی کیف پول
+    ids = [result["trade"]["id"] for result in body["results"] if result["status"] == "completed"]
+    assert ids == sorted(ids)
+    db = SessionLocal()
+    try:
+        entries = db.query(LedgerEntry).filter(LedgerEntry.account == wallet_account(user_id),
+                                               LedgerEntry.entry_type == "trade_batch").all()
+        assert [(entry.amount, entry.reference_id) for entry in entries] == [(-(buys - 1) * PRICE, ids[0])]
+    finally:
+        db.close()
+
+
+def test_batch_beyond_balance_records_nothing(app, make_trader):
+    user_id, headers = make_trader(PRICE)
+    response = TestClient(app).post("/api/trades/batch", headers=headers, json={
+        "trades": [_leg(user_id, "buy"), _leg(user_id, "buy")]
+    })
+    assert response.status_code == 400
+    db = SessionLocal()
+    try:
+        assert db.query(Trade).filter(Trade.user_id == user_id).count() == 0
+        assert get_balance(db, wallet_account(user_id)) == PRICE
+    finally:
+        db.close()
+
+
+def test_concurrent_buys_never_overdraw_wallet(make_trader):
+    affordable, attempts = 5, 12
+    user_id, _ = make_trader(affordable * PRICE)
+    db = SessionLocal()
+    try:
+        ensure_wallet(db, user_id)
+        db.commit()
+    finally:
+        db.close()
+
+    start = threading.Barrier(attempts)
+    outcomes = []
+
+    def buy():
+        db = SessionLocal()
+        try:
+            start.wait()
+            execute_trade(db, user_id, "gold", 1, "buy", PRICE)
+            outcomes.append("filled")
+        except InsufficientBalanceError:
+            outcomes.append("rejected")
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=buy) for _ in range(attempts)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # بررسی و کسر در یک UPDATE شرطی: دقیقاً به اندازه موجودی خرید انجام و بقیه رد شده‌اند
+    assert sorted(outcomes) == ["filled"] * affordable + ["rejected"] * (attempts - affordable)
+    db = SessionLocal()
+    try:
+        assert get_balance(db, wallet_account(user_id)) == 0
+        assert db.query(Trade).filter(Trade.user_id == user_id).count() == affordable
+    finally:
+        db.close()
@@ -0,0 +1,100 @@
+# backend/tests/test_trading_volume.py
+"""
+حجم غلتان 24 ساعت / 7 روز / 30 روز: جابه‌جایی پنجره با گذشت زمان، آینه حجم 30 روز و سطح ریسک
+در پروفایل، و سقف حجم 24 ساعت
+"""
+import pytest
+
+from app.database import SessionLocal
+from app.models.trade_models import Trade
+from app.models.user_models import RegularUserProfile
+from app.services.trade_execution import TradingLimitError, execute_trade
+from app.services.trading_volume import RISK_THRESHOLDS, TradingLimitExceededError, record_volume
+
+HOUR = 3600
+DAY = 24 * HOUR
+# ابتدای یک روز UTC تا مرز سطل‌ها قابل پیش‌بینی باشد
+START = 20_000 * DAY
+
+
+def _profile(db, user_id: int):
+    db.expire_all()
+    return db.query(RegularUserProfile).filter(RegularUserProfile.user_id == user_id).one()
+
+
+def test_windows_roll_and_profile_mirrors_30_day_volume(make_trader):
+    user_id, _ = make_trader()
+    medium_24h = RISK_THRESHOLDS["medium"][0]
+    db = SessionLocal()
+    try:
+        volumes = record_volume(db, user_id, medium_24h, now=START)
+        db.commit()
+        assert (volumes.volume_24h, volumes.volume_7d, volumes.volume_30d) == (medium_24h,) * 3
+        profile = _profile(db, user_id)
+        assert (profile.trading_volume, profile.risk_level) == (medium_24h, "medium")
+
+        # 25 ساعت بعد: از پنجره 24 ساعت خارج ولی در 7 و 30 روز مانده است
+        volumes = record_volume(db, user_id, 10, now=START + 25 * HOUR)
+        db.commit()
+        assert (volumes.volume_24h, volumes.volume_7d, volumes.volume_30d) == (10, medium_24h + 10, medium_24h + 10)
+
+        # 8 روز بعد: فقط در پنجره 30 روز
+        volumes = record_volume(db, user_id, 5, now=START + 8 * DAY)
+        db.commit()
+        assert (volumes.volume_24h, volumes.volume_7d, volumes.volume_30d) == (5, 5, medium_24h + 15)
+
+        # 30 روز بعد سطل روز اول صفر شده و سطح ریسک از حجم‌های باقی‌مانده مشتق می‌شود
+        volumes = record_volume(db, user_id, 1, now=START + 30 * DAY)
+        db.commit()
+        assert (volumes.volume_24h, volumes.volume_7d, volumes.volume_30d) == (1, 1, 16)
+        profile = _profile(db, user_id)
+        assert (profile.trading_volume, profile.risk_level) == (16, "low")
+
+        # وقفه طولانی‌تر از یک دور کامل ring buffer
+        volumes = record_volume(db, user_id, 2, now=START + 400 * DAY)
+        db.commit()
+        assert (volumes.volume_24h, volumes.volume_7d, volumes.volume_30d) == (2, 2, 2)
+    finally:
+        db.close()
+
+
+def test_24h_volume_cap_rejects_trade_and_rolls_off(make_trader):
+    user_id, _ = make_trader(10 ** 7)
+    db = SessionLocal()
+    try:
+        db.query(RegularUserProfile).filter(RegularUserProfile.user_id == user_id).update(
+            {"trading_limits": {"daily_volume": 1000}}, synchronize_session=False
+        )
+        db.commit()
+
+        record_volume(db, user_id, 900, now=START)
+        db.commit()
+        with pytest.raises(TradingLimitExceededError):
+            record_volume(db, user_id, 101, now=START + HOUR)
+        db.rollback()
+        assert record_volume(db, user_id, 100, now=START + HOUR).volume_24h == 1000
+        db.rollback()
+
+        # سقف برای حجم 30 روز نیست: یک روز بعد حجم قبلی از پنجره 24 ساعت خارج شده است
+        assert record_volume(db, user_id, 1000, now=START + DAY).volume_24h == 1000
+        db.rollback()
+    finally:
+        db.close()
+
+
+def test_trade_over_cap_is_rolled_back(make_trader):
+    user_id, _ = make_trader(10 ** 7)
+    db = SessionLocal()
+    try:
+        db.query(RegularUserProfile).filter(RegularUserProfile.user_id == user_id).update(
+            {"trading_limits": {"daily_volume": 1500}}, synchronize_session=False
+        )
+        db.commit()
+
+        execute_trade(db, user_id, "gold", 1, "buy", 1000)
+        with pytest.raises(TradingLimitError):
+            execute_trade(db, user_id, "gold", 1, "buy", 1000)
+        assert db.query(Trade).filter(Trade.user_id == user_id).count() == 1
+        assert _profile(db, user_id).trading_volume == 1000
+    finally:
+        db.close()
@@ -0,0 +1,43 @@
+# backend/tests/test_user_import.py
+import io
+import uuid
+
+from app.database import SessionLocal
+from app.models.user_models import User, UserStatus
+from app.services.user_import import UserImportService, _clean_record
+
+
+def _record(**fields) -> dict:
+    return {"email": f"import-{uuid.uuid4().hex[:10]}@example.com", "password": "secret", **fields}
+
+
+def test_risk_level_is_validated():
+    data, errors = _clean_record(_record(risk_level="HIGH"))
+    assert data["risk_level"] == "high" and errors == []
+
+    _, errors = _clean_record(_record(risk_level="extreme"))
+    assert any("سطح ریسک" in error for error in errors)
+
+
+def test_national_id_digits_are_folded_before_duplicate_check(app):
+    national_id = str(uuid.uuid4().int)[:10]
+    persian = national_id.translate(str.maketrans("0123456789", "۰۱۲۳۴۵۶۷۸۹"))
+    arabic = national_id[::-1].translate(str.maketrans("0123456789", "٠١٢٣٤٥٦٧٨٩"))
+
+    db = SessionLocal()
+    try:
+        db.add(User(email=f"{national_id}@example.com", password_hash="x", national_id=national_id,
+                    status=UserStatus.ACTIVE))
+        db.commit()
+
+        rows = [_record(national_id=persian), _record(national_id=arabic), _record(national_id=national_id[::-1])]
+        csv = "email,password,national_id\n" + "".join(
+            f"{row['email']},{row['password']},{row['national_id']}\n" for row in rows
+        )
+        events = list(UserImportService(db).run(io.BytesIO(csv.encode("utf-8")), "csv"))
+    finally:
+        db.close()
+
+    errors = {event["line"]: event["errors"] for event in events if event["type"] == "error"}
+    assert errors == {2: ["کد ملی از قبل وجود دارد"], 4: ["کد ملی در فایل تکراری است"]}
+    assert events[-1] == {"type": "summary", "processed": 3, "created": 1, "failed": 2}
@@ -0,0 +1,96 @@
+# backend/tests/test_user_listing.py
+"""
+جستجو و صفحه‌بندی: یکسان‌سازی ارقام فارسی/عربی و ی/ك در جستجوی کاربران؛ پیمایش cursor
+تاریخچه معاملات صفحه به صفحه (شامل ردیف‌های بدون created_at)
+"""
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, text
+
+from app.database import SessionLocal
+from app.models.trade_models import Trade
+from app.models.user_models import User, UserStatus
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def admin_client(app, admin_token):
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {admin_token}"
+    return client
+
+
+@pytest.fixture(scope="module")
+def arabic_user(app):
+    db = SessionLocal()
+    try:
+        # حروف عربی (ي / ك) و ارقام فارسی همان‌طور که کاربر وارد کرده ذخیره می‌شوند
+        user = User(email=f"search-{uuid.uuid4().hex[:12]}@example.com", password_hash="x",
+                    user_type="regular", status=UserStatus.ACTIVE,
+                    first_name="علي", last_name="كرماني", phone="+98 912 ۷۶۵ ۴۳۲۱")
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("term", [
+    "علی",               # ی فارسی
+    "كرماني",            # همان شکل عربی
+    "کرمانی",            # ک و ی فارسی
+    "۰۹۱۲۷۶۵۴۳۲۱",       # ارقام فارسی
+    "٠٩١٢٧٦٥٤٣٢١",       # ارقام عربی
+    "+98 912 765 4321",
+])
+def test_search_folds_digits_and_arabic_letters(admin_client, arabic_user, term):
+    response = admin_client.get("/api/users/", params={"search": term, "limit": 500})
+    assert response.status_code == 200, response.text
+    assert arabic_user in [user["id"] for user in response.json()]
+
+
+def test_cursor_round_trip_keeps_null_timestamp():
+    assert decode_cursor(encode_cursor(None, 42)) == (None, 42)
+    stamp = datetime(2024, 3, 1, 12, 30, 5, 250)
+    assert decode_cursor(encode_cursor(stamp, 7)) == (stamp, 7)
+
+
+def test_trade_history_pages_cover_every_row_once(app, make_trader):
+    user_id, headers = make_trader()
+    same = datetime(2024, 1, 2, 9, 0, 0)
+    stamps = [None, datetime(2024, 1, 1, 8, 0, 0), same, same, same, None, datetime(2024, 1, 3, 7, 0, 0)]
+    db = SessionLocal()
+    try:
+        ids = db.execute(insert(Trade).returning(Trade.id), [
+            {"user_id": user_id, "gold_type": "gold", "amount": 1, "price": 1000, "total_amount": 1000,
+             "trade_type": "buy", "status": "completed", "created_at": None}
+            for _ in stamps
+        ]).scalars().all()
+        # زمان‌ها به همان قالبی که func.now() در SQLite ذخیره می‌کند
+        for trade_id, stamp in zip(sorted(ids), stamps):
+            if stamp is not None:
+                db.execute(text("UPDATE trades SET created_at = :stamp WHERE id = :id"),
+                           {"stamp": stamp.isoformat(sep=" "), "id": trade_id})
+        db.commit()
+        rows = db.query(Trade.id, Trade.created_at).filter(Trade.user_id == user_id).all()
+    finally:
+        db.close()
+
+    # ردیف‌های بدون زمان اول، سپس جدیدترین؛ هم‌زمان‌ها با id نزولی
+    expected = [row.id for row in sorted(rows, key=lambda r: (r.created_at is None, r.created_at or same, r.id),
+                                         reverse=True)]
+
+    client = TestClient(app)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/trades/", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        seen.extend(trade["id"] for trade in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == expected